@@ -6,39 +6,313 @@ Una calculadora basada en consola para operaciones matriciales y métodos numér
 Autores: Roberto Nieves, Christian Ferrer, Anahí Adamaco, Rodrigo Altamirano
 Fecha: 12 de Mayo 2025
 """
+import sys
+import contextlib
+import contextvars
+import numpy as np
+import sparse
 
-def print_matrix(matrix, precision=4):
+class Matrix:
     """
-    Muestra una matriz en un formato legible.
+    Matriz densa respaldada por un ndarray contiguo de float64.
+    
+    Las operaciones de la calculadora aceptan y devuelven Matrix. También admite
+    el acceso propio de una lista de listas (matrix[i][j], len() e iteración por
+    filas); from_list() y tolist() convierten desde y hacia ese formato.
+    """
+    __slots__ = ('array',)
+    
+    def __init__(self, data):
+        """
+        Args:
+            data: Lista de listas, ndarray bidimensional u otra Matrix
+        """
+        array = np.ascontiguousarray(data, dtype=np.float64)
+        if array.ndim != 2:
+            raise ValueError("Una matriz debe ser bidimensional")
+        self.array = array
+    
+    @classmethod
+    def from_list(cls, rows):
+        """
+        Crea una matriz a partir de una lista de listas.
+        """
+        return cls(rows)
+    
+    def tolist(self):
+        """
+        Convierte la matriz en una lista de listas de floats.
+        """
+        return self.array.tolist()
+    
+    @property
+    def shape(self):
+        return self.array.shape
+    
+    def copy(self):
+        return Matrix(self.array.copy())
+    
+    def __len__(self):
+        return self.array.shape[0]
+    
+    def __getitem__(self, index):
+        return self.array[index]
+    
+    def __iter__(self):
+        return iter(self.array)
+    
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or dtype == self.array.dtype:
+            return self.array
+        return self.array.astype(dtype)
+    
+    def __add__(self, other):
+        other = as_array(other)
+        if other.shape != self.shape:
+            raise ValueError(f"No se pueden sumar matrices de dimensiones {self.shape} y {other.shape}")
+        return Matrix(self.array + other)
+    
+    def __sub__(self, other):
+        other = as_array(other)
+        if other.shape != self.shape:
+            raise ValueError(f"No se pueden restar matrices de dimensiones {self.shape} y {other.shape}")
+        return Matrix(self.array - other)
+    
+    def __matmul__(self, other):
+        other = as_array(other)
+        if other.shape[0] != self.shape[1]:
+            raise ValueError(f"No se pueden multiplicar matrices de dimensiones {self.shape} y {other.shape}")
+        return Matrix(self.array @ other)
+    
+    def __mul__(self, scalar):
+        return Matrix(self.array * float(scalar))
+    
+    __rmul__ = __mul__
+    
+    def __neg__(self):
+        return Matrix(-self.array)
+    
+    def __repr__(self):
+        rows, cols = self.shape
+        return f"Matrix({rows}x{cols})"
+
+def as_array(matrix):
+    """
+    Obtiene los datos de una matriz como ndarray bidimensional de float64.
+    No copia los datos si la matriz ya es una Matrix o un ndarray de float64.
+    
+    Una SparseMatrix se convierte a su forma densa.
     
     Args:
-        matrix: La matriz a mostrar
-        precision: Precisión decimal para números de punto flotante
+        matrix: Matrix, SparseMatrix, ndarray o lista de listas
+    
+    Returns:
+        ndarray: Los datos de la matriz (no deben modificarse)
     """
-    if not matrix:
-        print("Matriz vacía")
-        return
+    if isinstance(matrix, Matrix):
+        return matrix.array
+    array = np.asarray(matrix, dtype=np.float64)
+    if array.size == 0:
+        return array.reshape(0, 0)
+    if array.ndim != 2:
+        raise ValueError("Una matriz debe ser bidimensional")
+    return array
+
+# Niveles de detalle para el registro de pasos
+TRACE_NONE = 'none'
+TRACE_SUMMARY = 'summary'
+TRACE_FULL = 'full'
+TRACE_LEVELS = (TRACE_NONE, TRACE_SUMMARY, TRACE_FULL)
+
+class StepTracer:
+    """
+    Registra los pasos de un cálculo según un nivel de detalle.
+    
+    Los pasos se guardan como una plantilla y sus argumentos; el texto solo se
+    genera cuando se solicita con render(), o al momento si se indica un
+    flujo de salida (modo consola). Los algoritmos informan además de su
+    avance con progress(), en cualquier nivel.
+    
+    Niveles:
+        none: no se registra nada ni se realiza trabajo de formato
+        summary: encabezados, operaciones de fila y resultados principales
+        full: además, cálculos elemento por elemento e instantáneas de la matriz
+    """
+    
+    def __init__(self, level=TRACE_FULL, stream=None, on_progress=None):
+        """
+        Args:
+            level: Nivel de detalle ('none', 'summary' o 'full')
+            stream: Flujo donde escribir cada paso al registrarlo (opcional)
+            on_progress: Función que recibe (completados, total) en cada
+                         llamada a progress() (opcional)
+        """
+        if level not in TRACE_LEVELS:
+            raise ValueError(f"Nivel de pasos desconocido: {level}")
+        self.level = level
+        self.stream = stream
+        self.on_progress = on_progress
+        self.summary = level != TRACE_NONE
+        self.full = level == TRACE_FULL
+        self._events = []
+    
+    def step(self, template, *args, detail=False):
+        """
+        Registra un paso. El formato se aplica de forma diferida.
+        
+        Args:
+            template: Cadena con campos de str.format, o una función que
+                      recibe los argumentos y devuelve el texto
+            *args: Argumentos para la plantilla
+            detail: Si el paso solo se registra en el nivel 'full'
+        """
+        if not (self.full if detail else self.summary):
+            return
+        if self.stream is not None:
+            self.stream.write(_render_step(template, args) + "\n")
+        else:
+            self._events.append((template, args))
+    
+    def progress(self, done, total):
+        """
+        Informa del avance del cálculo, por ejemplo al empezar cada columna
+        pivote de una eliminación.
+        
+        Args:
+            done: Unidades de trabajo completadas
+            total: Unidades de trabajo en total
+        """
+        if self.on_progress is not None:
+            self.on_progress(done, total)
+    
+    def matrix(self, matrix, detail=True):
+        """
+        Registra una instantánea de la matriz en su estado actual.
+        
+        Args:
+            matrix: La matriz a registrar (se copia, porque puede seguir cambiando)
+            detail: Si la instantánea solo se registra en el nivel 'full'
+        """
+        if not (self.full if detail else self.summary):
+            return
+        self.step(format_matrix, np.array(matrix, dtype=np.float64), detail=detail)
+    
+    def render(self):
+        """
+        Genera el texto de todos los pasos registrados.
+        
+        Returns:
+            str: Los pasos, uno por línea
+        """
+        return "".join(_render_step(template, args) + "\n" for template, args in self._events)
+
+def _render_step(template, args):
+    """
+    Genera el texto de un paso registrado.
+    """
+    if callable(template):
+        return template(*args)
+    return template.format(*args) if args else template
+
+# Registro de pasos activo en el contexto actual (hilo, tarea o petición)
+_active_tracer = contextvars.ContextVar('active_tracer', default=None)
+# Flujo al que capture_steps envía los pasos en el contexto actual, en lugar
+# de guardarlos (ver stream_steps)
+_step_stream = contextvars.ContextVar('step_stream', default=None)
+
+@contextlib.contextmanager
+def capture_steps(level=TRACE_FULL):
+    """
+    Registra los pasos de los cálculos realizados dentro del bloque.
+    
+    El registro queda asociado al contexto actual mediante contextvars, por lo
+    que hilos o peticiones concurrentes nunca mezclan sus pasos.
+    
+    Args:
+        level: Nivel de detalle ('none', 'summary' o 'full')
         
+    Returns:
+        StepTracer: El registro activo mientras dure el bloque
+    """
+    tracer = StepTracer(level, stream=_step_stream.get())
+    token = _active_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _active_tracer.reset(token)
+
+@contextlib.contextmanager
+def stream_steps(stream):
+    """
+    Dentro del bloque, los registros creados por capture_steps escriben cada
+    paso en el flujo al registrarlo, en lugar de guardarlos para render()
+    (que devuelve entonces una cadena vacía).
+    
+    Args:
+        stream: Objeto con un método write(texto)
+    """
+    token = _step_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _step_stream.reset(token)
+
+def _resolve_tracer(tracer):
+    """
+    Devuelve el registro de pasos a usar: el explícito, el activo en el
+    contexto actual o, en su defecto, uno que escribe en la salida estándar
+    como la calculadora de consola.
+    """
+    if tracer is None:
+        tracer = _active_tracer.get()
+    if tracer is None:
+        return StepTracer(TRACE_FULL, stream=sys.stdout)
+    return tracer
+
+def format_matrix(matrix, precision=4):
+    """
+    Genera el texto de una matriz en un formato legible.
+    
+    Args:
+        matrix: La matriz a formatear
+        precision: Precisión decimal para números de punto flotante
+    
+    Returns:
+        str: La matriz formateada, con una línea en blanco antes y después
+    """
+    if not len(matrix):
+        return "Matriz vacía"
+    
     # Encuentra el ancho máximo necesario para cada columna
     max_widths = []
     for j in range(len(matrix[0])):
         col_width = max(len(f"{round(matrix[i][j], precision):.{precision}f}") for i in range(len(matrix)))
         max_widths.append(col_width)
     
-    # Imprime la matriz con formato adecuado
-    print()
+    lines = [""]
     for i in range(len(matrix)):
-        print("  [", end="")
+        line = "  ["
         for j in range(len(matrix[i])):
             num = matrix[i][j]
             # Formatea números como enteros si son números enteros
             if abs(num - round(num)) < 1e-10:
-                formatted = f"{int(num):>{max_widths[j]}}"
+                formatted = f"{int(round(num)):>{max_widths[j]}}"
             else:
                 formatted = f"{num:>{max_widths[j]}.{precision}f}"
-            print(f" {formatted}", end="")
-        print(" ]")
-    print()
+            line += f" {formatted}"
+        lines.append(line + " ]")
+    lines.append("")
+    return "\n".join(lines)
+
+def print_matrix(matrix, precision=4):
+    """
+    Muestra una matriz en un formato legible.
+    
+    Args:
+        matrix: La matriz a mostrar
+        precision: Precisión decimal para números de punto flotante
+    """
+    print(format_matrix(matrix, precision))
 
 def get_integer_input(prompt, min_val=None, max_val=None):
     """
@@ -81,16 +355,23 @@ def get_float_input(prompt):
         except ValueError:
             print("Error: Por favor ingrese un número válido.")
 
-def input_matrix():
+# Dimensión máxima de una matriz ingresada elemento por elemento en la consola
+# (las matrices grandes se importan desde archivos, ver matrix_io)
+MAX_INPUT_DIMENSION = 10
+
+def input_matrix(max_dimension=MAX_INPUT_DIMENSION):
     """
     Toma la entrada del usuario para crear una matriz.
     
+    Args:
+        max_dimension: Número máximo de filas y de columnas
+    
     Returns:
         Una lista 2D que representa la matriz
     """
-    print("\nIngrese las dimensiones de la matriz (1-4):")
-    rows = get_integer_input("Número de filas: ", 1, 4)
-    cols = get_integer_input("Número de columnas: ", 1, 4)
+    print(f"\nIngrese las dimensiones de la matriz (1-{max_dimension}):")
+    rows = get_integer_input("Número de filas: ", 1, max_dimension)
+    cols = get_integer_input("Número de columnas: ", 1, max_dimension)
     
     matrix = []
     print(f"\nIngrese los elementos de la matriz {rows}x{cols}:")
@@ -116,168 +397,406 @@ def get_matrix_dimensions(matrix):
     Returns:
         Una tupla (filas, columnas)
     """
+    shape = getattr(matrix, 'shape', None)
+    if shape is not None:
+        return shape[0], shape[1]
     rows = len(matrix)
     cols = len(matrix[0]) if rows > 0 else 0
     return rows, cols
 
-def add_matrices(matrix1, matrix2):
+def add_matrices(matrix1, matrix2, tracer=None):
     """
     Suma dos matrices elemento por elemento.
     
     Args:
         matrix1: Primera matriz
         matrix2: Segunda matriz
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
         
     Returns:
-        La matriz resultante o None si las dimensiones son incompatibles
+        La matriz resultante (Matrix, o SparseMatrix si ambas son dispersas)
+        o None si las dimensiones son incompatibles
     """
+    tracer = _resolve_tracer(tracer)
     rows1, cols1 = get_matrix_dimensions(matrix1)
     rows2, cols2 = get_matrix_dimensions(matrix2)
     
     if rows1 != rows2 or cols1 != cols2:
-        print(f"Error: No se pueden sumar matrices de dimensiones {rows1}x{cols1} y {rows2}x{cols2}.")
-        print("Las matrices deben tener las mismas dimensiones para la suma.")
+        tracer.step("Error: No se pueden sumar matrices de dimensiones {}x{} y {}x{}.", rows1, cols1, rows2, cols2)
+        tracer.step("Las matrices deben tener las mismas dimensiones para la suma.")
         return None
     
-    result = []
+    # Dos matrices dispersas se combinan sin densificarlas
+    if isinstance(matrix1, sparse.SparseMatrix) and isinstance(matrix2, sparse.SparseMatrix):
+        result = matrix1 + matrix2
+        tracer.step("\nSuma dispersa: {} y {} elementos no nulos, {} en el resultado", matrix1.nnz, matrix2.nnz, result.nnz)
+        return result
     
-    # Mostrar los pasos de la suma
-    print("\nPasos de la suma:")
+    A = as_array(matrix1)
+    B = as_array(matrix2)
+    result = A + B
     
-    for i in range(rows1):
-        row = []
-        for j in range(cols1):
-            element = matrix1[i][j] + matrix2[i][j]
-            calculation = f"Elemento en la posición ({i+1},{j+1}) = {matrix1[i][j]} + {matrix2[i][j]} = {element}"
-            print(calculation)
-            row.append(element)
-        result.append(row)
+    # Mostrar los pasos de la suma
+    tracer.step("\nPasos de la suma:")
+    if tracer.full:
+        for i in range(rows1):
+            for j in range(cols1):
+                tracer.step("Elemento en la posición ({},{}) = {} + {} = {}", i+1, j+1, A[i, j], B[i, j], result[i, j], detail=True)
     
-    return result
+    return Matrix(result)
 
-def subtract_matrices(matrix1, matrix2):
+def subtract_matrices(matrix1, matrix2, tracer=None):
     """
     Resta la matriz2 de la matriz1 elemento por elemento.
     
     Args:
         matrix1: Primera matriz
         matrix2: Segunda matriz
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
         
     Returns:
-        La matriz resultante o None si las dimensiones son incompatibles
+        La matriz resultante (Matrix, o SparseMatrix si ambas son dispersas)
+        o None si las dimensiones son incompatibles
     """
+    tracer = _resolve_tracer(tracer)
     rows1, cols1 = get_matrix_dimensions(matrix1)
     rows2, cols2 = get_matrix_dimensions(matrix2)
     
     if rows1 != rows2 or cols1 != cols2:
-        print(f"Error: No se pueden restar matrices de dimensiones {rows1}x{cols1} y {rows2}x{cols2}.")
-        print("Las matrices deben tener las mismas dimensiones para la resta.")
+        tracer.step("Error: No se pueden restar matrices de dimensiones {}x{} y {}x{}.", rows1, cols1, rows2, cols2)
+        tracer.step("Las matrices deben tener las mismas dimensiones para la resta.")
         return None
     
-    result = []
+    # Dos matrices dispersas se combinan sin densificarlas
+    if isinstance(matrix1, sparse.SparseMatrix) and isinstance(matrix2, sparse.SparseMatrix):
+        result = matrix1 - matrix2
+        tracer.step("\nResta dispersa: {} y {} elementos no nulos, {} en el resultado", matrix1.nnz, matrix2.nnz, result.nnz)
+        return result
+    
+    A = as_array(matrix1)
+    B = as_array(matrix2)
+    result = A - B
     
     # Mostrar los pasos de la resta
-    print("\nPasos de la resta:")
+    tracer.step("\nPasos de la resta:")
+    if tracer.full:
+        for i in range(rows1):
+            for j in range(cols1):
+                tracer.step("Elemento en la posición ({},{}) = {} - {} = {}", i+1, j+1, A[i, j], B[i, j], result[i, j], detail=True)
     
-    for i in range(rows1):
-        row = []
-        for j in range(cols1):
-            element = matrix1[i][j] - matrix2[i][j]
-            calculation = f"Elemento en la posición ({i+1},{j+1}) = {matrix1[i][j]} - {matrix2[i][j]} = {element}"
-            print(calculation)
-            row.append(element)
-        result.append(row)
+    return Matrix(result)
+
+# Métodos de multiplicación: 'auto' elige según el tamaño de los operandos
+MULTIPLY_AUTO = 'auto'
+MULTIPLY_DIRECT = 'direct'
+MULTIPLY_STRASSEN = 'strassen'
+MULTIPLY_METHODS = (MULTIPLY_AUTO, MULTIPLY_DIRECT, MULTIPLY_STRASSEN)
+# Dimensión mínima (filas, columnas e interna) a partir de la cual 'auto' usa
+# Strassen-Winograd. Con una BLAS optimizada el producto directo ya trabaja por
+# bloques adaptados a la caché y es más rápido hasta tamaños muy grandes.
+STRASSEN_THRESHOLD = 8192
+# Tamaño por debajo del cual la recursión de Strassen pasa al producto directo
+STRASSEN_LEAF_SIZE = 1024
+
+def _strassen_matmul(A, B, leaf_size):
+    """
+    Producto de matrices con la variante de Winograd del algoritmo de Strassen
+    (7 productos y 15 sumas por nivel). Las dimensiones impares se completan
+    con ceros y los bloques pequeños se multiplican directamente.
+    """
+    n, m = A.shape
+    p = B.shape[1]
+    if min(n, m, p) <= leaf_size:
+        return A @ B
+    if n % 2 or m % 2 or p % 2:
+        A = np.pad(A, ((0, n % 2), (0, m % 2)))
+        B = np.pad(B, ((0, m % 2), (0, p % 2)))
+        return _strassen_matmul(A, B, leaf_size)[:n, :p]
+    
+    h, k, q = n // 2, m // 2, p // 2
+    A11, A12, A21, A22 = A[:h, :k], A[:h, k:], A[h:, :k], A[h:, k:]
+    B11, B12, B21, B22 = B[:k, :q], B[:k, q:], B[k:, :q], B[k:, q:]
+    
+    S1 = A21 + A22
+    S2 = S1 - A11
+    S3 = A11 - A21
+    S4 = A12 - S2
+    T1 = B12 - B11
+    T2 = B22 - T1
+    T3 = B22 - B12
+    T4 = T2 - B21
+    
+    M1 = _strassen_matmul(A11, B11, leaf_size)
+    M2 = _strassen_matmul(A12, B21, leaf_size)
+    M3 = _strassen_matmul(S4, B22, leaf_size)
+    M4 = _strassen_matmul(A22, T4, leaf_size)
+    M5 = _strassen_matmul(S1, T1, leaf_size)
+    M6 = _strassen_matmul(S2, T2, leaf_size)
+    M7 = _strassen_matmul(S3, T3, leaf_size)
+    
+    C = np.empty((n, p))
+    U2 = M1 + M6
+    U3 = U2 + M7
+    np.add(M1, M2, out=C[:h, :q])
+    np.add(U2 + M5, M3, out=C[:h, q:])
+    np.subtract(U3, M4, out=C[h:, :q])
+    np.add(U3, M5, out=C[h:, q:])
+    return C
+
+def matmul(A, B, method=MULTIPLY_AUTO):
+    """
+    Motor de multiplicación de matrices sin registro de pasos.
     
-    return result
+    'direct' usa el producto de NumPy (BLAS, que ya recorre los operandos por
+    bloques adaptados a la caché); 'strassen' usa Strassen-Winograd sobre
+    bloques; 'auto' elige Strassen solo si todas las dimensiones alcanzan
+    STRASSEN_THRESHOLD.
+    
+    Args:
+        A: Primera matriz (ndarray o Matrix)
+        B: Segunda matriz, con tantas filas como columnas tiene A
+        method: Uno de MULTIPLY_METHODS
+    
+    Returns:
+        El producto (ndarray)
+    """
+    if method not in MULTIPLY_METHODS:
+        raise ValueError(f"Método de multiplicación desconocido: {method}")
+    A = as_array(A)
+    B = as_array(B)
+    if method == MULTIPLY_AUTO:
+        large = min(A.shape[0], A.shape[1], B.shape[1]) >= STRASSEN_THRESHOLD
+        method = MULTIPLY_STRASSEN if large else MULTIPLY_DIRECT
+    if method == MULTIPLY_STRASSEN:
+        return _strassen_matmul(A, B, STRASSEN_LEAF_SIZE)
+    return A @ B
+
+def _format_product_step(i, j, row, col, element):
+    """
+    Genera el texto del cálculo de un elemento del producto de matrices.
+    """
+    terms = " + ".join(f"{a} * {b}" for a, b in zip(row, col))
+    return f"Elemento en la posición ({i+1},{j+1}) = {terms} = {element}"
 
-def multiply_matrices(matrix1, matrix2):
+def multiply_matrices(matrix1, matrix2, tracer=None, method=MULTIPLY_AUTO):
     """
     Multiplica dos matrices.
     
     Args:
         matrix1: Primera matriz
         matrix2: Segunda matriz
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
+        method: Método de multiplicación (ver matmul); por defecto se elige según el tamaño
         
     Returns:
-        La matriz resultante o None si las dimensiones son incompatibles
+        La matriz resultante (Matrix, o SparseMatrix si ambas son dispersas)
+        o None si las dimensiones son incompatibles
     """
+    tracer = _resolve_tracer(tracer)
     rows1, cols1 = get_matrix_dimensions(matrix1)
     rows2, cols2 = get_matrix_dimensions(matrix2)
     
     if cols1 != rows2:
-        print(f"Error: No se pueden multiplicar matrices de dimensiones {rows1}x{cols1} y {rows2}x{cols2}.")
-        print("Para la multiplicación de matrices, el número de columnas en la primera matriz debe ser igual al número de filas en la segunda matriz.")
+        tracer.step("Error: No se pueden multiplicar matrices de dimensiones {}x{} y {}x{}.", rows1, cols1, rows2, cols2)
+        tracer.step("Para la multiplicación de matrices, el número de columnas en la primera matriz debe ser igual al número de filas en la segunda matriz.")
         return None
     
-    result = []
-    print("\nPasos de la multiplicación:")
+    # Con un operando disperso solo se recorren sus elementos no nulos
+    if isinstance(matrix1, sparse.SparseMatrix) or isinstance(matrix2, sparse.SparseMatrix):
+        result = matrix1 @ matrix2
+        tracer.step("\nMultiplicación dispersa de matrices {}x{} y {}x{}", rows1, cols1, rows2, cols2)
+        return result if isinstance(result, sparse.SparseMatrix) else Matrix(result)
     
-    for i in range(rows1):
-        row = []
-        for j in range(cols2):
-            element = 0
-            calculation = f"Elemento en la posición ({i+1},{j+1}) = "
-            for k in range(cols1):
-                element += matrix1[i][k] * matrix2[k][j]
-                calculation += f"{matrix1[i][k]} * {matrix2[k][j]}"
-                if k < cols1 - 1:
-                    calculation += " + "
-            calculation += f" = {element}"
-            print(calculation)
-            row.append(element)
-        result.append(row)
+    A = as_array(matrix1)
+    B = as_array(matrix2)
+    result = matmul(A, B, method)
     
-    return result
+    tracer.step("\nPasos de la multiplicación:")
+    if tracer.full:
+        # Las filas y columnas se guardan como vistas; el texto se genera al mostrar los pasos
+        for i in range(rows1):
+            for j in range(cols2):
+                tracer.step(_format_product_step, i, j, A[i], B[:, j], result[i, j], detail=True)
+    
+    return Matrix(result)
+    
+def _find_pivot_row(A, col, start):
+    """
+    Encuentra la fila con el mayor valor absoluto en la columna indicada,
+    a partir de la fila `start` (pivoteo parcial).
+    """
+    return start + int(np.argmax(np.abs(A[start:, col])))
+
+def _swap_rows(A, i, j):
+    """
+    Intercambia dos filas de un ndarray en su lugar.
+    """
+    A[[i, j]] = A[[j, i]]
+
+def _eliminate_rows(A, pivot_index, tracer, below_only=True, start=0, detail=False):
+    """
+    Resta a cada fila el múltiplo de la fila pivote que anula su elemento en
+    la columna del pivote.
+    
+    Sin registro de pasos, todas las filas se actualizan a la vez con un
+    producto exterior; con registro, fila por fila para mostrar cada operación.
+    En ambos casos se aplican las mismas operaciones, de modo que el resultado
+    no depende del nivel de detalle: los factores despreciables solo se omiten
+    del registro.
+    
+    Args:
+        A: ndarray a modificar en su lugar
+        pivot_index: Índice de la fila (y columna) del pivote
+        tracer: Registro de pasos (StepTracer)
+        below_only: Si solo se eliminan las filas debajo del pivote (eliminación
+                    gaussiana) o todas las demás (Gauss-Jordan)
+        start: Primera columna a actualizar
+        detail: Si las operaciones de fila solo se registran en el nivel 'full'
+    """
+    i = pivot_index
+    rows = A.shape[0]
+    
+    if not (tracer.full if detail else tracer.summary):
+        if below_only:
+            factors = A[i+1:, i] / A[i, i]
+            A[i+1:, start:] -= np.outer(factors, A[i, start:])
+        else:
+            factors = A[:, i] / A[i, i]
+            factors[i] = 0.0
+            A[:, start:] -= np.outer(factors, A[i, start:])
+        return
+    
+    targets = range(i + 1, rows) if below_only else (j for j in range(rows) if j != i)
+    for j in targets:
+        factor = A[j, i] / A[i, i]
+        A[j, start:] -= factor * A[i, start:]
+        if abs(factor) < 1e-10:
+            continue
+        tracer.step("F{} = F{} - {:.4f} * F{}", j+1, j+1, factor, i+1, detail=detail)
+        tracer.matrix(A)
+
+# Métodos disponibles para calcular el determinante
+DETERMINANT_LU = 'lu'
+DETERMINANT_COFACTOR = 'cofactor'
+DETERMINANT_METHODS = (DETERMINANT_LU, DETERMINANT_COFACTOR)
 
-def determinant(matrix):
+def determinant(matrix, tracer=None, method=DETERMINANT_LU):
     """
-    Calcula el determinante de una matriz cuadrada de forma recursiva.
+    Calcula el determinante de una matriz cuadrada.
+    
+    Por defecto usa eliminación con pivoteo parcial (factorización LU), de
+    costo O(n^3): el determinante es el producto de los pivotes, con el signo
+    cambiado por cada intercambio de filas. La expansión por cofactores, de
+    costo O(n!), se mantiene como modo didáctico.
     
     Args:
         matrix: La matriz cuadrada
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
+        method: 'lu' (eliminación) o 'cofactor' (expansión por cofactores)
         
     Returns:
         El valor del determinante o None si la matriz no es cuadrada
     """
+    if method not in DETERMINANT_METHODS:
+        raise ValueError(f"Método de determinante desconocido: {method}")
+    
+    tracer = _resolve_tracer(tracer)
     rows, cols = get_matrix_dimensions(matrix)
     
     if rows != cols:
-        print(f"Error: No se puede calcular el determinante de una matriz {rows}x{cols}.")
-        print("La matriz debe ser cuadrada para calcular el determinante.")
+        tracer.step("Error: No se puede calcular el determinante de una matriz {}x{}.", rows, cols)
+        tracer.step("La matriz debe ser cuadrada para calcular el determinante.")
         return None
     
+    if method == DETERMINANT_COFACTOR:
+        return float(_cofactor_determinant(as_array(matrix), tracer))
+    
+    n = rows
+    # Crea una copia de la matriz para no modificar la original
+    A = np.array(as_array(matrix))
+    sign = 1
+    tolerances = _pivot_tolerances(A)
+    
+    tracer.step("\nCalculando determinante por eliminación con pivoteo parcial:")
+    tracer.matrix(A)
+    
+    for i in range(n):
+        tracer.progress(i, n)
+        # Encuentra la fila pivote (mayor valor absoluto en la columna)
+        max_row = _find_pivot_row(A, i, i)
+        
+        # Cada intercambio de filas cambia el signo del determinante
+        if max_row != i:
+            _swap_rows(A, i, max_row)
+            sign = -sign
+            tracer.step("Intercambiar filas {} y {} (el signo del determinante cambia):", i+1, max_row+1)
+            tracer.matrix(A)
+        
+        pivot = A[i, i]
+        if abs(pivot) <= tolerances[i]:
+            tracer.step("La columna {} no tiene pivote no nulo: la matriz es singular.", i+1)
+            tracer.step("Determinante final = 0")
+            return 0.0
+        
+        tracer.step("Pivote {}: {:.4f}", i+1, pivot)
+        
+        # Elimina los elementos debajo del pivote
+        _eliminate_rows(A, i, tracer, start=i, detail=True)
+    
+    pivots = np.diagonal(A)
+    det = float(sign * np.prod(pivots))
+    
+    if tracer.summary:
+        tracer.step(_format_pivot_product, sign, pivots.tolist(), det)
+    return det
+
+def _format_pivot_product(sign, pivots, det):
+    """
+    Genera el texto del determinante como producto de los pivotes.
+    """
+    product = " * ".join(f"{pivot:.4f}" for pivot in pivots)
+    sign_text = "" if sign > 0 else "-"
+    return f"Determinante final = {sign_text}({product}) = {det}"
+
+def _cofactor_determinant(matrix, tracer):
+    """
+    Calcula el determinante por expansión recursiva a lo largo de la primera fila.
+    
+    Args:
+        matrix: La matriz cuadrada (ndarray)
+        tracer: Registro de pasos (StepTracer)
+    
+    Returns:
+        El valor del determinante
+    """
+    rows, cols = matrix.shape
+    
     # Caso base: matriz 1x1
     if rows == 1:
-        return matrix[0][0]
+        return matrix[0, 0]
     
     # Caso base: matriz 2x2
     if rows == 2:
-        det = matrix[0][0] * matrix[1][1] - matrix[0][1] * matrix[1][0]
-        print(f"\nDeterminante de matriz 2x2 = ({matrix[0][0]} * {matrix[1][1]}) - ({matrix[0][1]} * {matrix[1][0]}) = {det}")
+        det = matrix[0, 0] * matrix[1, 1] - matrix[0, 1] * matrix[1, 0]
+        tracer.step("\nDeterminante de matriz 2x2 = ({} * {}) - ({} * {}) = {}", matrix[0, 0], matrix[1, 1], matrix[0, 1], matrix[1, 0], det, detail=True)
         return det
     
     # Caso recursivo: expandir a lo largo de la primera fila
     det = 0
-    print("\nCalculando determinante por expansión a lo largo de la primera fila:")
+    tracer.step("\nCalculando determinante por expansión a lo largo de la primera fila:", detail=True)
     
     for j in range(cols):
         # Crear submatriz excluyendo primera fila y columna actual
-        submatrix = []
-        for i in range(1, rows):
-            row = []
-            for k in range(cols):
-                if k != j:
-                    row.append(matrix[i][k])
-            submatrix.append(row)
+        submatrix = get_minor(matrix, 0, j)
         
         # Calcular cofactor
         sign = 1 if j % 2 == 0 else -1
-        subdet = determinant(submatrix)
-        det += sign * matrix[0][j] * subdet
+        subdet = _cofactor_determinant(submatrix, tracer)
+        det += sign * matrix[0, j] * subdet
         
-        print(f"Término {j+1}: {sign} * {matrix[0][j]} * {subdet} = {sign * matrix[0][j] * subdet}")
+        tracer.step("Término {}: {} * {} * {} = {}", j+1, sign, matrix[0, j], subdet, sign * matrix[0, j] * subdet, detail=True)
     
-    print(f"Determinante final = {det}")
+    tracer.step("Determinante final = {}", det)
     return det
 
 def get_minor(matrix, row, col):
@@ -290,19 +809,21 @@ def get_minor(matrix, row, col):
         col: La columna a excluir
         
     Returns:
-        La matriz menor (con fila y columna eliminadas)
+        La matriz menor (ndarray con fila y columna eliminadas)
     """
-    minor = []
-    for i in range(len(matrix)):
-        if i != row:
-            minor_row = []
-            for j in range(len(matrix[0])):
-                if j != col:
-                    minor_row.append(matrix[i][j])
-            minor.append(minor_row)
-    return minor
+    A = as_array(matrix)
+    return np.delete(np.delete(A, row, axis=0), col, axis=1)
 
-def gaussian_elimination(matrix, b=None, show_steps=True):
+def _augment(matrix, b):
+    """
+    Crea una copia de la matriz como ndarray, aumentada con el vector b si se proporciona.
+    """
+    A = as_array(matrix)
+    if b is None:
+        return np.array(A)
+    return np.column_stack([A, np.asarray(b, dtype=np.float64)])
+
+def gaussian_elimination(matrix, b=None, show_steps=True, tracer=None):
     """
     Aplica eliminación gaussiana para transformar una matriz a forma escalonada.
     
@@ -310,125 +831,101 @@ def gaussian_elimination(matrix, b=None, show_steps=True):
         matrix: La matriz de coeficientes a transformar
         b: El vector de términos independientes (opcional)
         show_steps: Si se deben mostrar los pasos
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
         
     Returns:
-        La matriz en forma escalonada y el vector b transformado
+        La matriz en forma escalonada (Matrix) y el vector b transformado (ndarray)
     """
+    tracer = _resolve_tracer(tracer) if show_steps else StepTracer(TRACE_NONE)
     rows, cols = get_matrix_dimensions(matrix)
-    # Crea una copia profunda de la matriz
-    A = [row[:] for row in matrix]
+    # Crea una copia de la matriz, aumentada si se proporciona b
+    A = _augment(matrix, b)
     
-    # Crea la matriz aumentada si se proporciona b
+    tracer.step("\nIniciando Eliminación Gaussiana:")
     if b is not None:
-        for i in range(rows):
-            A[i].append(b[i])
-        cols += 1
-    
-    if show_steps:
-        print("\nIniciando Eliminación Gaussiana:")
-        if b is not None:
-            print("Matriz aumentada:")
-        print_matrix(A)
+        tracer.step("Matriz aumentada:")
+    tracer.matrix(A, detail=False)
     
     # Eliminación hacia adelante
-    for i in range(rows):
+    for i in range(min(rows, cols)):
+        tracer.progress(i, min(rows, cols))
         # Encuentra la fila pivote
-        max_row = i
-        for k in range(i + 1, rows):
-            if abs(A[k][i]) > abs(A[max_row][i]):
-                max_row = k
+        max_row = _find_pivot_row(A, i, i)
         
         # Intercambia la fila actual con la fila pivote si es necesario
         if max_row != i:
-            A[i], A[max_row] = A[max_row], A[i]
-            if show_steps:
-                print(f"Intercambiar filas {i+1} y {max_row+1}:")
-                print_matrix(A)
+            _swap_rows(A, i, max_row)
+            tracer.step("Intercambiar filas {} y {}:", i+1, max_row+1)
+            tracer.matrix(A)
         
         # Omite si el pivote es cero (matriz singular)
-        if abs(A[i][i]) < 1e-10:
+        if abs(A[i, i]) < 1e-10:
             continue
         
         # Elimina todas las filas debajo
-        for j in range(i + 1, rows):
-            try:
-                factor = A[j][i] / A[i][i]
-            except ZeroDivisionError:
-                if show_steps:
-                    print(f"Pivote en la posición ({i+1},{i+1}) es cero, omitiendo eliminación para esta columna.")
-                continue
-                
-            if show_steps and abs(factor) > 1e-10:
-                print(f"F{j+1} = F{j+1} - {factor:.4f} * F{i+1}")
-                
-            for k in range(i, cols):
-                A[j][k] -= factor * A[i][k]
-                
-            if show_steps and abs(factor) > 1e-10:
-                print_matrix(A)
+        _eliminate_rows(A, i, tracer, start=i)
     
     # Extrae el vector b transformado si fue proporcionado
     if b is not None:
-        b_new = [row[-1] for row in A]
-        for i in range(rows):
-            A[i].pop()  # Elimina la última columna
-        return A, b_new
+        return Matrix(A[:, :cols]), A[:, cols].copy()
     
-    return A, None
+    return Matrix(A), None
+
+def _format_back_substitution_step(pivot_col, b_value, terms, pivot, x_value):
+    """
+    Genera el texto del cálculo de una incógnita en la sustitución hacia atrás.
+    """
+    calculation = f"x{pivot_col+1} = ({b_value:.4f}"
+    for coefficient, value in terms:
+        calculation += f" - {coefficient:.4f} * {value:.4f}"
+    return calculation + f") / {pivot:.4f} = {x_value:.4f}"
 
-def back_substitution(A, b):
+def back_substitution(A, b, tracer=None):
     """
     Aplica sustitución hacia atrás para resolver el sistema Ax = b donde A está en forma escalonada.
     
     Args:
         A: La matriz de coeficientes en forma escalonada
         b: El vector de términos independientes
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
         
     Returns:
-        El vector solución x
+        El vector solución x (ndarray) o None si el sistema no tiene solución
     """
-    rows = len(A)
-    x = [0] * rows
+    tracer = _resolve_tracer(tracer)
+    A = as_array(A)
+    b = np.asarray(b, dtype=np.float64)
+    rows = A.shape[0]
+    x = np.zeros(rows)
     
-    print("\nSustitución hacia atrás:")
+    tracer.step("\nSustitución hacia atrás:")
     
     for i in range(rows - 1, -1, -1):
+        # Encontrar la columna pivote (primer elemento no nulo de la fila)
+        nonzero = np.flatnonzero(np.abs(A[i, :rows]) > 1e-10)
+        
         # Verificar si la fila es toda ceros
-        if all(abs(A[i][j]) < 1e-10 for j in range(rows)):
+        if len(nonzero) == 0:
             if abs(b[i]) < 1e-10:
-                print(f"Fila {i+1} es toda ceros con término independiente cero (soluciones infinitas).")
+                tracer.step("Fila {} es toda ceros con término independiente cero (soluciones infinitas).", i+1)
                 continue
             else:
-                print(f"Fila {i+1} es toda ceros con término independiente no nulo (sin solución).")
+                tracer.step("Fila {} es toda ceros con término independiente no nulo (sin solución).", i+1)
                 return None
         
-        # Encontrar la columna pivote
-        pivot_col = -1
-        for j in range(rows):
-            if abs(A[i][j]) > 1e-10:
-                pivot_col = j
-                break
-        
-        if pivot_col == -1:
-            continue
+        pivot_col = nonzero[0]
         
         # Calcular el valor de x[pivot_col]
-        sum_val = 0
-        calculation = f"x{pivot_col+1} = ("
-        
-        calculation += f"{b[i]:.4f}"
-        for j in range(pivot_col + 1, rows):
-            if abs(A[i][j]) > 1e-10:
-                sum_val += A[i][j] * x[j]
-                calculation += f" - {A[i][j]:.4f} * {x[j]:.4f}"
+        sum_val = A[i, pivot_col+1:rows] @ x[pivot_col+1:]
+        x[pivot_col] = (b[i] - sum_val) / A[i, pivot_col]
         
-        x[pivot_col] = (b[i] - sum_val) / A[i][pivot_col]
-        calculation += f") / {A[i][pivot_col]:.4f} = {x[pivot_col]:.4f}"
-        print(calculation)
+        if tracer.summary:
+            terms = [(A[i, j], x[j]) for j in nonzero[1:]]
+            tracer.step(_format_back_substitution_step, pivot_col, b[i], terms, A[i, pivot_col], x[pivot_col])
     
     return x
 
-def gauss_jordan_elimination(matrix, b=None, show_steps=True):
+def gauss_jordan_elimination(matrix, b=None, show_steps=True, tracer=None):
     """
     Aplica eliminación Gauss-Jordan para transformar una matriz a forma escalonada reducida.
     
@@ -436,280 +933,497 @@ def gauss_jordan_elimination(matrix, b=None, show_steps=True):
         matrix: La matriz de coeficientes a transformar
         b: El vector de términos independientes (opcional)
         show_steps: Si se deben mostrar los pasos
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
         
     Returns:
-        La matriz en forma escalonada reducida y el vector b transformado
+        La matriz en forma escalonada reducida (Matrix) y el vector b transformado (ndarray)
     """
+    tracer = _resolve_tracer(tracer) if show_steps else StepTracer(TRACE_NONE)
     rows, cols = get_matrix_dimensions(matrix)
-    # Crea una copia profunda de la matriz
-    A = [row[:] for row in matrix]
+    # Crea una copia de la matriz, aumentada si se proporciona b
+    A = _augment(matrix, b)
     
-    # Crea la matriz aumentada si se proporciona b
+    tracer.step("\nIniciando Eliminación Gauss-Jordan:")
     if b is not None:
-        for i in range(rows):
-            A[i].append(b[i])
-        cols += 1
-    
-    if show_steps:
-        print("\nIniciando Eliminación Gauss-Jordan:")
-        if b is not None:
-            print("Matriz aumentada:")
-        print_matrix(A)
+        tracer.step("Matriz aumentada:")
+    tracer.matrix(A, detail=False)
     
     # Eliminación hacia adelante (similar a la eliminación gaussiana)
-    for i in range(rows):
+    for i in range(min(rows, cols)):
+        tracer.progress(i, min(rows, cols))
         # Encuentra la fila pivote
-        max_row = i
-        for k in range(i + 1, rows):
-            if abs(A[k][i]) > abs(A[max_row][i]):
-                max_row = k
+        max_row = _find_pivot_row(A, i, i)
         
         # Intercambia la fila actual con la fila pivote si es necesario
         if max_row != i:
-            A[i], A[max_row] = A[max_row], A[i]
-            if show_steps:
-                print(f"Intercambiar filas {i+1} y {max_row+1}:")
-                print_matrix(A)
+            _swap_rows(A, i, max_row)
+            tracer.step("Intercambiar filas {} y {}:", i+1, max_row+1)
+            tracer.matrix(A)
         
         # Omite si el pivote es cero (matriz singular)
-        if abs(A[i][i]) < 1e-10:
+        if abs(A[i, i]) < 1e-10:
             continue
         
         # Escalar la fila pivote para hacer el pivote 1
-        pivot = A[i][i]
-        for j in range(i, cols):
-            A[i][j] /= pivot
+        pivot = A[i, i]
+        A[i, i:] /= pivot
         
-        if show_steps:
-            print(f"F{i+1} = F{i+1} / {pivot:.4f}")
-            print_matrix(A)
+        tracer.step("F{} = F{} / {:.4f}", i+1, i+1, pivot)
+        tracer.matrix(A)
         
         # Eliminar todas las demás filas
-        for j in range(rows):
-            if j != i:
-                factor = A[j][i]
-                if abs(factor) < 1e-10:
-                    continue
-                    
-                if show_steps:
-                    print(f"F{j+1} = F{j+1} - {factor:.4f} * F{i+1}")
-                
-                for k in range(i, cols):
-                    A[j][k] -= factor * A[i][k]
-                
-                if show_steps:
-                    print_matrix(A)
+        _eliminate_rows(A, i, tracer, below_only=False, start=i)
     
     # Extrae el vector b transformado si fue proporcionado
     if b is not None:
-        b_new = [row[-1] for row in A]
-        for i in range(rows):
-            A[i].pop()  # Elimina la última columna
-        return A, b_new
+        return Matrix(A[:, :cols]), A[:, cols].copy()
+    
+    return Matrix(A), None
+
+# Tolerancia relativa para considerar nulo un pivote (ver _pivot_tolerances)
+SINGULAR_TOLERANCE = 1e-12
+# Número de condición a partir del cual se advierte que la inversa es imprecisa
+ILL_CONDITIONED_THRESHOLD = 1e12
+
+def _pivot_tolerances(A):
+    """
+    Tolerancia de los pivotes de cada columna: un pivote cuyo valor absoluto no
+    la supera se considera nulo y la matriz, singular.
+    
+    Es relativa a la escala de cada columna, para que una matriz bien
+    condicionada de valores pequeños, o con columnas de escalas muy distintas,
+    no se tome por singular. determinant, calculate_inverse y lu_factorization
+    usan este mismo criterio, así que coinciden en qué matrices son singulares.
+    
+    Args:
+        A: La matriz original (ndarray)
+    
+    Returns:
+        ndarray: Una tolerancia por columna
+    """
+    if A.size == 0:
+        return np.zeros(A.shape[1])
+    return SINGULAR_TOLERANCE * np.abs(A).max(axis=0)
+
+def matrix_norm_1(matrix):
+    """
+    Calcula la norma 1 de una matriz (máxima suma absoluta por columnas).
+    
+    Args:
+        matrix: La matriz
     
-    return A, None
+    Returns:
+        El valor de la norma
+    """
+    A = as_array(matrix)
+    if A.size == 0:
+        return 0.0
+    return float(np.abs(A).sum(axis=0).max())
 
-def calculate_inverse(matrix):
+def condition_number(matrix, inverse):
+    """
+    Calcula el número de condición en norma 1, ||A|| * ||A^-1||, a partir de
+    una inversa ya calculada (costo O(n^2)).
+    
+    Args:
+        matrix: La matriz cuadrada A
+        inverse: Su inversa
+    
+    Returns:
+        El número de condición (1 para matrices perfectamente condicionadas)
+    """
+    return matrix_norm_1(matrix) * matrix_norm_1(inverse)
+
+def calculate_inverse(matrix, tracer=None):
     """
     Calcula la inversa de una matriz cuadrada usando eliminación Gauss-Jordan.
     
+    La singularidad se detecta durante el pivoteo, en una sola pasada O(n^3):
+    un pivote despreciable frente a la escala de la matriz indica que no hay
+    inversa. Al terminar se estima el número de condición para advertir si la
+    matriz es casi singular.
+    
     Args:
         matrix: La matriz cuadrada a invertir
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
         
     Returns:
-        La matriz inversa o None si la matriz es singular o no cuadrada
+        La matriz inversa (Matrix) o None si la matriz es singular o no cuadrada
     """
+    tracer = _resolve_tracer(tracer)
     rows, cols = get_matrix_dimensions(matrix)
     
     if rows != cols:
-        print(f"Error: No se puede calcular la inversa de una matriz {rows}x{cols}.")
-        print("La matriz debe ser cuadrada para calcular la inversa.")
+        tracer.step("Error: No se puede calcular la inversa de una matriz {}x{}.", rows, cols)
+        tracer.step("La matriz debe ser cuadrada para calcular la inversa.")
         return None
     
-    # Verificar el determinante
-    det = determinant(matrix)
-    if abs(det) < 1e-10:
-        print("Error: La matriz es singular (determinante es cero), por lo que no tiene inversa.")
+    n = rows
+    original = as_array(matrix)
+    if not np.any(original):
+        tracer.step("Error: La matriz es nula, por lo que no tiene inversa.")
         return None
+    tolerances = _pivot_tolerances(original)
     
-    # Crear una matriz identidad del mismo tamaño
-    identity = []
-    for i in range(rows):
-        row = []
-        for j in range(rows):
-            row.append(1 if i == j else 0)
-        identity.append(row)
-    
-    print("\nCalculando inversa usando eliminación Gauss-Jordan")
-    print("Matriz original (A):")
-    print_matrix(matrix)
-    print("Matriz identidad (I):")
-    print_matrix(identity)
+    tracer.step("\nCalculando inversa usando eliminación Gauss-Jordan")
+    tracer.step("Matriz original (A):")
+    tracer.matrix(original, detail=False)
     
     # Aumentar la matriz con la identidad
-    A = [row[:] for row in matrix]
-    for i in range(rows):
-        A[i].extend(identity[i])
+    A = np.hstack([original, np.eye(n)])
     
-    print("Matriz aumentada [A|I]:")
-    print_matrix(A)
+    tracer.step("Matriz aumentada [A|I]:", detail=True)
+    tracer.matrix(A)
     
     # Aplicar eliminación Gauss-Jordan
-    n = rows
     for i in range(n):
+        tracer.progress(i, n)
         # Encontrar el elemento pivote máximo
-        max_row = i
-        for k in range(i + 1, n):
-            if abs(A[k][i]) > abs(A[max_row][i]):
-                max_row = k
+        max_row = _find_pivot_row(A, i, i)
         
         # Intercambiar filas si es necesario
         if max_row != i:
-            A[i], A[max_row] = A[max_row], A[i]
-            print(f"Intercambiar filas {i+1} y {max_row+1}:")
-            print_matrix(A)
+            _swap_rows(A, i, max_row)
+            tracer.step("Intercambiar filas {} y {}:", i+1, max_row+1)
+            tracer.matrix(A)
         
-        # Verificar singularidad
-        if abs(A[i][i]) < 1e-10:
-            print("Error: La matriz es singular, la inversa no existe.")
+        # Verificar singularidad: ningún pivote utilizable en esta columna
+        if abs(A[i, i]) <= tolerances[i]:
+            tracer.step("Error: La matriz es singular (sin pivote no nulo en la columna {}), la inversa no existe.", i+1)
             return None
         
         # Escalar la fila pivote para hacer el pivote 1
-        pivot = A[i][i]
-        for j in range(2*n):
-            A[i][j] /= pivot
+        pivot = A[i, i]
+        A[i] /= pivot
         
-        print(f"F{i+1} = F{i+1} / {pivot:.4f}")
-        print_matrix(A)
+        tracer.step("F{} = F{} / {:.4f}", i+1, i+1, pivot)
+        tracer.matrix(A)
         
         # Eliminar todas las demás filas
-        for j in range(n):
-            if j != i:
-                factor = A[j][i]
-                if abs(factor) < 1e-10:
-                    continue
-                
-                print(f"F{j+1} = F{j+1} - {factor:.4f} * F{i+1}")
-                
-                # Cálculo mejorado con mejor estabilidad numérica
-                for k in range(2*n):
-                    # Calcular producto con mayor precisión
-                    product = factor * A[i][k]
-                    
-                    # Manejar casos donde esperamos resultados exactos de enteros
-                    result = A[j][k] - product
-                    
-                    # Verificar si está muy cerca de un valor entero
-                    nearest_int = round(result)
-                    if abs(result - nearest_int) < 1e-10:
-                        result = float(nearest_int)  # Convertir a valor entero exacto
-                    
-                    # Asegurar que valores muy pequeños se traten como cero
-                    if abs(result) < 1e-10:
-                        result = 0.0
-                        
-                    A[j][k] = result
-                
-                print_matrix(A)
+        _eliminate_rows(A, i, tracer, below_only=False)
     
     # Extraer la inversa de la mitad derecha de la matriz aumentada
-    inverse = []
-    for i in range(n):
-        row = A[i][n:2*n]
-        inverse.append(row)
+    inverse = Matrix(A[:, n:])
+    
+    # Estimar el número de condición para detectar matrices casi singulares
+    cond = condition_number(original, inverse)
+    tracer.step("Número de condición (norma 1): {:.4e}", cond)
+    if cond > ILL_CONDITIONED_THRESHOLD:
+        tracer.step("Advertencia: La matriz está mal condicionada (casi singular); la inversa puede ser imprecisa.")
     
-    print("Matriz inversa:")
-    print_matrix(inverse)
+    tracer.step("Matriz inversa:")
+    tracer.matrix(inverse, detail=False)
     return inverse
 
-def lu_factorization(matrix):
+def rank_update(rows, delta, inverse=None, factorization=None):
+    """
+    Actualiza la inversa y el determinante de una matriz A tras sumar delta a
+    algunas de sus filas, sin repetir la eliminación.
+    
+    El cambio es A' = A + U V^T, con U formada por las columnas de la identidad
+    de esas filas y V^T = delta. Con k filas modificadas, la fórmula de
+    Woodbury (Sherman-Morrison si k = 1) da la nueva inversa y el lema del
+    determinante la razón det(A') / det(A) = det(I + V^T A^-1 U), con costo
+    O(k n^2) en lugar de O(n^3).
+    
+    Args:
+        rows: Índices de las filas modificadas (k filas)
+        delta: Cambio de esas filas (k x n)
+        inverse: Inversa de A, si se conoce
+        factorization: Factorización LU de A (no singular), usada si no se da la inversa
+    
+    Returns:
+        tuple: (inversa de A' (Matrix) o None, razón de los determinantes).
+               La inversa es None si no se dio la de A o si A' es singular o
+               está tan mal condicionada que la actualización sería imprecisa
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    delta = np.asarray(delta, dtype=np.float64).reshape(len(rows), -1)
+    k = len(rows)
+    # A^-1 U: las columnas de la inversa correspondientes a las filas modificadas
+    if inverse is not None:
+        inverse = as_array(inverse)
+        columns = inverse[:, rows]
+    else:
+        columns = factorization.solve(np.eye(factorization.n)[:, rows])
+    # Matriz de capacitancia I + V^T A^-1 U (k x k)
+    capacitance = np.eye(k) + delta @ columns
+    ratio = float(np.linalg.det(capacitance))
+    
+    if inverse is None or np.linalg.cond(capacitance) > ILL_CONDITIONED_THRESHOLD:
+        return None, ratio
+    # A'^-1 = A^-1 - A^-1 U C^-1 V^T A^-1
+    correction = np.linalg.solve(capacitance, delta @ inverse)
+    return Matrix(inverse - columns @ correction), ratio
+
+class LUFactorization:
+    """
+    Factorización PA = LU con pivoteo parcial de una matriz cuadrada.
+    
+    La factorización se calcula una sola vez (O(n^3)); a partir de ella, el
+    determinante cuesta O(n), cada sistema Ax = b O(n^2) y la inversa n
+    sistemas de ese costo, sin repetir la eliminación.
+    
+    Attributes:
+        perm: Permutación de filas (ndarray de índices): la fila i de PA es la fila perm[i] de A
+        L: Matriz triangular inferior con unos en la diagonal (Matrix)
+        U: Matriz triangular superior (Matrix)
+        swaps: Número de intercambios de filas realizados
+        singular: Si algún pivote resultó despreciable frente a la escala de A
+    """
+    __slots__ = ('perm', 'L', 'U', 'swaps', 'singular')
+    
+    def __init__(self, perm, L, U, swaps, singular):
+        self.perm = perm
+        self.L = Matrix(L)
+        self.U = Matrix(U)
+        self.swaps = swaps
+        self.singular = singular
+    
+    @property
+    def P(self):
+        """Matriz de permutación P (Matrix)."""
+        n = len(self.perm)
+        P = np.zeros((n, n))
+        P[np.arange(n), self.perm] = 1.0
+        return Matrix(P)
+    
+    @property
+    def n(self):
+        """Orden de la matriz factorizada."""
+        return len(self.perm)
+    
+    def det(self):
+        """
+        Calcula el determinante como el producto de los pivotes de U, con el
+        signo de la permutación (O(n)).
+        """
+        if self.singular:
+            return 0.0
+        sign = -1.0 if self.swaps % 2 else 1.0
+        return sign * float(np.prod(np.diag(self.U.array)))
+    
+    def solve(self, b):
+        """
+        Resuelve Ax = b por sustitución hacia adelante (Ly = Pb) y hacia atrás
+        (Ux = y), con costo O(n^2) por cada columna de b.
+        
+        Args:
+            b: Vector de n términos independientes o matriz de n filas (varios
+               sistemas con la misma A)
+        
+        Returns:
+            La solución (ndarray con la forma de b) o None si A es singular
+        """
+        B = np.asarray(b, dtype=np.float64)
+        if B.ndim not in (1, 2) or B.shape[0] != self.n:
+            raise ValueError(f"El término independiente debe tener {self.n} filas.")
+        if self.singular:
+            return None
+        y = _forward_substitution(self.L.array, B[self.perm])
+        return _backward_substitution(self.U.array, y)
+    
+    def solve_transposed(self, b):
+        """
+        Resuelve A'x = b con la misma factorización, sin factorizar A', con
+        costo O(n^2) por cada columna de b. Como A' = U'L'P, se resuelve U'z = b
+        (triangular inferior), L'w = z (triangular superior) y x = P'w.
+        
+        Args:
+            b: Vector de n términos independientes o matriz de n filas
+        
+        Returns:
+            La solución (ndarray con la forma de b) o None si A es singular
+        """
+        B = np.asarray(b, dtype=np.float64)
+        if B.ndim not in (1, 2) or B.shape[0] != self.n:
+            raise ValueError(f"El término independiente debe tener {self.n} filas.")
+        if self.singular:
+            return None
+        # U' = (U' D^-1) D, con D la diagonal de U: el primer factor tiene unos en la diagonal
+        pivots = np.diag(self.U.array)
+        w = _forward_substitution(self.U.array.T / pivots, B)
+        z = w / (pivots if B.ndim == 1 else pivots[:, None])
+        x = np.empty_like(z)
+        x[self.perm] = _backward_substitution(self.L.array.T, z)
+        return x
+    
+    def inverse(self):
+        """
+        Calcula la inversa resolviendo AX = I con la factorización existente.
+        
+        Returns:
+            La matriz inversa (Matrix) o None si A es singular
+        """
+        X = self.solve(np.eye(self.n))
+        return None if X is None else Matrix(X)
+    
+    def __repr__(self):
+        return f"LUFactorization({self.n}x{self.n})"
+
+# Número de filas por bloque en las sustituciones triangulares
+SUBSTITUTION_BLOCK_SIZE = 64
+
+def _forward_substitution(L, B):
+    """
+    Resuelve LY = B para L triangular inferior con unos en la diagonal.
+    
+    Se procesa por bloques de filas: la contribución de las filas ya resueltas
+    se resta con un único producto de matrices por bloque, de modo que resolver
+    muchas columnas de B a la vez aprovecha operaciones matriciales completas.
+    """
+    Y = np.array(B, dtype=np.float64)
+    n = L.shape[0]
+    for i0 in range(0, n, SUBSTITUTION_BLOCK_SIZE):
+        i1 = min(i0 + SUBSTITUTION_BLOCK_SIZE, n)
+        if i0:
+            Y[i0:i1] -= L[i0:i1, :i0] @ Y[:i0]
+        for i in range(i0 + 1, i1):
+            Y[i] -= L[i, i0:i] @ Y[i0:i]
+    return Y
+
+def _backward_substitution(U, Y):
+    """
+    Resuelve UX = Y para U triangular superior con diagonal no nula, por
+    bloques de filas desde la última.
+    """
+    X = np.array(Y, dtype=np.float64)
+    n = U.shape[0]
+    for i1 in range(n, 0, -SUBSTITUTION_BLOCK_SIZE):
+        i0 = max(i1 - SUBSTITUTION_BLOCK_SIZE, 0)
+        if i1 < n:
+            X[i0:i1] -= U[i0:i1, i1:] @ X[i1:]
+        for i in range(i1 - 1, i0 - 1, -1):
+            X[i] = (X[i] - U[i, i+1:i1] @ X[i+1:i1]) / U[i, i]
+    return X
+
+def lu_factorization(matrix, tracer=None):
     """
-    Realiza la factorización LU (método de Doolittle) en una matriz cuadrada.
+    Realiza la factorización LU con pivoteo parcial (PA = LU) de una matriz cuadrada.
+    
+    El pivoteo permite factorizar cualquier matriz cuadrada, incluso con un
+    cero en la posición del pivote; si la matriz es singular, la factorización
+    se completa igualmente y se marca como tal.
     
     Args:
         matrix: La matriz cuadrada a factorizar
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
         
     Returns:
-        Una tupla (L, U) que contiene las matrices triangulares inferior y superior
-        o None si la factorización no es posible
+        Un objeto LUFactorization (con P, L, U, solve(), det() e inverse())
+        o None si la matriz no es cuadrada
     """
+    tracer = _resolve_tracer(tracer)
     rows, cols = get_matrix_dimensions(matrix)
     
     if rows != cols:
-        print(f"Error: No se puede realizar la factorización LU en una matriz {rows}x{cols}.")
-        print("La matriz debe ser cuadrada para la factorización LU.")
+        tracer.step("Error: No se puede realizar la factorización LU en una matriz {}x{}.", rows, cols)
+        tracer.step("La matriz debe ser cuadrada para la factorización LU.")
         return None
     
     n = rows
-    # Crear matrices de ceros para L y U
-    L = [[0.0] * n for _ in range(n)]
-    U = [[0.0] * n for _ in range(n)]
+    A = as_array(matrix)
+    # U comienza como una copia de A y se reduce en su lugar; L acumula los multiplicadores
+    U = A.copy()
+    L = np.eye(n)
+    perm = np.arange(n)
+    swaps = 0
+    singular = False
+    tolerances = _pivot_tolerances(A)
+    
+    tracer.step("\nRealizando Factorización LU con pivoteo parcial (PA = LU):")
+    tracer.step("Matriz original:")
+    tracer.matrix(A, detail=False)
+    
+    for k in range(n):
+        tracer.progress(k, n)
+        # Elegir como pivote el elemento de mayor valor absoluto de la columna
+        max_row = _find_pivot_row(U, k, k)
+        if max_row != k:
+            _swap_rows(U, k, max_row)
+            # Los multiplicadores ya calculados se intercambian junto con las filas
+            L[[k, max_row], :k] = L[[max_row, k], :k]
+            perm[[k, max_row]] = perm[[max_row, k]]
+            swaps += 1
+            tracer.step("Intercambiar filas {} y {}:", k+1, max_row+1)
+            tracer.matrix(U)
+        
+        if abs(U[k, k]) <= tolerances[k]:
+            singular = True
+            tracer.step("Advertencia: No hay pivote no nulo en la columna {}; la matriz es singular.", k+1)
+            U[k:, k] = 0.0
+            continue
+        
+        tracer.step("Pivote {}: {:.4f}", k+1, U[k, k])
+        
+        # Multiplicadores de L: L[j][k] = U[j][k] / U[k][k] para j > k
+        L[k+1:, k] = U[k+1:, k] / U[k, k]
+        if tracer.full:
+            for j in range(k + 1, n):
+                tracer.step("L[{}][{}] = {:.4f} / {:.4f} = {:.4f}", j+1, k+1, U[j, k], U[k, k], L[j, k], detail=True)
+        
+        _eliminate_rows(U, k, tracer, start=k)
+        U[k+1:, k] = 0.0
     
-    print("\nRealizando Factorización LU (método de Doolittle):")
-    print("Matriz original:")
-    print_matrix(matrix)
+    result = LUFactorization(perm, L, U, swaps, singular)
     
-    try:
-        # Establecer elementos diagonales de L a 1
-        for i in range(n):
-            L[i][i] = 1.0
-        
-        # Primera fila de U es la primera fila de A
-        for j in range(n):
-            U[0][j] = matrix[0][j]
-        
-        # Primera columna de L
-        for i in range(1, n):
-            if abs(U[0][0]) < 1e-10:
-                print("Error: Pivote cero encontrado. Factorización LU fallida.")
-                return None
-            L[i][0] = matrix[i][0] / U[0][0]
-            print(f"L[{i+1}][1] = {matrix[i][0]:.4f} / {U[0][0]:.4f} = {L[i][0]:.4f}")
-        
-        # Resto de L y U
-        for i in range(1, n):
-            # Calcular U[i][j] para j >= i
-            for j in range(i, n):
-                sum_val = 0
-                calculation = f"U[{i+1}][{j+1}] = {matrix[i][j]:.4f}"
-                for k in range(i):
-                    sum_val += L[i][k] * U[k][j]
-                    calculation += f" - {L[i][k]:.4f} * {U[k][j]:.4f}"
-                U[i][j] = matrix[i][j] - sum_val
-                calculation += f" = {U[i][j]:.4f}"
-                print(calculation)
+    tracer.step("\nMatriz P:")
+    tracer.matrix(result.P, detail=False)
+    tracer.step("\nMatriz L:")
+    tracer.matrix(L, detail=False)
+    tracer.step("\nMatriz U:")
+    tracer.matrix(U, detail=False)
             
-            # Calcular L[i][j] para j > i
-            for j in range(i + 1, n):
-                sum_val = 0
-                calculation = f"L[{j+1}][{i+1}] = ({matrix[j][i]:.4f}"
-                for k in range(i):
-                    sum_val += L[j][k] * U[k][i]
-                    calculation += f" - {L[j][k]:.4f} * {U[k][i]:.4f}"
-                
-                if abs(U[i][i]) < 1e-10:
-                    print("Error: Pivote cero encontrado. Factorización LU fallida.")
-                    return None
-                    
-                L[j][i] = (matrix[j][i] - sum_val) / U[i][i]
-                calculation += f") / {U[i][i]:.4f} = {L[j][i]:.4f}"
-                print(calculation)
+    # Verificar PA = LU (solo tiene sentido si se muestran los pasos)
+    if tracer.full:
+        tracer.step("\nVerificación - LU debe ser igual a PA:", detail=True)
+        tracer.matrix(L @ U)
                 
-        print("\nMatriz L:")
-        print_matrix(L)
-        print("\nMatriz U:")
-        print_matrix(U)
-        
-        # Verificar LU = A
-        product = multiply_matrices(L, U)
-        print("\nVerificación - LU debe ser igual a A:")
-        print_matrix(product)
-        
-        return L, U
+    return result
+
+def solve_linear_systems(matrix, B, tracer=None, factorization=None):
+    """
+    Resuelve AX = B para todas las columnas de B con una sola factorización
+    PA = LU de A.
+    
+    Args:
+        matrix: La matriz cuadrada de coeficientes A (densa o SparseMatrix)
+        B: Matriz de términos independientes (una columna por sistema) o vector
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
+        factorization: Factorización de A ya calculada (LUFactorization o SparseLU), si se tiene
+    
+    Returns:
+        La matriz solución X (Matrix, o ndarray si B es un vector) o None si A
+        no es cuadrada, es singular o las dimensiones no coinciden
+    """
+    tracer = _resolve_tracer(tracer)
+    rows, cols = get_matrix_dimensions(matrix)
+    B = np.asarray(B, dtype=np.float64)
     
-    except ZeroDivisionError:
-        print("Error: Pivote cero encontrado. Factorización LU fallida.")
+    if rows != cols:
+        tracer.step("Error: La matriz de coeficientes debe ser cuadrada (es {}x{}).", rows, cols)
         return None
+    if B.ndim not in (1, 2) or B.shape[0] != rows:
+        tracer.step("Error: Los términos independientes deben tener {} filas.", rows)
+        return None
+    
+    if factorization is None and isinstance(matrix, sparse.SparseMatrix):
+        tracer.step("\nFactorizando la matriz dispersa ({} elementos no nulos) con ordenamiento de mínimo grado", matrix.nnz)
+        factorization = sparse.sparse_lu(matrix)
+    elif factorization is None:
+        factorization = lu_factorization(matrix, tracer)
+    
+    if factorization.singular:
+        tracer.step("Error: La matriz es singular; el sistema no tiene solución única.")
+        return None
+    
+    systems = B.shape[1] if B.ndim == 2 else 1
+    tracer.step("\nResolviendo {} sistema(s): LY = PB (sustitución hacia adelante) y UX = Y (sustitución hacia atrás)", systems)
+    X = factorization.solve(B)
+    
+    tracer.step("Solución X:")
+    tracer.matrix(X.reshape(rows, -1), detail=False)
+    return Matrix(X) if X.ndim == 2 else X
 
 def main_menu():
     """
@@ -964,16 +1678,20 @@ def main_menu():
             
             result = lu_factorization(matrices[matrix_id])
             if result is not None:
-                L, U = result
+                # Almacenar matrices P, L y U
+                P_id = len(matrices) + 1
+                matrices[P_id] = result.P
+                print(f"Matriz P almacenada como Matriz {P_id}.")
                 
-                # Almacenar matrices L y U
                 L_id = len(matrices) + 1
-                matrices[L_id] = L
+                matrices[L_id] = result.L
                 print(f"Matriz L almacenada como Matriz {L_id}.")
                 
                 U_id = len(matrices) + 1
-                matrices[U_id] = U
+                matrices[U_id] = result.U
                 print(f"Matriz U almacenada como Matriz {U_id}.")
+                
+                print(f"Determinante (a partir de la factorización): {result.det():.4f}")
 
 if __name__ == "__main__":
     print("Welcome to the Matrix Calculator!")
@@ -0,0 +1,431 @@
+"""
+Benchmarks de la calculadora
+Mide cada operación pública de Calculadora.py y cada ruta de cálculo de gui.py
+(con el cliente de pruebas de Flask) sobre una malla de tamaños y estructuras
+de matriz (densa, dispersa, triangular y singular), con y sin registro de pasos.
+
+De cada caso se obtiene el tiempo de reloj (mediana de varias repeticiones), la
+memoria máxima reservada (tracemalloc) y las operaciones por segundo. Con
+--save los resultados se guardan en un archivo JSON de referencia; en las
+ejecuciones siguientes se comparan con él y se marcan como regresiones los
+casos más lentos o que usan más memoria de lo que admite la tolerancia.
+
+Uso:
+    python benchmark.py --save                  # crea o reemplaza la referencia
+    python benchmark.py                         # compara con la referencia
+    python benchmark.py --sizes 16 64 --filter inverse --steps none
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Las rutas se miden con un almacén en memoria (nunca el del servidor) y sin
+# caché de resultados, para que cada petición haga el cálculo completo
+os.environ['MATRIX_STORE_DIR'] = ''
+os.environ['FLASK_RESULT_CACHE_BYTES'] = '0'
+
+from Calculadora import (
+    Matrix, StepTracer, TRACE_NONE, TRACE_LEVELS, DETERMINANT_COFACTOR,
+    add_matrices, subtract_matrices, multiply_matrices, matmul, determinant,
+    gaussian_elimination, back_substitution, gauss_jordan_elimination,
+    calculate_inverse, condition_number, matrix_norm_1, lu_factorization,
+    solve_linear_systems, rank_update, format_matrix
+)
+from sparse import SparseMatrix
+# Mismo límite que la API para la expansión por cofactores (costo n!)
+from gui import MAX_COFACTOR_SIZE
+
+STRUCTURE_DENSE = 'dense'
+STRUCTURE_SPARSE = 'sparse'
+STRUCTURE_TRIANGULAR = 'triangular'
+STRUCTURE_SINGULAR = 'singular'
+STRUCTURES = (STRUCTURE_DENSE, STRUCTURE_SPARSE, STRUCTURE_TRIANGULAR, STRUCTURE_SINGULAR)
+
+DEFAULT_SIZES = (8, 32, 128)
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+# Con pasos, el texto generado crece como n^3: por encima de este tamaño solo
+# se mide sin pasos
+MAX_STEPS_SIZE = 64
+# Fracción de elementos no nulos (fuera de la diagonal) de las matrices dispersas
+SPARSE_DENSITY = 0.05
+# Tiempo mínimo de medición por caso (segundos) y límites de repeticiones
+MIN_TIME = 0.2
+MIN_REPEATS = 3
+MAX_REPEATS = 1000
+# Tolerancia relativa para marcar una regresión, y diferencias absolutas por
+# debajo de las cuales se considera ruido
+DEFAULT_TOLERANCE = 0.25
+TIME_NOISE = 50e-6
+MEMORY_NOISE = 16 * 1024
+
+def make_matrix(structure, n, seed=0):
+    """
+    Genera una matriz de prueba n x n con la estructura indicada.
+    
+    Args:
+        structure (str): 'dense', 'sparse', 'triangular' o 'singular'
+        n (int): Orden de la matriz
+        seed (int): Semilla, para que todas las ejecuciones usen los mismos datos
+    
+    Returns:
+        Matrix o SparseMatrix
+    """
+    rng = np.random.default_rng(seed)
+    A = rng.uniform(-10, 10, (n, n))
+    if structure == STRUCTURE_SPARSE:
+        # Diagonal dominante para que la matriz no sea singular
+        A[rng.random((n, n)) >= SPARSE_DENSITY] = 0.0
+        np.fill_diagonal(A, 10.0 * n * SPARSE_DENSITY + 10.0)
+        return SparseMatrix.from_dense(A)
+    if structure == STRUCTURE_TRIANGULAR:
+        A = np.triu(A)
+        np.fill_diagonal(A, np.abs(np.diag(A)) + 1.0)
+    elif structure == STRUCTURE_SINGULAR:
+        # La última fila es combinación de las dos primeras
+        A[-1] = A[0] + (A[1] if n > 1 else 0.0)
+    elif structure != STRUCTURE_DENSE:
+        raise ValueError(f"Estructura desconocida: {structure}")
+    return Matrix(A)
+
+def measure(run, min_time=MIN_TIME, cleanup=None):
+    """
+    Mide una función sin argumentos.
+    
+    Se ejecuta una vez para calentar, luego se repite hasta sumar min_time
+    segundos (entre MIN_REPEATS y MAX_REPEATS veces) y por último una vez más
+    con tracemalloc, aparte, porque el seguimiento de memoria la hace más lenta.
+    Si se indica cleanup, se llama después de cada ejecución, fuera de la medida.
+    
+    Returns:
+        dict: Mediana y mínimo del tiempo (s), repeticiones, operaciones por
+              segundo y memoria máxima reservada (bytes)
+    """
+    cleanup = cleanup or (lambda: None)
+    run()
+    cleanup()
+    times = []
+    start = time.perf_counter()
+    while len(times) < MIN_REPEATS or (time.perf_counter() - start < min_time and len(times) < MAX_REPEATS):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+        cleanup()
+    
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    cleanup()
+    
+    median = statistics.median(times)
+    return {
+        'time': median,
+        'min_time': min(times),
+        'repeats': len(times),
+        'ops_per_sec': 1.0 / median if median > 0 else float('inf'),
+        'peak_memory': peak
+    }
+
+# --- Operaciones de Calculadora.py ---
+
+def _operands(structure, n):
+    """
+    Datos de entrada de las operaciones para una estructura y un tamaño: las
+    matrices A y B, un vector b y los resultados previos que algunas
+    operaciones reciben (forma escalonada, inversa, factorización).
+    """
+    A = make_matrix(structure, n, seed=0)
+    B = make_matrix(STRUCTURE_DENSE, n, seed=1)
+    b = np.random.default_rng(2).uniform(-10, 10, n)
+    quiet = StepTracer(TRACE_NONE)
+    U, c = gaussian_elimination(A, b, tracer=quiet)
+    inverse = calculate_inverse(A, quiet)
+    dense = np.asarray(A, dtype=np.float64) if isinstance(A, SparseMatrix) else A.array
+    return {
+        'A': A, 'B': B, 'b': b, 'U': U, 'c': c, 'inverse': inverse,
+        'dense': dense, 'delta': np.ones((1, n))
+    }
+
+# Operaciones que reciben un registro de pasos: nombre -> función(datos, registro)
+TRACED_OPERATIONS = {
+    'add_matrices': lambda d, t: add_matrices(d['A'], d['B'], t),
+    'subtract_matrices': lambda d, t: subtract_matrices(d['A'], d['B'], t),
+    'multiply_matrices': lambda d, t: multiply_matrices(d['A'], d['B'], t),
+    'determinant': lambda d, t: determinant(d['A'], t),
+    'determinant_cofactor': lambda d, t: determinant(d['A'], t, method=DETERMINANT_COFACTOR),
+    'gaussian_elimination': lambda d, t: gaussian_elimination(d['A'], d['b'], tracer=t),
+    'back_substitution': lambda d, t: back_substitution(d['U'], d['c'], t),
+    'gauss_jordan_elimination': lambda d, t: gauss_jordan_elimination(d['A'], tracer=t),
+    'calculate_inverse': lambda d, t: calculate_inverse(d['A'], t),
+    'lu_factorization': lambda d, t: lu_factorization(d['A'], t),
+    'solve_linear_systems': lambda d, t: solve_linear_systems(d['A'], d['B'], t),
+}
+
+# Operaciones sin pasos: nombre -> función(datos). Se omiten las de entrada y
+# salida por consola (input_matrix, print_matrix, main_menu, get_*_input) y las
+# auxiliares triviales (get_matrix_dimensions, get_minor, as_array)
+PLAIN_OPERATIONS = {
+    'matmul': lambda d: matmul(d['dense'], d['B'].array),
+    'matrix_norm_1': lambda d: matrix_norm_1(d['A']),
+    'condition_number': lambda d: d['inverse'] is not None and condition_number(d['A'], d['inverse']),
+    'rank_update': lambda d: d['inverse'] is not None and rank_update([0], d['delta'], inverse=d['inverse']),
+    'format_matrix': lambda d: format_matrix(d['dense']),
+}
+
+def calculator_cases(sizes, structures, levels, max_steps_size):
+    """
+    Genera los casos de Calculadora.py como tripletas (nombre, función sin
+    argumentos, limpieza o None).
+    """
+    for structure in structures:
+        for n in sizes:
+            data = _operands(structure, n)
+            for name, operation in TRACED_OPERATIONS.items():
+                if name == 'determinant_cofactor' and n > MAX_COFACTOR_SIZE:
+                    continue
+                for level in levels:
+                    if level != TRACE_NONE and n > max_steps_size:
+                        continue
+                    def run(operation=operation, level=level, data=data):
+                        tracer = StepTracer(level)
+                        operation(data, tracer)
+                        tracer.render()
+                    yield f"calculadora/{name}/{structure}/{n}/{level}", run, None
+            if TRACE_NONE in levels:
+                for name, operation in PLAIN_OPERATIONS.items():
+                    yield (f"calculadora/{name}/{structure}/{n}/{TRACE_NONE}",
+                           lambda operation=operation, data=data: operation(data), None)
+
+# --- Rutas de gui.py ---
+
+def _store(client, matrix):
+    """Guarda una matriz con /create_matrix y devuelve su ID."""
+    sparse = isinstance(matrix, SparseMatrix)
+    response = client.post('/create_matrix', json={
+        'data': np.asarray(matrix, dtype=np.float64).tolist(),
+        'format': 'sparse' if sparse else 'dense'
+    }).get_json()
+    if not response.get('success'):
+        raise RuntimeError(f"No se pudo crear la matriz de prueba: {response.get('message')}")
+    return response['matrix_id']
+
+def _route_requests(ids, n, level):
+    """
+    Peticiones de cada ruta: nombre -> (método, URL, argumentos de la petición).
+    Las rutas de trabajos asíncronos y el streaming SSE no se incluyen: su
+    tiempo depende del grupo de procesos y del ritmo del cliente.
+    """
+    a, b, edit = ids['A'], ids['B'], ids['edit']
+    rhs = {f'b_{i}': str(i + 1) for i in range(n)}
+    return {
+        'add_matrices': ('POST', '/add_matrices', {'data': {'matrix1_id': a, 'matrix2_id': b, 'steps': level}}),
+        'subtract_matrices': ('POST', '/subtract_matrices', {'data': {'matrix1_id': a, 'matrix2_id': b, 'steps': level}}),
+        'multiply_matrices': ('POST', '/multiply_matrices', {'data': {'matrix1_id': a, 'matrix2_id': b, 'steps': level}}),
+        'determinant': ('POST', '/determinant', {'data': {'matrix_id': a, 'steps': level}}),
+        'determinant_cofactor': ('POST', '/determinant', {'data': {'matrix_id': a, 'method': 'cofactor', 'steps': level}}),
+        'inverse': ('POST', '/inverse', {'data': {'matrix_id': a, 'steps': level}}),
+        'gaussian_elimination': ('POST', '/gaussian_elimination', {'data': {'matrix_id': a, 'steps': level}}),
+        'gaussian_elimination_solve': ('POST', '/gaussian_elimination',
+                                       {'data': {'matrix_id': a, 'solve_system': 'true', 'steps': level, **rhs}}),
+        'gauss_jordan': ('POST', '/gauss_jordan', {'data': {'matrix_id': a, 'steps': level}}),
+        'gauss_jordan_solve': ('POST', '/gauss_jordan',
+                               {'data': {'matrix_id': a, 'solve_system': 'true', 'steps': level, **rhs}}),
+        'lu_factorization': ('POST', '/lu_factorization', {'data': {'matrix_id': a, 'steps': level}}),
+        'solve': ('POST', '/solve', {'data': {'matrix_id': a, 'rhs_id': b, 'steps': level}}),
+        'evaluate': ('POST', '/evaluate', {'data': {'expression': f'{a} * {b} + {b}', 'steps': level}}),
+        'batch': ('POST', '/batch', {'json': {
+            'operations': [{'op': 'multiply', 'args': [a, b]}, {'op': 'determinant', 'args': ['$0']}],
+            'steps': level
+        }}),
+        'edit_matrix': ('PATCH', f'/edit_matrix/{edit}', {'json': {'cells': [[0, 0, 1.0]]}}),
+        'matrix_tile': ('GET', f'/matrix_tile/{a}', {'query_string': {'rows': 12, 'cols': 12}}),
+    }
+
+# Campos de las respuestas con los IDs de las matrices que guarda la ruta
+RESULT_ID_FIELDS = ('matrix_id', 'P_id', 'L_id', 'U_id')
+# Rutas que no generan pasos: solo se miden con steps=none
+ROUTES_WITHOUT_STEPS = ('edit_matrix', 'matrix_tile')
+
+def route_cases(sizes, structures, levels, max_steps_size):
+    """
+    Genera los casos de las rutas de gui.py como tripletas (nombre, función sin
+    argumentos, limpieza). La limpieza elimina las matrices que guardó la ruta,
+    para que el almacén no crezca durante la medición.
+    """
+    import gui
+    client = gui.app.test_client()
+    last_response = []
+    
+    def cleanup():
+        payload = last_response.pop().get_json(silent=True) or {}
+        for key in RESULT_ID_FIELDS:
+            if key in payload and payload[key] not in ids.values():
+                client.post('/delete_matrix', data={'matrix_id': payload[key]})
+    
+    for structure in structures:
+        for n in sizes:
+            ids = {
+                'A': _store(client, make_matrix(structure, n, seed=0)),
+                'B': _store(client, make_matrix(STRUCTURE_DENSE, n, seed=1)),
+                'edit': _store(client, make_matrix(structure, n, seed=3))
+            }
+            for level in levels:
+                if level != TRACE_NONE and n > max_steps_size:
+                    continue
+                for name, (method, url, kwargs) in _route_requests(ids, n, level).items():
+                    if level != TRACE_NONE and name in ROUTES_WITHOUT_STEPS:
+                        continue
+                    if name == 'determinant_cofactor' and n > MAX_COFACTOR_SIZE:
+                        continue
+                    def run(method=method, url=url, kwargs=kwargs):
+                        response = client.open(url, method=method, **kwargs)
+                        if response.status_code != 200:
+                            raise RuntimeError(f"{method} {url} respondió {response.status_code}")
+                        response.get_data()
+                        last_response.append(response)
+                    yield f"gui/{name}/{structure}/{n}/{level}", run, cleanup
+    
+    # Listado de matrices (no depende del tamaño ni de los pasos)
+    yield "gui/view_matrices", lambda: client.get('/view_matrices').get_data(), None
+
+# --- Referencia y comparación ---
+
+def run_benchmarks(cases, pattern=None, min_time=MIN_TIME, verbose=True):
+    """
+    Mide los casos cuyo nombre coincide con el patrón (estilo fnmatch).
+    
+    Returns:
+        dict: Nombre del caso -> medidas (ver measure)
+    """
+    results = {}
+    for name, run, cleanup in cases:
+        if pattern and not fnmatch.fnmatch(name, pattern):
+            continue
+        results[name] = measure(run, min_time, cleanup)
+        if verbose:
+            entry = results[name]
+            print(f"{name:60s} {entry['time'] * 1e3:10.3f} ms  {entry['ops_per_sec']:10.1f} op/s  "
+                  f"{entry['peak_memory'] / 1024:10.1f} KB", flush=True)
+    return results
+
+def environment_info():
+    """Versiones y máquina en las que se obtuvieron los resultados."""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compara los resultados con la referencia.
+    
+    Un caso es una regresión si su tiempo mínimo (el menos afectado por otros
+    procesos de la máquina) o su memoria máxima superan los de la referencia
+    en más de la tolerancia relativa y en más que el ruido de medición
+    (TIME_NOISE y MEMORY_NOISE).
+    
+    Args:
+        results (dict): Resultados actuales
+        baseline (dict): Resultados de referencia
+        tolerance (float): Aumento relativo admitido (0.25 = 25 %)
+    
+    Returns:
+        tuple: (regresiones, mejoras), listas de (caso, medida, referencia, actual)
+    """
+    regressions = []
+    improvements = []
+    for name, entry in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric, noise in (('min_time', TIME_NOISE), ('peak_memory', MEMORY_NOISE)):
+            before, after = reference[metric], entry[metric]
+            if after > before * (1 + tolerance) and after - before > noise:
+                regressions.append((name, metric, before, after))
+            elif after < before / (1 + tolerance) and before - after > noise:
+                improvements.append((name, metric, before, after))
+    return regressions, improvements
+
+def _format_change(name, metric, before, after):
+    if metric == 'min_time':
+        values = f"{before * 1e3:.3f} ms -> {after * 1e3:.3f} ms"
+    else:
+        values = f"{before / 1024:.1f} KB -> {after / 1024:.1f} KB"
+    return f"  {name} [{metric}]: {values} ({after / before:.2f}x)" if before else f"  {name} [{metric}]: {values}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Órdenes de las matrices (por defecto: %(default)s)')
+    parser.add_argument('--structures', nargs='+', choices=STRUCTURES, default=list(STRUCTURES))
+    parser.add_argument('--steps', nargs='+', choices=TRACE_LEVELS, default=list(TRACE_LEVELS),
+                        help='Niveles de pasos a medir')
+    parser.add_argument('--max-steps-size', type=int, default=MAX_STEPS_SIZE,
+                        help='Orden máximo para medir con pasos (por defecto: %(default)s)')
+    parser.add_argument('--filter', help="Mide solo los casos cuyo nombre coincide (por ejemplo 'gui/inverse/*')")
+    parser.add_argument('--no-routes', action='store_true', help='No medir las rutas de gui.py')
+    parser.add_argument('--min-time', type=float, default=MIN_TIME,
+                        help='Segundos de medición por caso (por defecto: %(default)s)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Archivo JSON de referencia')
+    parser.add_argument('--save', action='store_true', help='Guardar los resultados como referencia')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Aumento relativo admitido antes de marcar una regresión')
+    args = parser.parse_args(argv)
+    
+    pattern = f"*{args.filter}*" if args.filter and not any(c in args.filter for c in '*?[') else args.filter
+    results = run_benchmarks(calculator_cases(args.sizes, args.structures, args.steps, args.max_steps_size),
+                             pattern, args.min_time)
+    if not args.no_routes:
+        results.update(run_benchmarks(route_cases(args.sizes, args.structures, args.steps, args.max_steps_size),
+                                      pattern, args.min_time))
+    
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file).get('results', {})
+        # Una ejecución parcial (--filter) solo reemplaza sus casos
+        baseline.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump({'environment': environment_info(), 'results': baseline}, file, indent=2, sort_keys=True)
+        print(f"\nReferencia guardada en {args.baseline} ({len(results)} casos)")
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        print(f"\nNo hay referencia en {args.baseline}; ejecuta con --save para crearla")
+        return 0
+    with open(args.baseline) as file:
+        reference = json.load(file)
+    regressions, improvements = compare(results, reference['results'], args.tolerance)
+    
+    print(f"\nReferencia: {args.baseline} ({reference['environment']['date']}, "
+          f"Python {reference['environment']['python']}, NumPy {reference['environment']['numpy']})")
+    missing = sorted(set(results) - set(reference['results']))
+    if missing:
+        print(f"{len(missing)} casos sin referencia")
+    if improvements:
+        print(f"Mejoras ({len(improvements)}):")
+        for change in improvements:
+            print(_format_change(*change))
+    if regressions:
+        print(f"Regresiones ({len(regressions)}):")
+        for change in regressions:
+            print(_format_change(*change))
+        return 1
+    print("Sin regresiones")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
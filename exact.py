@@ -0,0 +1,241 @@
+"""
+Aritmética exacta
+Determinante, forma escalonada e inversa con números racionales exactos
+(fractions.Fraction), sin errores de redondeo.
+
+Los cálculos usan la eliminación de Bareiss, libre de fracciones: cada fila se
+lleva primero a enteros y en cada paso
+    a[i][j] = (p * a[i][j] - a[i][k] * a[k][j]) / p_anterior
+donde la división es exacta. Todos los valores intermedios son menores
+(subdeterminantes) de la matriz original, por lo que su tamaño crece de forma
+polinómica, a diferencia de la eliminación ingenua con fracciones.
+"""
+from fractions import Fraction
+from math import lcm
+from Calculadora import Matrix, as_array, _resolve_tracer
+
+# Método exacto para el determinante (complementa Calculadora.DETERMINANT_METHODS)
+DETERMINANT_EXACT = 'exact'
+
+def to_fraction(value):
+    """
+    Convierte un número a Fraction usando su representación decimal más corta,
+    de modo que 0.1 se interpreta como 1/10 y no como el valor binario del float.
+    """
+    if isinstance(value, (int, Fraction)):
+        return Fraction(value)
+    return Fraction(repr(float(value)))
+
+def to_fractions(matrix):
+    """
+    Convierte una matriz (lista de listas, ndarray, Matrix o SparseMatrix) a una
+    lista de listas de Fraction.
+    """
+    if isinstance(matrix, list) and all(isinstance(row, list) for row in matrix):
+        return [[to_fraction(value) for value in row] for row in matrix]
+    return [[to_fraction(value) for value in row] for row in as_array(matrix).tolist()]
+
+def format_fraction(value):
+    """Texto de un racional: entero si el denominador es 1, 'p/q' en otro caso."""
+    return str(value.numerator) if value.denominator == 1 else f"{value.numerator}/{value.denominator}"
+
+def exact_response(rows):
+    """
+    Convierte una matriz de valores exactos en la Matrix que se almacena y en
+    su representación como texto ('p/q') para la respuesta JSON.
+    """
+    matrix = Matrix([[float(value) for value in row] for row in rows])
+    return matrix, [[format_fraction(value) for value in row] for row in rows]
+
+def _format_exact_matrix(rows):
+    """
+    Genera el texto de una matriz de valores exactos con columnas alineadas.
+    """
+    texts = [[format_fraction(Fraction(value)) for value in row] for row in rows]
+    if not texts or not texts[0]:
+        return ""
+    width = max(len(text) for row in texts for text in row)
+    lines = ["  [ " + " ".join(text.rjust(width) for text in row) + " ]" for row in texts]
+    return "\n" + "\n".join(lines) + "\n"
+
+def _integer_rows(rows):
+    """
+    Escala cada fila de racionales por el mínimo común múltiplo de sus
+    denominadores para obtener una fila de enteros.
+    
+    Returns:
+        Las filas enteras y el factor de escala de cada una
+    """
+    integer_rows = []
+    scales = []
+    for row in rows:
+        scale = lcm(*(value.denominator for value in row)) if row else 1
+        integer_rows.append([int(value * scale) for value in row])
+        scales.append(scale)
+    return integer_rows, scales
+
+def _bareiss(M, columns, tracer, reduce_above=False):
+    """
+    Eliminación de Bareiss sobre filas enteras, en su lugar.
+    
+    Args:
+        M: Lista de filas de enteros (se modifica)
+        columns: Número de columnas en las que se buscan pivotes
+        tracer: Registro de pasos
+        reduce_above: Si también se eliminan las filas por encima del pivote
+                      (variante de Gauss-Jordan)
+    
+    Returns:
+        Las columnas pivote, el último pivote y el número de intercambios de filas
+    """
+    rows = len(M)
+    previous = 1
+    pivot_row = 0
+    pivot_columns = []
+    swaps = 0
+    
+    for col in range(columns):
+        tracer.progress(col, columns)
+        if pivot_row >= rows:
+            break
+        # Elegir como pivote el no nulo de menor valor absoluto, para mantener pequeños los números
+        candidates = [i for i in range(pivot_row, rows) if M[i][col] != 0]
+        if not candidates:
+            continue
+        best = min(candidates, key=lambda i: abs(M[i][col]))
+        if best != pivot_row:
+            M[pivot_row], M[best] = M[best], M[pivot_row]
+            swaps += 1
+            tracer.step("Intercambiar filas {} y {}", pivot_row + 1, best + 1)
+        
+        pivot = M[pivot_row][col]
+        tracer.step("Pivote {}: {}", pivot_row + 1, pivot)
+        pivot_values = M[pivot_row]
+        targets = range(rows) if reduce_above else range(pivot_row + 1, rows)
+        for i in targets:
+            if i != pivot_row:
+                factor = M[i][col]
+                M[i] = [(pivot * a - factor * b) // previous for a, b in zip(M[i], pivot_values)]
+        tracer.step(_format_exact_matrix, [list(row) for row in M], detail=True)
+        
+        previous = pivot
+        pivot_columns.append(col)
+        pivot_row += 1
+    
+    return pivot_columns, previous, swaps
+
+def exact_determinant(matrix, tracer=None):
+    """
+    Calcula el determinante exacto de una matriz cuadrada con la eliminación de Bareiss.
+    
+    Args:
+        matrix: La matriz cuadrada
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
+    
+    Returns:
+        El determinante (Fraction) o None si la matriz no es cuadrada
+    """
+    tracer = _resolve_tracer(tracer)
+    rows = to_fractions(matrix)
+    n = len(rows)
+    if any(len(row) != n for row in rows):
+        tracer.step("Error: La matriz debe ser cuadrada para calcular el determinante.")
+        return None
+    if n == 0:
+        return Fraction(1)
+    
+    M, scales = _integer_rows(rows)
+    tracer.step("\nCalculando determinante exacto (eliminación de Bareiss):")
+    tracer.step("Matriz con filas escaladas a enteros (factores {}):", ", ".join(str(s) for s in scales))
+    tracer.step(_format_exact_matrix, [list(row) for row in M])
+    
+    pivot_columns, last_pivot, swaps = _bareiss(M, n, tracer)
+    if len(pivot_columns) < n:
+        tracer.step("La matriz es singular: determinante = 0")
+        return Fraction(0)
+    
+    # El último pivote de Bareiss es el determinante de la matriz escalada
+    det = Fraction(-last_pivot if swaps % 2 else last_pivot)
+    for scale in scales:
+        det /= scale
+    tracer.step("Determinante = {}", format_fraction(det))
+    return det
+
+def exact_echelon_form(matrix, reduced=True, tracer=None):
+    """
+    Calcula de forma exacta la forma escalonada de una matriz.
+    
+    Args:
+        matrix: La matriz
+        reduced: Si se devuelve la forma escalonada reducida (única) o la forma
+                 escalonada libre de fracciones que produce Bareiss (enteros,
+                 equivalente a la forma escalonada salvo por el escalado de filas)
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
+    
+    Returns:
+        Lista de listas de Fraction
+    """
+    tracer = _resolve_tracer(tracer)
+    rows = to_fractions(matrix)
+    if not rows:
+        return []
+    M, _ = _integer_rows(rows)
+    columns = len(M[0])
+    
+    tracer.step("\nCalculando forma escalonada {} exacta (eliminación de Bareiss):", "reducida" if reduced else "libre de fracciones")
+    tracer.step("Matriz con filas escaladas a enteros:")
+    tracer.step(_format_exact_matrix, [list(row) for row in M])
+    pivot_columns, _, _ = _bareiss(M, columns, tracer, reduce_above=reduced)
+    
+    if reduced:
+        # Cada fila pivote se divide por su pivote para dejar unos en la diagonal
+        result = []
+        for i, row in enumerate(M):
+            pivot = row[pivot_columns[i]] if i < len(pivot_columns) else 1
+            result.append([Fraction(value, pivot) for value in row])
+    else:
+        result = [[Fraction(value) for value in row] for row in M]
+    
+    tracer.step("Resultado:")
+    tracer.step(_format_exact_matrix, result)
+    return result
+
+def exact_inverse(matrix, tracer=None):
+    """
+    Calcula la inversa exacta de una matriz cuadrada reduciendo [A|I] con la
+    variante de Gauss-Jordan de la eliminación de Bareiss.
+    
+    Args:
+        matrix: La matriz cuadrada
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
+    
+    Returns:
+        La inversa (lista de listas de Fraction) o None si la matriz no es
+        cuadrada o es singular
+    """
+    tracer = _resolve_tracer(tracer)
+    rows = to_fractions(matrix)
+    n = len(rows)
+    if any(len(row) != n for row in rows):
+        tracer.step("Error: La matriz debe ser cuadrada para calcular la inversa.")
+        return None
+    
+    # Aumentar con la identidad antes de escalar, para que cada fila de I se
+    # escale junto con la fila correspondiente de A
+    augmented = [row + [Fraction(int(i == j)) for j in range(n)] for i, row in enumerate(rows)]
+    M, _ = _integer_rows(augmented)
+    
+    tracer.step("\nCalculando inversa exacta (Gauss-Jordan con eliminación de Bareiss):")
+    tracer.step("Matriz aumentada [A|I] con filas escaladas a enteros:")
+    tracer.step(_format_exact_matrix, [list(row) for row in M])
+    
+    pivot_columns, _, _ = _bareiss(M, n, tracer, reduce_above=True)
+    if len(pivot_columns) < n:
+        tracer.step("Error: La matriz es singular, la inversa no existe.")
+        return None
+    
+    # Al terminar, la mitad izquierda es det * I; se divide cada fila por su pivote
+    inverse = [[Fraction(value, M[i][i]) for value in M[i][n:]] for i in range(n)]
+    tracer.step("Matriz inversa:")
+    tracer.step(_format_exact_matrix, inverse)
+    return inverse
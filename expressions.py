@@ -0,0 +1,641 @@
+"""
+Expresiones matriciales
+Analiza expresiones como "inv(A) * (B + C) * D" sobre matrices almacenadas,
+planifica su evaluación y calcula únicamente el resultado final.
+
+Sintaxis:
+    A + B, A - B      suma y resta (se fusionan en una sola pasada)
+    A * B, A @ B      producto matricial (o por escalar si un factor es un número)
+    -A, 2.5 * A       negación y escalado
+    A'                transpuesta
+    inv(A), A^-1      inversa
+    det(A)            determinante (escalar)
+
+El planificador reescribe inv(A) * X como la resolución del sistema AX = B
+(sin calcular la inversa), elige el orden más barato de las cadenas de
+productos y agrupa sumas y restas consecutivas en una sola suma n-aria.
+"""
+import re
+import numpy as np
+from Calculadora import (
+    Matrix, StepTracer, TRACE_NONE, as_array, get_matrix_dimensions, lu_factorization, matmul,
+    _resolve_tracer
+)
+
+class ExpressionError(ValueError):
+    """Error de sintaxis, de dimensiones o de evaluación de una expresión."""
+
+# ---------------------------------------------------------------------------
+# Árbol de la expresión
+# ---------------------------------------------------------------------------
+
+class Node:
+    """Nodo del árbol de la expresión."""
+    __slots__ = ()
+
+class Ref(Node):
+    """Referencia a una matriz almacenada."""
+    __slots__ = ('name',)
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def __str__(self):
+        return self.name
+
+class Const(Node):
+    """Constante escalar."""
+    __slots__ = ('value',)
+    
+    def __init__(self, value):
+        self.value = float(value)
+    
+    def __str__(self):
+        return f"{self.value:g}"
+
+class Sum(Node):
+    """Suma n-aria: sum(signo * término)."""
+    __slots__ = ('terms',)
+    
+    def __init__(self, terms):
+        self.terms = terms  # lista de (signo, nodo)
+    
+    def __str__(self):
+        text = ""
+        for i, (sign, term) in enumerate(self.terms):
+            if i == 0:
+                text += ("-" if sign < 0 else "") + str(term)
+            else:
+                text += (" - " if sign < 0 else " + ") + str(term)
+        return f"({text})"
+
+class Product(Node):
+    """Producto encadenado de factores, evaluado de izquierda a derecha salvo que el planificador lo reordene."""
+    __slots__ = ('factors',)
+    
+    def __init__(self, factors):
+        self.factors = factors
+    
+    def __str__(self):
+        return "(" + " * ".join(str(f) for f in self.factors) + ")"
+
+class Inverse(Node):
+    __slots__ = ('operand',)
+    
+    def __init__(self, operand):
+        self.operand = operand
+    
+    def __str__(self):
+        return f"inv({self.operand})"
+
+class Transpose(Node):
+    __slots__ = ('operand',)
+    
+    def __init__(self, operand):
+        self.operand = operand
+    
+    def __str__(self):
+        return f"{self.operand}'"
+
+class Det(Node):
+    __slots__ = ('operand',)
+    
+    def __init__(self, operand):
+        self.operand = operand
+    
+    def __str__(self):
+        return f"det({self.operand})"
+
+class Solve(Node):
+    """Resolución de AX = B (side='left', A^-1 B) o XA = B (side='right', B A^-1)."""
+    __slots__ = ('matrix', 'rhs', 'side')
+    
+    def __init__(self, matrix, rhs, side='left'):
+        self.matrix = matrix
+        self.rhs = rhs
+        self.side = side
+    
+    def __str__(self):
+        if self.side == 'left':
+            return f"solve({self.matrix}, {self.rhs})"
+        return f"solve_right({self.rhs}, {self.matrix})"
+
+class MatMul(Node):
+    """Producto binario con el orden ya decidido por el planificador."""
+    __slots__ = ('left', 'right')
+    
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+    
+    def __str__(self):
+        return f"({self.left} * {self.right})"
+
+class Scale(Node):
+    """Producto de un escalar (nodo escalar) por una matriz."""
+    __slots__ = ('scalar', 'operand')
+    
+    def __init__(self, scalar, operand):
+        self.scalar = scalar
+        self.operand = operand
+    
+    def __str__(self):
+        return f"{self.scalar} * {self.operand}"
+
+# ---------------------------------------------------------------------------
+# Análisis sintáctico
+# ---------------------------------------------------------------------------
+
+_TOKEN_PATTERN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|([A-Za-z_]\w*)|(\S))")
+_FUNCTIONS = {'inv': Inverse, 'det': Det, 't': Transpose}
+
+def _tokenize(text):
+    """
+    Divide la expresión en tokens ('num', valor), ('name', texto) u ('op', símbolo).
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        number, name, symbol = match.groups()
+        if number is not None:
+            tokens.append(('num', number))
+        elif name is not None:
+            tokens.append(('name', name))
+        else:
+            if symbol not in "+-*@()^'":
+                raise ExpressionError(f"Símbolo inesperado '{symbol}'")
+            tokens.append(('op', symbol))
+        position = match.end()
+    tokens.append(('end', None))
+    return tokens
+
+class _Parser:
+    """
+    Analizador descendente recursivo:
+        suma     := producto (('+' | '-') producto)*
+        producto := unario (('*' | '@') unario)*
+        unario   := '-' unario | postfijo
+        postfijo := primario ("'" | '^' '-' '1')*
+        primario := número | nombre | función '(' suma ')' | '(' suma ')'
+    """
+    
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.position = 0
+    
+    def peek(self):
+        return self.tokens[self.position]
+    
+    def next(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+    
+    def expect(self, symbol):
+        kind, value = self.next()
+        if kind != 'op' or value != symbol:
+            raise ExpressionError(f"Se esperaba '{symbol}'")
+    
+    def parse(self):
+        node = self.sum()
+        if self.peek()[0] != 'end':
+            raise ExpressionError(f"Símbolo inesperado '{self.peek()[1]}'")
+        return node
+    
+    def sum(self):
+        terms = [(1, self.product())]
+        while self.peek() in (('op', '+'), ('op', '-')):
+            sign = 1 if self.next()[1] == '+' else -1
+            terms.append((sign, self.product()))
+        return terms[0][1] if len(terms) == 1 else Sum(terms)
+    
+    def product(self):
+        factors = [self.unary()]
+        while self.peek() in (('op', '*'), ('op', '@')):
+            self.next()
+            factors.append(self.unary())
+        return factors[0] if len(factors) == 1 else Product(factors)
+    
+    def unary(self):
+        if self.peek() == ('op', '-'):
+            self.next()
+            return Product([Const(-1), self.unary()])
+        return self.postfix()
+    
+    def postfix(self):
+        node = self.primary()
+        while True:
+            if self.peek() == ('op', "'"):
+                self.next()
+                node = Transpose(node)
+            elif self.peek() == ('op', '^'):
+                self.next()
+                self.expect('-')
+                if self.next() != ('num', '1'):
+                    raise ExpressionError("Solo se admite el exponente -1 (inversa)")
+                node = Inverse(node)
+            else:
+                return node
+    
+    def primary(self):
+        kind, value = self.next()
+        if kind == 'num':
+            return Const(value)
+        if kind == 'name':
+            if self.peek() == ('op', '(') and value in _FUNCTIONS:
+                self.next()
+                operand = self.sum()
+                self.expect(')')
+                return _FUNCTIONS[value](operand)
+            return Ref(value)
+        if (kind, value) == ('op', '('):
+            node = self.sum()
+            self.expect(')')
+            return node
+        raise ExpressionError("Expresión incompleta" if kind == 'end' else f"Símbolo inesperado '{value}'")
+
+def parse_expression(text):
+    """
+    Convierte el texto de una expresión en su árbol.
+    
+    Args:
+        text (str): La expresión, por ejemplo "inv(A) * (B + C) * D"
+    
+    Returns:
+        Node: La raíz del árbol
+    
+    Raises:
+        ExpressionError: Si la expresión no es válida
+    """
+    return _Parser(text).parse()
+
+# ---------------------------------------------------------------------------
+# Planificación
+# ---------------------------------------------------------------------------
+
+def _shape(node, shapes):
+    """
+    Dimensiones (filas, columnas) del resultado de un nodo, o None si es escalar.
+    """
+    if isinstance(node, Ref):
+        return shapes[node.name]
+    if isinstance(node, (Const, Det)):
+        return None
+    if isinstance(node, Transpose):
+        shape = _shape(node.operand, shapes)
+        return None if shape is None else (shape[1], shape[0])
+    if isinstance(node, Inverse):
+        return _shape(node.operand, shapes)
+    if isinstance(node, Scale):
+        return _shape(node.operand, shapes)
+    if isinstance(node, Sum):
+        return _shape(node.terms[0][1], shapes)
+    if isinstance(node, Product):
+        factors = [s for s in (_shape(f, shapes) for f in node.factors) if s is not None]
+        return (factors[0][0], factors[-1][1]) if factors else None
+    if isinstance(node, MatMul):
+        return (_shape(node.left, shapes)[0], _shape(node.right, shapes)[1])
+    if isinstance(node, Solve):
+        return _shape(node.rhs, shapes)
+    raise TypeError(node)
+
+def _check(node, shapes):
+    """
+    Verifica las referencias y dimensiones de una expresión recién analizada.
+    """
+    if isinstance(node, Ref):
+        if node.name not in shapes:
+            raise ExpressionError(f"La matriz {node.name} no existe")
+        return shapes[node.name]
+    if isinstance(node, Const):
+        return None
+    if isinstance(node, (Inverse, Det)):
+        shape = _check(node.operand, shapes)
+        name = "inversa" if isinstance(node, Inverse) else "determinante"
+        if shape is None or shape[0] != shape[1]:
+            raise ExpressionError(f"Solo se puede calcular la {name} de una matriz cuadrada: {node}")
+        return shape if isinstance(node, Inverse) else None
+    if isinstance(node, Transpose):
+        shape = _check(node.operand, shapes)
+        return None if shape is None else (shape[1], shape[0])
+    if isinstance(node, Sum):
+        result = _check(node.terms[0][1], shapes)
+        for _, term in node.terms[1:]:
+            if _check(term, shapes) != result:
+                raise ExpressionError(f"Dimensiones incompatibles en la suma {node}")
+        return result
+    if isinstance(node, Product):
+        result = None
+        for factor in node.factors:
+            shape = _check(factor, shapes)
+            if shape is None:
+                continue
+            if result is not None and result[1] != shape[0]:
+                raise ExpressionError(
+                    f"No se pueden multiplicar matrices de dimensiones {result[0]}x{result[1]} y {shape[0]}x{shape[1]}")
+            result = shape if result is None else (result[0], shape[1])
+        return result
+    raise TypeError(node)
+
+def _flatten(node):
+    """
+    Aplana productos y sumas anidados en nodos n-arios (fusión de sumas y
+    cadenas de productos) y recorre el resto de los nodos.
+    """
+    if isinstance(node, Sum):
+        terms = []
+        for sign, term in node.terms:
+            term = _flatten(term)
+            if isinstance(term, Sum):
+                terms.extend((sign * s, t) for s, t in term.terms)
+            else:
+                terms.append((sign, term))
+        return Sum(terms)
+    if isinstance(node, Product):
+        factors = []
+        for factor in node.factors:
+            factor = _flatten(factor)
+            if isinstance(factor, Product):
+                factors.extend(factor.factors)
+            else:
+                factors.append(factor)
+        return Product(factors)
+    if isinstance(node, (Inverse, Transpose, Det)):
+        return type(node)(_flatten(node.operand))
+    return node
+
+def _chain_order(dims):
+    """
+    Orden óptimo de una cadena de productos (programación dinámica clásica).
+    
+    Args:
+        dims: Dimensiones p0, p1, ..., pk; el factor i es de p[i] x p[i+1]
+    
+    Returns:
+        Tabla split[i][j] con el punto de corte óptimo del tramo i..j
+    """
+    k = len(dims) - 1
+    cost = [[0] * k for _ in range(k)]
+    split = [[0] * k for _ in range(k)]
+    for length in range(1, k):
+        for i in range(k - length):
+            j = i + length
+            cost[i][j] = None
+            for m in range(i, j):
+                c = cost[i][m] + cost[m+1][j] + dims[i] * dims[m+1] * dims[j+1]
+                if cost[i][j] is None or c < cost[i][j]:
+                    cost[i][j] = c
+                    split[i][j] = m
+    return split
+
+def _plan(node, shapes):
+    """
+    Reescribe un árbol ya aplanado en el plan de evaluación.
+    """
+    if isinstance(node, (Ref, Const)):
+        return node
+    if isinstance(node, Sum):
+        return Sum([(sign, _plan(term, shapes)) for sign, term in node.terms])
+    if isinstance(node, Transpose):
+        return Transpose(_plan(node.operand, shapes))
+    if isinstance(node, Det):
+        return Det(_plan(node.operand, shapes))
+    if isinstance(node, Inverse):
+        return Inverse(_plan(node.operand, shapes))
+    if isinstance(node, Product):
+        return _plan_product(node.factors, shapes)
+    raise TypeError(node)
+
+def _plan_product(factors, shapes):
+    """
+    Planifica una cadena de productos: separa los escalares, convierte
+    inv(A) * X en solve(A, X) y X * inv(A) en solve_right(X, A), y ordena los
+    productos restantes para minimizar el número de multiplicaciones.
+    """
+    scalars = [_plan(f, shapes) for f in factors if _shape(f, shapes) is None]
+    matrices = [f for f in factors if _shape(f, shapes) is not None]
+    
+    if matrices:
+        result = _plan_matrix_chain(matrices, shapes)
+    else:
+        result = None
+    
+    if scalars:
+        # Los escalares se combinan primero para escalar la matriz una sola vez
+        scalar = scalars[0]
+        for other in scalars[1:]:
+            scalar = Scale(other, scalar)
+        result = scalar if result is None else Scale(scalar, result)
+    return result
+
+def _plan_matrix_chain(factors, shapes):
+    # inv(A) * resto -> solve(A, resto); se toma la primera inversa con factores a su derecha
+    for i, factor in enumerate(factors):
+        if isinstance(factor, Inverse) and i + 1 < len(factors):
+            rhs = _plan_matrix_chain(factors[i+1:], shapes)
+            solve = Solve(_plan(factor.operand, shapes), rhs)
+            return _plan_matrix_chain(factors[:i] + [solve], shapes) if i else solve
+    # resto * inv(A) -> solve_right(resto, A)
+    if len(factors) > 1 and isinstance(factors[-1], Inverse):
+        rhs = _plan_matrix_chain(factors[:-1], shapes)
+        return Solve(_plan(factors[-1].operand, shapes), rhs, side='right')
+    
+    planned = [f if isinstance(f, Solve) else _plan(f, shapes) for f in factors]
+    if len(planned) == 1:
+        return planned[0]
+    
+    dims = [_shape(planned[0], shapes)[0]] + [_shape(f, shapes)[1] for f in planned]
+    split = _chain_order(dims)
+    
+    def build(i, j):
+        if i == j:
+            return planned[i]
+        m = split[i][j]
+        return MatMul(build(i, m), build(m + 1, j))
+    
+    return build(0, len(planned) - 1)
+
+def plan_expression(node, shapes):
+    """
+    Verifica una expresión y construye su plan de evaluación.
+    
+    Args:
+        node (Node): Árbol devuelto por parse_expression
+        shapes (dict): Dimensiones (filas, columnas) de cada matriz disponible
+    
+    Returns:
+        Node: El plan, listo para evaluate_plan
+    
+    Raises:
+        ExpressionError: Si faltan matrices o las dimensiones no son compatibles
+    """
+    _check(node, shapes)
+    return _plan(_flatten(node), shapes)
+
+# ---------------------------------------------------------------------------
+# Evaluación
+# ---------------------------------------------------------------------------
+
+class _Evaluator:
+    """
+    Evalúa un plan. Cada resultado intermedio se devuelve junto con un
+    indicador de si es un arreglo propio (que puede modificarse en su lugar)
+    o una vista de una matriz almacenada.
+    """
+    
+    def __init__(self, matrices, shapes, factorize):
+        self.matrices = matrices
+        self.shapes = shapes
+        self.factorize = factorize
+    
+    def scalar(self, node):
+        if isinstance(node, Const):
+            return node.value
+        if isinstance(node, Det):
+            return self.factorization(node.operand).det()
+        if isinstance(node, Scale):
+            return self.scalar(node.scalar) * self.scalar(node.operand)
+        if isinstance(node, Sum):
+            return sum(sign * self.scalar(term) for sign, term in node.terms)
+        if isinstance(node, Transpose):
+            return self.scalar(node.operand)
+        raise TypeError(node)
+    
+    def factorization(self, node):
+        """Factorización PA = LU del valor de un nodo, reutilizando la externa si es una referencia."""
+        if isinstance(node, Ref) and self.factorize is not None:
+            factorization = self.factorize(node.name)
+            if factorization is not None:
+                return factorization
+        array, _ = self.matrix(node)
+        return lu_factorization(array, StepTracer(TRACE_NONE))
+    
+    def matrix(self, node):
+        if isinstance(node, Ref):
+            return as_array(self.matrices[node.name]), False
+        if isinstance(node, Transpose):
+            array, owned = self.matrix(node.operand)
+            return array.T, owned
+        if isinstance(node, Scale):
+            factor = self.scalar(node.scalar)
+            array, owned = self.matrix(node.operand)
+            if owned:
+                array *= factor
+                return array, True
+            return array * factor, True
+        if isinstance(node, Sum):
+            return self.sum(node)
+        if isinstance(node, MatMul):
+            left, _ = self.matrix(node.left)
+            right, _ = self.matrix(node.right)
+            return matmul(left, right), True
+        if isinstance(node, Inverse):
+            factorization = self.factorization(node.operand)
+            if factorization.singular:
+                raise ExpressionError(f"La matriz es singular: {node}")
+            return factorization.solve(np.eye(_shape(node, self.shapes)[0])), True
+        if isinstance(node, Solve):
+            factorization = self.factorization(node.matrix)
+            if factorization.singular:
+                raise ExpressionError(f"La matriz es singular: {node.matrix}")
+            rhs, _ = self.matrix(node.rhs)
+            if node.side == 'left':
+                return factorization.solve(rhs), True
+            # XA = B  <=>  A'X' = B'; la factorización densa de A sirve también
+            # para A' (solve_transposed), la dispersa no
+            if hasattr(factorization, 'solve_transposed'):
+                return factorization.solve_transposed(rhs.T).T, True
+            transposed = lu_factorization(as_array(self.matrix(node.matrix)[0]).T, StepTracer(TRACE_NONE))
+            return transposed.solve(rhs.T).T, True
+        raise TypeError(node)
+    
+    def sum(self, node):
+        """
+        Suma n-aria fusionada: un único arreglo de salida acumula todos los
+        términos en su lugar, sin temporales intermedios.
+        """
+        (sign, first), rest = node.terms[0], node.terms[1:]
+        out, owned = self.matrix(first)
+        if not owned or not out.flags.c_contiguous:
+            out = np.array(out)
+        if sign < 0:
+            np.negative(out, out=out)
+        for sign, term in rest:
+            array, _ = self.matrix(term)
+            if sign > 0:
+                np.add(out, array, out=out)
+            else:
+                np.subtract(out, array, out=out)
+        return out, True
+
+def _references(node):
+    """Nombres de las matrices a las que hace referencia una expresión."""
+    if isinstance(node, Ref):
+        return {node.name}
+    names = set()
+    for attribute in node.__slots__:
+        value = getattr(node, attribute)
+        children = value if isinstance(value, list) else [value]
+        for child in children:
+            # Los términos de una suma son pares (signo, término)
+            child = child[1] if isinstance(child, tuple) else child
+            if isinstance(child, Node):
+                names |= _references(child)
+    return names
+
+def evaluate_plan(plan, matrices, shapes, factorize=None):
+    """
+    Evalúa un plan y materializa únicamente el resultado final.
+    
+    Args:
+        plan (Node): Plan devuelto por plan_expression
+        matrices (dict): Matrices disponibles por nombre
+        shapes (dict): Sus dimensiones
+        factorize: Función opcional nombre -> factorización (LUFactorization o
+                   SparseLU) para reutilizar las ya calculadas de las matrices almacenadas
+    
+    Returns:
+        Matrix o float: El valor de la expresión
+    """
+    evaluator = _Evaluator(matrices, shapes, factorize)
+    if _shape(plan, shapes) is None:
+        return float(evaluator.scalar(plan))
+    array, owned = evaluator.matrix(plan)
+    return Matrix(array if owned else array.copy())
+
+def evaluate_expression(text, matrices, tracer=None, factorize=None):
+    """
+    Analiza, planifica y evalúa una expresión sobre un conjunto de matrices.
+    
+    Args:
+        text (str): La expresión, por ejemplo "inv(A) * (B + C) * D"
+        matrices (dict): Matrices disponibles por nombre (un diccionario o un
+                         MatrixStore, del que solo se abren las que usa la expresión)
+        tracer: Registro de pasos (StepTracer); por defecto se imprimen en consola
+        factorize: Función opcional nombre -> LUFactorization (ver evaluate_plan)
+    
+    Returns:
+        Matrix o float: El valor de la expresión
+    
+    Raises:
+        ExpressionError: Si la expresión no es válida o no puede evaluarse
+    """
+    tracer = _resolve_tracer(tracer)
+    node = parse_expression(text)
+    # Dimensiones solo de las matrices que aparecen en la expresión; un almacén
+    # las lee de su índice sin abrirlas
+    shape_of = getattr(matrices, 'shape', None)
+    shapes = {name: shape_of(name) if shape_of is not None else get_matrix_dimensions(matrices[name])
+              for name in _references(node) if name in matrices}
+    plan = plan_expression(node, shapes)
+    tracer.step("Expresión: {}", text)
+    tracer.step("Plan de evaluación: {}", plan)
+    result = evaluate_plan(plan, matrices, shapes, factorize)
+    tracer.step("Resultado:")
+    if isinstance(result, Matrix):
+        tracer.matrix(result, detail=False)
+    else:
+        tracer.step("{:.4f}", result)
+    return result
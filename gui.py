@@ -5,40 +5,108 @@ de álgebra lineal como suma, resta, multiplicación de matrices, cálculo de de
 inversión de matrices, y métodos de resolución de sistemas de ecuaciones lineales.
 
 """
-from flask import Flask, render_template, request, jsonify
+import os
+from flask import Flask, Response, render_template, request, jsonify
 import numpy as np
-import io
-import sys
-import contextlib
 from Calculadora import (
-    print_matrix, get_matrix_dimensions, add_matrices, subtract_matrices, 
+    Matrix, LUFactorization, print_matrix, get_matrix_dimensions, add_matrices, subtract_matrices, 
     multiply_matrices, determinant, calculate_inverse, gaussian_elimination, 
-    gauss_jordan_elimination, lu_factorization, back_substitution
+    gauss_jordan_elimination, lu_factorization, back_substitution, condition_number,
+    solve_linear_systems, rank_update,
+    StepTracer, capture_steps, TRACE_NONE, TRACE_FULL, TRACE_LEVELS, DETERMINANT_LU, DETERMINANT_COFACTOR,
+    DETERMINANT_METHODS, ILL_CONDITIONED_THRESHOLD
+)
+from expressions import evaluate_expression, ExpressionError
+from exact import (
+    exact_determinant, exact_echelon_form, exact_inverse, exact_response, format_fraction, DETERMINANT_EXACT
+)
+from sparse import SparseMatrix, sparse_lu
+from store import MatrixStore, FORMAT_SPARSE
+from responses import MatrixJSONProvider, compress_response
+from streaming import streamable, format_event, EVENT_STREAM_MIMETYPE
+from memo import ResultCache, freeze, DEFAULT_CACHE_BYTES
+from jobs import JobManager, JOB_OPERATIONS, FINISHED_STATES, MAX_ACTIVE_JOBS
+from matrix_io import (
+    parse_json_matrix, parse_csv_matrix, parse_npy_matrix, check_matrix_size,
+    import_csv, import_matrix_market, import_matrix_market_sparse,
+    MAX_MATRIX_ROWS, MAX_MATRIX_COLS, MAX_MATRIX_ELEMENTS
 )
 
 # Inicialización de la aplicación Flask
 app = Flask(__name__)
+# Las rutas devuelven los resultados como arreglos NumPy: app.json los serializa
+# directamente (o en formato binario, si el cliente lo pide) y las respuestas
+# grandes se comprimen
+app.json = MatrixJSONProvider(app)
+app.after_request(compress_response)
+
+# Tamaño por defecto (filas y columnas) y número máximo de elementos de una
+# ventana de /matrix_tile
+DEFAULT_TILE_SIZE = 20
+MAX_TILE_ELEMENTS = 250_000
+
+# Límites de tamaño de las matrices creadas y del cuerpo de las peticiones;
+# se pueden cambiar con variables de entorno (p. ej. FLASK_MAX_MATRIX_ROWS=20000)
+app.config.update(
+    MAX_CONTENT_LENGTH=256 * 1024 * 1024,
+    MAX_MATRIX_ROWS=MAX_MATRIX_ROWS,
+    MAX_MATRIX_COLS=MAX_MATRIX_COLS,
+    MAX_MATRIX_ELEMENTS=MAX_MATRIX_ELEMENTS,
+    MAX_TILE_ELEMENTS=MAX_TILE_ELEMENTS,
+    # Procesos para los trabajos asíncronos (None = uno por núcleo) y número
+    # máximo de trabajos sin terminar
+    JOB_WORKERS=None,
+    MAX_ACTIVE_JOBS=MAX_ACTIVE_JOBS,
+    # Presupuesto en bytes de la caché de resultados (0 la desactiva)
+    RESULT_CACHE_BYTES=DEFAULT_CACHE_BYTES
+)
+app.config.from_prefixed_env()
+
+# Diccionario para almacenar matrices, persistido en disco (un .npy por matriz
+# más un índice SQLite) y compartido por todos los procesos que usen el mismo
+# directorio. MATRIX_STORE_DIR elige el directorio; vacío = solo en memoria.
+stored_matrices = MatrixStore(os.environ.get('MATRIX_STORE_DIR', os.path.join(app.instance_path, 'matrices')) or None)
+# Factorizaciones PA = LU ya calculadas en este proceso, por ID de matriz
+# almacenada: (versión de la matriz, factorización)
+factorization_cache = {}
+# Resultados ya calculados en este proceso, por operación, parámetros y
+# contenido de la matriz (ver memo.py)
+result_cache = ResultCache(app.config['RESULT_CACHE_BYTES'])
 
-# Diccionario para almacenar matrices
-stored_matrices = {}
-next_matrix_id = 0  # Para controlar la asignación de letras como IDs
-freed_matrix_ids = []  # Para almacenar IDs liberados que pueden ser reutilizados
+# Tamaño máximo para la expansión por cofactores, cuyo costo crece como n!
+MAX_COFACTOR_SIZE = 8
 
-@contextlib.contextmanager
-def capture_stdout():
+# Intentos de /edit_matrix cuando otro proceso modifica la misma matriz a la vez
+EDIT_ATTEMPTS = 5
+
+def get_steps_level():
     """
-    Captura la salida estándar para poder registrar los pasos de cálculo.
+    Obtiene el nivel de detalle de los pasos solicitado en la petición actual
+    mediante el parámetro 'steps' ('none', 'summary' o 'full').
     
     Returns:
-        str: El texto capturado de la salida estándar
+        str: El nivel solicitado ('full' por defecto)
     """
-    stdout_backup = sys.stdout
-    string_io = io.StringIO()
-    sys.stdout = string_io
-    try:
-        yield string_io
-    finally:
-        sys.stdout = stdout_backup
+    level = request.values.get('steps', TRACE_FULL)
+    if level not in TRACE_LEVELS:
+        level = TRACE_FULL
+    return level
+
+def matrix_size_limits():
+    """
+    Límites de tamaño configurados para crear matrices (ver matrix_io.check_matrix_size).
+    """
+    return {
+        'max_rows': app.config['MAX_MATRIX_ROWS'],
+        'max_cols': app.config['MAX_MATRIX_COLS'],
+        'max_elements': app.config['MAX_MATRIX_ELEMENTS']
+    }
+
+def exact_requested():
+    """
+    Indica si la petición actual solicita aritmética exacta (parámetro 'exact').
+    """
+    return request.values.get('exact', 'false') == 'true'
 
 def get_next_matrix_id():
     """
@@ -48,25 +116,132 @@ def get_next_matrix_id():
     Returns:
         str: Un ID único en formato de letra para identificar matrices
     """
-    global next_matrix_id, freed_matrix_ids
+    return stored_matrices.allocate_id()
+
+def store_matrix(matrix_id, matrix):
+    """
+    Guarda una matriz con el ID indicado, descartando la factorización que
+    hubiera en caché para ese ID.
+    
+    Args:
+        matrix_id (str): ID de la matriz
+        matrix: La matriz a almacenar
+    """
+    stored_matrices[matrix_id] = matrix
+    invalidate_factorization(matrix_id)
+
+def invalidate_factorization(matrix_id):
+    """
+    Descarta la factorización en caché de una matriz (al eliminarla o modificarla).
+    """
+    factorization_cache.pop(matrix_id, None)
+
+def cached_factorization(matrix_id):
+    """
+    Devuelve la factorización en caché de una matriz, o None si no la hay o si
+    la matriz se modificó después de calcularla (en este o en otro proceso).
+    """
+    entry = factorization_cache.get(matrix_id)
+    if entry is not None and entry[0] == stored_matrices.version(matrix_id):
+        return entry[1]
+    return None
+
+def cache_factorization(matrix_id, factorization):
+    """
+    Guarda en caché la factorización de una matriz junto con su versión actual.
+    """
+    factorization_cache[matrix_id] = (stored_matrices.version(matrix_id), factorization)
+
+def get_factorization(matrix_id):
+    """
+    Obtiene la factorización PA = LU de una matriz almacenada, calculándola solo
+    la primera vez. Las resoluciones posteriores con la misma matriz se reducen
+    a sustituciones triangulares O(n^2).
     
-    # Primero revisar si hay IDs liberados disponibles para reutilizar
-    if freed_matrix_ids:
-        return freed_matrix_ids.pop(0)  # Tomar y devolver el primer ID liberado
+    Args:
+        matrix_id (str): ID de una matriz almacenada
     
-    # Si no hay IDs liberados, generar uno nuevo
-    # Para los primeros 26 IDs, usar letras simples A-Z
-    if next_matrix_id < 26:
-        matrix_id = chr(65 + next_matrix_id)  # 65 es el código ASCII para 'A'
-    else:
-        # Para IDs posteriores, usar AA, AB, AC, etc.
-        first_letter_index = (next_matrix_id // 26) - 1
-        second_letter_index = next_matrix_id % 26
-        matrix_id = chr(65 + first_letter_index) + chr(65 + second_letter_index)
+    Las matrices dispersas se factorizan sin densificarlas (SparseLU).
+    
+    Returns:
+        LUFactorization, SparseLU o None si la matriz no es cuadrada
+    """
+    factorization = cached_factorization(matrix_id)
+    matrix = stored_matrices[matrix_id]
+    if factorization is None and isinstance(matrix, SparseMatrix):
+        rows, cols = matrix.shape
+        factorization = sparse_lu(matrix) if rows == cols else None
+        if factorization is not None:
+            cache_factorization(matrix_id, factorization)
+    elif factorization is None:
+        factorization = lu_factorization(matrix, StepTracer(TRACE_NONE))
+        if factorization is not None:
+            cache_factorization(matrix_id, factorization)
+    return factorization
+
+def result_key(operation, content_key, level, **params):
+    """
+    Clave de la caché de resultados: operación, contenido de la matriz, nivel
+    de pasos y parámetros que afectan al resultado.
+    """
+    return (operation, content_key, level, tuple(sorted(params.items())))
+
+def memoized_result(operation, matrix_id, compute, **params):
+    """
+    Obtiene el resultado de una operación sobre una matriz almacenada desde la
+    caché de resultados, o lo calcula con compute() y lo guarda en ella.
+    
+    compute() se ejecuta capturando los pasos al nivel de la petición y
+    devuelve un diccionario con los campos del resultado; se le añade 'steps'
+    con el registro de pasos. La clave incluye el contenido de la matriz, de
+    modo que un resultado nunca queda obsoleto al modificarla.
+    
+    Args:
+        operation (str): Nombre de la operación
+        matrix_id (str): ID de la matriz almacenada
+        compute: Función sin argumentos que realiza el cálculo
+        **params: Parámetros que afectan al resultado (valores hashables)
+    
+    Returns:
+        dict: El resultado (compartido con la caché: no debe modificarse)
+    """
+    level = get_steps_level()
+    key = result_key(operation, stored_matrices.content_key(matrix_id), level, **params)
+    result = result_cache.get(key)
+    with capture_steps(level) as output:
+        if result is None:
+            result = compute()
+            result['steps'] = output.render()
+            # En streaming los pasos no se acumulan, así que no hay registro que guardar
+            if output.stream is None:
+                result_cache.put(key, freeze(result))
+        elif output.stream is not None and result['steps']:
+            output.stream.write(result['steps'])
+    if output.stream is not None:
+        result = {**result, 'steps': ''}
+    return result
+
+def store_new_matrix(matrix):
+    """
+    Guarda una matriz resultado con un ID nuevo.
     
-    next_matrix_id += 1
+    Returns:
+        str: El ID asignado
+    """
+    matrix_id = get_next_matrix_id()
+    store_matrix(matrix_id, matrix)
     return matrix_id
 
+# Trabajos asíncronos de este proceso (ver jobs.py); sus resultados se guardan
+# en stored_matrices con IDs nuevos
+job_manager = JobManager(store_new_matrix, max_workers=app.config['JOB_WORKERS'],
+                         max_active_jobs=app.config['MAX_ACTIVE_JOBS'])
+
+# Segundos entre comprobaciones del estado de un trabajo en /jobs/<id>/events
+JOB_EVENTS_POLL_INTERVAL = 1.0
+# Número máximo de caracteres de pasos por evento de /jobs/<id>/events
+JOB_EVENTS_CHUNK_SIZE = 64 * 1024
+
 @app.route('/')
 def index():
     """
@@ -82,51 +257,265 @@ def create_matrix():
     """
     Crea una nueva matriz a partir de los datos proporcionados por el usuario.
     
+    El cuerpo de la petición se interpreta según su tipo de contenido:
+        - application/json: una lista de filas, o {"data": [...], "format": "sparse"}
+        - text/csv: una fila por línea; 'delimiter' (en la URL) elige el separador
+        - application/octet-stream o application/x-npy: un archivo .npy de NumPy
+        - formulario: 'rows', 'cols' y un campo 'cell_i_j' por elemento
+    Los tres primeros se leen en una sola pasada vectorizada. 'format=sparse' (en
+    la URL o en el formulario) guarda la matriz en formato disperso.
+    
     Returns:
-        json: Respuesta JSON con el ID y los datos de la matriz creada
+        json: Respuesta JSON con el ID y las dimensiones de la matriz creada (y
+              sus datos, si se envió como formulario)
     """
-    rows = int(request.form['rows'])
-    cols = int(request.form['cols'])
-    matrix_data = []
-    
-    for i in range(rows):
-        row = []
-        for j in range(cols):
-            value = float(request.form.get(f'cell_{i}_{j}', 0))
-            row.append(value)
-        matrix_data.append(row)
+    limits = matrix_size_limits()
+    sparse = request.values.get('format') == 'sparse'
+    from_form = False
+    try:
+        if request.mimetype == 'application/json':
+            payload = request.get_json(silent=True)
+            if isinstance(payload, dict):
+                sparse = sparse or payload.get('format') == 'sparse'
+                payload = payload.get('data')
+            matrix = parse_json_matrix(payload, **limits)
+        elif request.mimetype == 'text/csv':
+            matrix = parse_csv_matrix(request.get_data(as_text=True), request.args.get('delimiter'), **limits)
+        elif request.mimetype in ('application/octet-stream', 'application/x-npy'):
+            matrix = parse_npy_matrix(request.get_data(), **limits)
+        else:
+            from_form = True
+            rows = int(request.form['rows'])
+            cols = int(request.form['cols'])
+            check_matrix_size(rows, cols, **limits)
+            matrix = Matrix([[float(request.form.get(f'cell_{i}_{j}', 0)) for j in range(cols)]
+                             for i in range(rows)])
+    except (KeyError, ValueError) as error:
+        return jsonify({
+            'success': False,
+            'message': f'Datos de matriz inválidos: {error}'
+        })
     
     # Asignar un ID a la matriz (ahora una letra)
     matrix_id = get_next_matrix_id()
-    stored_matrices[matrix_id] = matrix_data
+    if sparse:
+        store_matrix(matrix_id, SparseMatrix.from_dense(matrix.array))
+    else:
+        store_matrix(matrix_id, matrix)
     
-    return jsonify({
+    rows, cols = matrix.shape
+    response = {
         'success': True,
         'message': f'Matriz {matrix_id} creada y almacenada',
         'matrix_id': matrix_id,
         'rows': rows,
+        'cols': cols
+    }
+    # Las cargas masivas no repiten los datos que el cliente acaba de enviar
+    if from_form:
+        response['matrix'] = matrix
+    return jsonify(response)
+
+def import_progress_logger(matrix_id):
+    """
+    Crea una función de progreso para los importadores que registra en el log
+    de la aplicación cada avance de al menos un 10%.
+    """
+    last_percent = [-10]
+    
+    def progress(done, total):
+        percent = done * 100 // total
+        if percent >= last_percent[0] + 10:
+            last_percent[0] = percent
+            app.logger.info("Importando matriz %s: %d de %d (%d%%)", matrix_id, done, total, percent)
+    
+    return progress
+
+@app.route('/import_matrix', methods=['POST'])
+def import_matrix():
+    """
+    Importa una matriz desde un archivo CSV o Matrix Market (.mtx) enviado como
+    cuerpo de la petición, leyéndolo por bloques sin cargarlo completo en
+    memoria. Las matrices densas se escriben directamente en el archivo del
+    almacén; el avance se registra en el log de la aplicación.
+    
+    Parámetros (en la URL):
+        format: 'csv' o 'mtx' (por defecto, 'mtx' si el tipo de contenido es
+                de Matrix Market y 'csv' en otro caso)
+        sparse: 'true' para guardar un archivo .mtx 'coordinate' como matriz dispersa
+        delimiter: Separador de columnas del CSV
+    
+    Returns:
+        json: Respuesta JSON con el ID y las dimensiones de la matriz importada
+    """
+    file_format = request.args.get('format')
+    if file_format is None:
+        file_format = 'mtx' if request.mimetype in ('text/x-matrix-market', 'application/x-matrix-market') else 'csv'
+    if file_format not in ('csv', 'mtx'):
+        return jsonify({
+            'success': False,
+            'message': f'Formato de importación desconocido: {file_format}'
+        })
+    
+    limits = matrix_size_limits()
+    matrix_id = get_next_matrix_id()
+    progress = import_progress_logger(matrix_id)
+    try:
+        if file_format == 'mtx' and request.args.get('sparse') == 'true':
+            matrix = import_matrix_market_sparse(request.stream, progress=progress, **limits)
+            store_matrix(matrix_id, matrix)
+            rows, cols = matrix.shape
+        else:
+            allocate = lambda shape: stored_matrices.dense_writer(matrix_id, shape)
+            if file_format == 'mtx':
+                rows, cols = import_matrix_market(request.stream, allocate, progress=progress, **limits)
+            else:
+                rows, cols = import_csv(request.stream, allocate, request.args.get('delimiter'),
+                                        progress=progress, **limits)
+            invalidate_factorization(matrix_id)
+    except ValueError as error:
+        stored_matrices.release_id(matrix_id)
+        return jsonify({
+            'success': False,
+            'message': f'No se pudo importar la matriz: {error}'
+        })
+    
+    return jsonify({
+        'success': True,
+        'message': f'Matriz {matrix_id} importada y almacenada',
+        'matrix_id': matrix_id,
+        'rows': rows,
+        'cols': cols,
+        'sparse': isinstance(stored_matrices[matrix_id], SparseMatrix)
+    })
+
+@app.route('/create_sparse_matrix', methods=['POST'])
+def create_sparse_matrix():
+    """
+    Crea una matriz dispersa a partir de sus elementos no nulos, sin pasar por
+    su forma densa.
+    
+    Recibe un JSON con 'rows', 'cols' y 'entries', una lista de tripletas
+    [fila, columna, valor] con índices desde 0.
+    
+    Returns:
+        json: Respuesta JSON con el ID asignado, las dimensiones y el número de elementos no nulos
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        rows = int(payload['rows'])
+        cols = int(payload['cols'])
+        entries = np.asarray(payload.get('entries', []), dtype=np.float64).reshape(-1, 3)
+        if np.any(entries[:, :2] != np.floor(entries[:, :2])):
+            raise ValueError('los índices deben ser enteros')
+        matrix = SparseMatrix.from_coo(entries[:, 0], entries[:, 1], entries[:, 2], (rows, cols))
+    except (KeyError, TypeError, ValueError) as error:
+        return jsonify({
+            'success': False,
+            'message': f'Datos de matriz dispersa inválidos: {error}'
+        })
+    
+    matrix_id = get_next_matrix_id()
+    store_matrix(matrix_id, matrix)
+    
+    return jsonify({
+        'success': True,
+        'message': f'Matriz dispersa {matrix_id} creada y almacenada',
+        'matrix_id': matrix_id,
+        'rows': rows,
         'cols': cols,
-        'matrix': matrix_data
+        'nnz': matrix.nnz
     })
 
 @app.route('/view_matrices')
 def view_matrices():
     """
-    Obtiene información de todas las matrices almacenadas.
+    Obtiene información de todas las matrices almacenadas, sin sus elementos:
+    se lee del índice del almacén sin abrir ninguna matriz. Los elementos se
+    piden por partes con /matrix_tile.
     
     Returns:
-        json: Diccionario con información de todas las matrices (dimensiones y datos)
+        json: Diccionario con las dimensiones, el tipo de datos, la versión y
+              el formato de cada matriz
     """
     matrices_info = {}
-    for matrix_id, matrix in stored_matrices.items():
-        rows, cols = get_matrix_dimensions(matrix)
+    for matrix_id, entry in stored_matrices.metadata().items():
         matrices_info[matrix_id] = {
-            'rows': rows,
-            'cols': cols,
-            'data': matrix
+            'rows': entry['rows'],
+            'cols': entry['cols'],
+            'dtype': 'float64',
+            'version': entry['version'],
+            'sparse': entry['format'] == FORMAT_SPARSE
         }
     return jsonify(matrices_info)
 
+@app.route('/matrix_tile/<matrix_id>')
+def matrix_tile(matrix_id):
+    """
+    Devuelve una ventana de filas y columnas de una matriz almacenada. Solo se
+    leen los elementos de la ventana (las páginas correspondientes del archivo
+    con mmap, o los no nulos de esas filas si la matriz es dispersa).
+    
+    Parámetros (en la URL):
+        row, col: Primera fila y primera columna de la ventana (desde 0)
+        rows, cols: Tamaño de la ventana; se recorta a los bordes de la matriz
+    
+    Returns:
+        json: Respuesta JSON con la posición, el tamaño y los datos de la ventana,
+              las dimensiones totales y la versión de la matriz
+    """
+    try:
+        matrix = stored_matrices[matrix_id]
+        version = stored_matrices.version(matrix_id)
+    except KeyError:
+        return jsonify({
+            'success': False,
+            'message': 'ID de matriz inválido'
+        })
+    try:
+        row = int(request.args.get('row', 0))
+        col = int(request.args.get('col', 0))
+        tile_rows = int(request.args.get('rows', DEFAULT_TILE_SIZE))
+        tile_cols = int(request.args.get('cols', DEFAULT_TILE_SIZE))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'La posición y el tamaño de la ventana deben ser enteros'
+        })
+    
+    total_rows, total_cols = matrix.shape
+    if row < 0 or col < 0 or tile_rows < 1 or tile_cols < 1:
+        return jsonify({
+            'success': False,
+            'message': 'La posición no puede ser negativa y el tamaño debe ser positivo'
+        })
+    if tile_rows * tile_cols > app.config['MAX_TILE_ELEMENTS']:
+        return jsonify({
+            'success': False,
+            'message': f"La ventana no puede tener más de {app.config['MAX_TILE_ELEMENTS']} elementos"
+        })
+    row_stop = min(row + tile_rows, total_rows)
+    col_stop = min(col + tile_cols, total_cols)
+    row, col = min(row, row_stop), min(col, col_stop)
+    
+    if isinstance(matrix, SparseMatrix):
+        window = matrix.window(row, row_stop, col, col_stop)
+    else:
+        window = matrix.array[row:row_stop, col:col_stop]
+    
+    return jsonify({
+        'success': True,
+        'matrix_id': matrix_id,
+        'version': version,
+        'row': row,
+        'col': col,
+        'rows': row_stop - row,
+        'cols': col_stop - col,
+        'total_rows': total_rows,
+        'total_cols': total_cols,
+        'data': window
+    })
+
 @app.route('/add_matrices', methods=['POST'])
 def add_matrices_route():
     """
@@ -144,15 +533,15 @@ def add_matrices_route():
             'message': 'IDs de matriz inválidos'
         })
     
-    # Capturar los pasos del cálculo
-    with capture_stdout() as output:
+    # Capturar los pasos del cálculo en el contexto de esta petición
+    with capture_steps(get_steps_level()) as output:
         result = add_matrices(stored_matrices[matrix1_id], stored_matrices[matrix2_id])
     
-    steps = output.getvalue()
+    steps = output.render()
     
     if result is not None:
         matrix_id = get_next_matrix_id()
-        stored_matrices[matrix_id] = result
+        store_matrix(matrix_id, result)
         return jsonify({
             'success': True,
             'message': f'Resultado guardado como Matriz {matrix_id}',
@@ -183,15 +572,15 @@ def subtract_matrices_route():
             'message': 'IDs de matriz inválidos'
         })
     
-    # Capturar los pasos del cálculo
-    with capture_stdout() as output:
+    # Capturar los pasos del cálculo en el contexto de esta petición
+    with capture_steps(get_steps_level()) as output:
         result = subtract_matrices(stored_matrices[matrix1_id], stored_matrices[matrix2_id])
     
-    steps = output.getvalue()
+    steps = output.render()
     
     if result is not None:
         matrix_id = get_next_matrix_id()
-        stored_matrices[matrix_id] = result
+        store_matrix(matrix_id, result)
         return jsonify({
             'success': True,
             'message': f'Resultado guardado como Matriz {matrix_id}',
@@ -222,15 +611,15 @@ def multiply_matrices_route():
             'message': 'IDs de matriz inválidos'
         })
     
-    # Capturar los pasos del cálculo
-    with capture_stdout() as output:
+    # Capturar los pasos del cálculo en el contexto de esta petición
+    with capture_steps(get_steps_level()) as output:
         result = multiply_matrices(stored_matrices[matrix1_id], stored_matrices[matrix2_id])
     
-    steps = output.getvalue()
+    steps = output.render()
     
     if result is not None:
         matrix_id = get_next_matrix_id()
-        stored_matrices[matrix_id] = result
+        store_matrix(matrix_id, result)
         return jsonify({
             'success': True,
             'message': f'Resultado guardado como Matriz {matrix_id}',
@@ -248,11 +637,13 @@ def multiply_matrices_route():
 def determinant_route():
     """
     Calcula el determinante de una matriz.
+    Usa eliminación con pivoteo parcial, o expansión por cofactores si se indica method=cofactor.
     
     Returns:
         json: Respuesta JSON con el valor del determinante calculado y los pasos del cálculo
     """
     matrix_id = request.form['matrix_id']
+    method = request.form.get('method', DETERMINANT_LU)
     
     if matrix_id not in stored_matrices:
         return jsonify({
@@ -260,17 +651,42 @@ def determinant_route():
             'message': 'ID de matriz inválido'
         })
     
-    # Capturar los pasos del cálculo
-    with capture_stdout() as output:
-        det = determinant(stored_matrices[matrix_id])
+    if method not in DETERMINANT_METHODS and method != DETERMINANT_EXACT:
+        return jsonify({
+            'success': False,
+            'message': 'Método de determinante inválido'
+        })
+    
+    rows, _ = get_matrix_dimensions(stored_matrices[matrix_id])
+    if method == DETERMINANT_COFACTOR and rows > MAX_COFACTOR_SIZE:
+        return jsonify({
+            'success': False,
+            'message': f'La expansión por cofactores solo está disponible hasta matrices {MAX_COFACTOR_SIZE}x{MAX_COFACTOR_SIZE}.'
+        })
+    
+    def compute():
+        if method == DETERMINANT_EXACT:
+            det = exact_determinant(stored_matrices[matrix_id])
+            return {
+                'determinant': None if det is None else float(det),
+                'exact_determinant': None if det is None else format_fraction(det)
+            }
+        return {'determinant': determinant(stored_matrices[matrix_id], method=method)}
     
-    steps = output.getvalue()
+    result = memoized_result('determinant', matrix_id, compute, method=method)
     
-    if det is not None:
+    if result['determinant'] is not None and method == DETERMINANT_EXACT:
         return jsonify({
             'success': True,
-            'determinant': det,
-            'steps': steps
+            'determinant': result['determinant'],
+            'exact_determinant': result['exact_determinant'],
+            'steps': result['steps']
+        })
+    elif result['determinant'] is not None:
+        return jsonify({
+            'success': True,
+            'determinant': result['determinant'],
+            'steps': result['steps']
         })
     else:
         return jsonify({
@@ -279,6 +695,7 @@ def determinant_route():
         })
 
 @app.route('/inverse', methods=['POST'])
+@streamable
 def inverse_route():
     """
     Calcula la matriz inversa de una matriz dada.
@@ -294,21 +711,37 @@ def inverse_route():
             'message': 'ID de matriz inválido'
         })
     
-    # Capturar los pasos del cálculo
-    with capture_stdout() as output:
-        result = calculate_inverse(stored_matrices[matrix_id])
+    exact = exact_requested()
     
-    steps = output.getvalue()
+    def compute():
+        exact_result = None
+        if exact:
+            exact_rows = exact_inverse(stored_matrices[matrix_id])
+            result = None
+            if exact_rows is not None:
+                result, exact_result = exact_response(exact_rows)
+        else:
+            result = calculate_inverse(stored_matrices[matrix_id])
+        # Número de condición para advertir si la inversa es imprecisa
+        cond = condition_number(stored_matrices[matrix_id], result) if result is not None else None
+        return {'result': result, 'exact_result': exact_result, 'condition_number': cond}
+    
+    cached = memoized_result('inverse', matrix_id, compute, exact=exact)
+    result = cached['result']
     
     if result is not None:
+        cond = cached['condition_number']
         matrix_id = get_next_matrix_id()
-        stored_matrices[matrix_id] = result
+        store_matrix(matrix_id, result)
         return jsonify({
             'success': True,
             'message': f'Inversa guardada como Matriz {matrix_id}',
             'matrix_id': matrix_id,
             'result': result,
-            'steps': steps
+            'exact_result': cached['exact_result'],
+            'condition_number': cond,
+            'ill_conditioned': bool(cond > ILL_CONDITIONED_THRESHOLD),
+            'steps': cached['steps']
         })
     else:
         return jsonify({
@@ -317,6 +750,7 @@ def inverse_route():
         })
 
 @app.route('/gaussian_elimination', methods=['POST'])
+@streamable
 def gaussian_elimination_route():
     """
     Aplica el método de eliminación gaussiana a una matriz.
@@ -334,47 +768,75 @@ def gaussian_elimination_route():
             'message': 'ID de matriz inválido'
         })
     
-    # Capturar los pasos del cálculo
-    with capture_stdout() as output:
-        if solve_system:
-            # Obtener el vector b
-            b_vector = []
-            rows, _ = get_matrix_dimensions(stored_matrices[matrix_id])
-            for i in range(rows):
-                b_vector.append(float(request.form.get(f'b_{i}', 0)))
+    level = get_steps_level()
+    
+    if solve_system:
+        # Obtener el vector b
+        b_vector = []
+        rows, _ = get_matrix_dimensions(stored_matrices[matrix_id])
+        for i in range(rows):
+            b_vector.append(float(request.form.get(f'b_{i}', 0)))
+        
+        # Sin pasos que mostrar, se reutiliza la factorización en caché:
+        # U es la forma escalonada que produce la eliminación con pivoteo parcial
+        factorization = get_factorization(matrix_id) if level == TRACE_NONE else None
+        if isinstance(factorization, LUFactorization) and not factorization.singular:
+            x = factorization.solve(b_vector)
+            U = factorization.U
+            return jsonify({
+                'success': True,
+                'echelon_form': U,
+                'b_echelon': U.array @ x,
+                'solution': x,
+                'steps': ''
+            })
             
+        def compute():
             A_echelon, b_echelon = gaussian_elimination(stored_matrices[matrix_id], b_vector)
             x = back_substitution(A_echelon, b_echelon)
-            steps = output.getvalue()
-            
-            if x is not None:
-                return jsonify({
-                    'success': True,
-                    'echelon_form': A_echelon,
-                    'b_echelon': b_echelon,
-                    'solution': x,
-                    'steps': steps
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'message': 'No se pudo resolver el sistema.'
-                })
-        else:
-            result, _ = gaussian_elimination(stored_matrices[matrix_id])
-            steps = output.getvalue()
-            
-            new_matrix_id = get_next_matrix_id()
-            stored_matrices[new_matrix_id] = result
+            return {'echelon_form': A_echelon, 'b_echelon': b_echelon, 'solution': x}
+        
+        result = memoized_result('gaussian_elimination', matrix_id, compute, b=tuple(b_vector))
+        
+        if result['solution'] is not None:
             return jsonify({
                 'success': True,
-                'message': f'Forma escalonada guardada como Matriz {new_matrix_id}',
-                'matrix_id': new_matrix_id,
-                'result': result,
-                'steps': steps
+                'echelon_form': result['echelon_form'],
+                'b_echelon': result['b_echelon'],
+                'solution': result['solution'],
+                'steps': result['steps']
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'message': 'No se pudo resolver el sistema.'
             })
+    else:
+        exact = exact_requested()
+        
+        def compute():
+            exact_result = None
+            if exact:
+                result, exact_result = exact_response(exact_echelon_form(stored_matrices[matrix_id], reduced=False))
+            else:
+                result, _ = gaussian_elimination(stored_matrices[matrix_id])
+            return {'result': result, 'exact_result': exact_result}
+        
+        cached = memoized_result('gaussian_elimination', matrix_id, compute, exact=exact)
+        
+        new_matrix_id = get_next_matrix_id()
+        store_matrix(new_matrix_id, cached['result'])
+        return jsonify({
+            'success': True,
+            'message': f'Forma escalonada guardada como Matriz {new_matrix_id}',
+            'matrix_id': new_matrix_id,
+            'result': cached['result'],
+            'exact_result': cached['exact_result'],
+            'steps': cached['steps']
+        })
 
 @app.route('/gauss_jordan', methods=['POST'])
+@streamable
 def gauss_jordan_route():
     """
     Aplica el método de eliminación Gauss-Jordan a una matriz.
@@ -392,46 +854,147 @@ def gauss_jordan_route():
             'message': 'ID de matriz inválido'
         })
     
-    # Capturar los pasos del cálculo
-    with capture_stdout() as output:
-        if solve_system:
-            # Obtener el vector b
-            b_vector = []
-            rows, _ = get_matrix_dimensions(stored_matrices[matrix_id])
-            for i in range(rows):
-                b_vector.append(float(request.form.get(f'b_{i}', 0)))
-            
-            A_rref, b_rref = gauss_jordan_elimination(stored_matrices[matrix_id], b_vector)
-            steps = output.getvalue()
-            
+    level = get_steps_level()
+    
+    if solve_system:
+        # Obtener el vector b
+        b_vector = []
+        rows, _ = get_matrix_dimensions(stored_matrices[matrix_id])
+        for i in range(rows):
+            b_vector.append(float(request.form.get(f'b_{i}', 0)))
+        
+        # Sin pasos que mostrar, se reutiliza la factorización en caché
+        # (la forma escalonada reducida de una matriz no singular es la identidad)
+        factorization = get_factorization(matrix_id) if level == TRACE_NONE else None
+        if factorization is not None and not factorization.singular:
             return jsonify({
                 'success': True,
-                'rref_form': A_rref,
-                'solution': b_rref,
-                'steps': steps
+                'rref_form': np.eye(rows),
+                'solution': factorization.solve(b_vector),
+                'steps': ''
             })
-        else:
-            result, _ = gauss_jordan_elimination(stored_matrices[matrix_id])
-            steps = output.getvalue()
-            
-            new_matrix_id = get_next_matrix_id()
-            stored_matrices[new_matrix_id] = result
+        
+        def compute():
+            A_rref, b_rref = gauss_jordan_elimination(stored_matrices[matrix_id], b_vector)
+            return {'rref_form': A_rref, 'solution': b_rref}
+        
+        result = memoized_result('gauss_jordan', matrix_id, compute, b=tuple(b_vector))
+        
+        return jsonify({
+            'success': True,
+            'rref_form': result['rref_form'],
+            'solution': result['solution'],
+            'steps': result['steps']
+        })
+    else:
+        exact = exact_requested()
+        
+        def compute():
+            exact_result = None
+            if exact:
+                result, exact_result = exact_response(exact_echelon_form(stored_matrices[matrix_id], reduced=True))
+            else:
+                result, _ = gauss_jordan_elimination(stored_matrices[matrix_id])
+            return {'result': result, 'exact_result': exact_result}
+        
+        cached = memoized_result('gauss_jordan', matrix_id, compute, exact=exact)
+        
+        new_matrix_id = get_next_matrix_id()
+        store_matrix(new_matrix_id, cached['result'])
+        return jsonify({
+            'success': True,
+            'message': f'Forma escalonada reducida guardada como Matriz {new_matrix_id}',
+            'matrix_id': new_matrix_id,
+            'result': cached['result'],
+            'exact_result': cached['exact_result'],
+            'steps': cached['steps']
+        })
+
+@app.route('/solve', methods=['POST'])
+def solve_route():
+    """
+    Resuelve AX = B para una matriz almacenada A y varios términos independientes
+    a la vez, con una sola factorización de A (la de la caché, si existe).
+    
+    B puede ser otra matriz almacenada ('rhs_id') o enviarse en el cuerpo de la
+    petición como JSON: una lista de filas o {"data": [...]}, que se lee en una
+    sola pasada vectorizada. 'matrix_id', 'rhs_id' y 'steps' van en la URL o en
+    el formulario.
+    
+    Returns:
+        json: Respuesta JSON con la matriz solución X y su ID asignado
+    """
+    matrix_id = request.values['matrix_id']
+    rhs_id = request.values.get('rhs_id')
+    
+    if matrix_id not in stored_matrices or (rhs_id and rhs_id not in stored_matrices):
+        return jsonify({
+            'success': False,
+            'message': 'ID de matriz inválido'
+        })
+    
+    rows, cols = get_matrix_dimensions(stored_matrices[matrix_id])
+    if rows != cols:
+        return jsonify({
+            'success': False,
+            'message': 'La matriz de coeficientes debe ser cuadrada.'
+        })
+    
+    if rhs_id:
+        B = stored_matrices[rhs_id]
+    else:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get('data')
+        try:
+            # Mismos límites que al crear una matriz, comprobados antes de convertir
+            B = parse_json_matrix(payload, **matrix_size_limits())
+        except ValueError as error:
             return jsonify({
-                'success': True,
-                'message': f'Forma escalonada reducida guardada como Matriz {new_matrix_id}',
-                'matrix_id': new_matrix_id,
-                'result': result,
-                'steps': steps
+                'success': False,
+                'message': f'Términos independientes inválidos: {error}'
             })
+    
+    level = get_steps_level()
+    # Las matrices dispersas siempre usan su factorización dispersa (sin pasos de eliminación)
+    if level == TRACE_NONE or isinstance(stored_matrices[matrix_id], SparseMatrix):
+        factorization = get_factorization(matrix_id)
+    else:
+        factorization = cached_factorization(matrix_id)
+    
+    # Capturar los pasos del cálculo en el contexto de esta petición
+    with capture_steps(level) as output:
+        if factorization is None:
+            factorization = lu_factorization(stored_matrices[matrix_id])
+            cache_factorization(matrix_id, factorization)
+        result = solve_linear_systems(stored_matrices[matrix_id], B, factorization=factorization)
+    
+    steps = output.render()
+    
+    if result is not None:
+        new_matrix_id = get_next_matrix_id()
+        store_matrix(new_matrix_id, result)
+        return jsonify({
+            'success': True,
+            'message': f'Solución guardada como Matriz {new_matrix_id}',
+            'matrix_id': new_matrix_id,
+            'result': result,
+            'steps': steps
+        })
+    else:
+        return jsonify({
+            'success': False,
+            'message': 'No se pudo resolver el sistema. La matriz debe ser no singular y B debe tener tantas filas como A.'
+        })
 
 @app.route('/lu_factorization', methods=['POST'])
 def lu_factorization_route():
     """
-    Realiza la factorización LU de una matriz.
-    Descompone la matriz A en el producto de matrices L y U, donde L es triangular inferior y U es triangular superior.
+    Realiza la factorización LU con pivoteo parcial de una matriz.
+    Descompone la matriz A como PA = LU, donde P es una matriz de permutación, L es triangular inferior y U es triangular superior.
     
     Returns:
-        json: Respuesta JSON con las matrices L y U resultantes y sus IDs asignados
+        json: Respuesta JSON con las matrices P, L y U resultantes, sus IDs asignados y el determinante
     """
     matrix_id = request.form['matrix_id']
     
@@ -441,25 +1004,38 @@ def lu_factorization_route():
             'message': 'ID de matriz inválido'
         })
     
-    # Capturar los pasos del cálculo
-    with capture_stdout() as output:
-        result = lu_factorization(stored_matrices[matrix_id])
-    
-    steps = output.getvalue()
+    level = get_steps_level()
+    # Las matrices dispersas tienen en caché su factorización dispersa, sin P, L y U densas
+    sparse = isinstance(stored_matrices[matrix_id], SparseMatrix)
+    if level == TRACE_NONE and not sparse:
+        result = get_factorization(matrix_id)
+        steps = ''
+    else:
+        # Capturar los pasos del cálculo en el contexto de esta petición
+        with capture_steps(level) as output:
+            result = lu_factorization(stored_matrices[matrix_id])
+        steps = output.render()
+        if result is not None and not sparse:
+            cache_factorization(matrix_id, result)
     
     if result is not None:
-        L, U = result
+        P_id = get_next_matrix_id()
+        store_matrix(P_id, result.P)
         L_id = get_next_matrix_id()
-        stored_matrices[L_id] = L
+        store_matrix(L_id, result.L)
         U_id = get_next_matrix_id()
-        stored_matrices[U_id] = U
+        store_matrix(U_id, result.U)
         return jsonify({
             'success': True,
-            'message': f'Matriz L guardada como Matriz {L_id}, Matriz U guardada como Matriz {U_id}',
+            'message': f'Matriz P guardada como Matriz {P_id}, Matriz L guardada como Matriz {L_id}, Matriz U guardada como Matriz {U_id}',
+            'P_id': P_id,
             'L_id': L_id,
             'U_id': U_id,
-            'L_matrix': L,
-            'U_matrix': U,
+            'P_matrix': result.P,
+            'L_matrix': result.L,
+            'U_matrix': result.U,
+            'determinant': result.det(),
+            'singular': result.singular,
             'steps': steps
         })
     else:
@@ -468,6 +1044,522 @@ def lu_factorization_route():
             'message': 'No se pudo realizar la factorización LU. La matriz debe ser cuadrada.'
         })
 
+@app.route('/evaluate', methods=['POST'])
+def evaluate_route():
+    """
+    Evalúa una expresión matricial sobre las matrices almacenadas, por ejemplo
+    "inv(A) * (B + C) * D". La expresión se planifica antes de evaluarse y solo
+    se materializa el resultado final.
+    
+    Returns:
+        json: Respuesta JSON con el resultado (y su ID asignado si es una matriz)
+    """
+    expression = request.form.get('expression', '')
+    
+    # Capturar los pasos del cálculo en el contexto de esta petición
+    with capture_steps(get_steps_level()) as output:
+        try:
+            result = evaluate_expression(expression, stored_matrices, factorize=get_factorization)
+        except ExpressionError as error:
+            return jsonify({
+                'success': False,
+                'message': f'Expresión inválida: {error}'
+            })
+    
+    steps = output.render()
+    
+    if isinstance(result, Matrix):
+        matrix_id = get_next_matrix_id()
+        store_matrix(matrix_id, result)
+        return jsonify({
+            'success': True,
+            'message': f'Resultado guardado como Matriz {matrix_id}',
+            'matrix_id': matrix_id,
+            'result': result,
+            'steps': steps
+        })
+    return jsonify({
+        'success': True,
+        'value': result,
+        'steps': steps
+    })
+
+def _batch_echelon(function):
+    """
+    Adapta una función de eliminación para /batch, devolviendo solo la matriz.
+    """
+    def run(A):
+        result, _ = function(A)
+        return result
+    return run
+
+# Operaciones disponibles en /batch: nombre -> (número de argumentos, función)
+BATCH_OPERATIONS = {
+    'add': (2, add_matrices),
+    'subtract': (2, subtract_matrices),
+    'multiply': (2, multiply_matrices),
+    'determinant': (1, determinant),
+    'inverse': (1, calculate_inverse),
+    'gaussian_elimination': (1, _batch_echelon(gaussian_elimination)),
+    'gauss_jordan': (1, _batch_echelon(gauss_jordan_elimination)),
+    'solve': (2, solve_linear_systems),
+}
+
+class BatchError(Exception):
+    """Error en un paso de una petición a /batch."""
+
+def run_batch(operations, outputs=None):
+    """
+    Ejecuta una secuencia de operaciones en el servidor. Cada paso puede usar
+    como argumentos matrices almacenadas (por su ID) o resultados de pasos
+    anteriores (por su nombre). Los resultados intermedios se mantienen en
+    memoria y no reciben ID.
+    
+    Args:
+        operations (list): Pasos {'op': str, 'args': [str, ...], 'name': str opcional};
+                           el nombre por defecto de un paso es '$i' (su posición)
+        outputs (list): Nombres de los resultados a devolver (por defecto, el último)
+    
+    Returns:
+        dict: Resultados solicitados, por nombre
+    
+    Raises:
+        BatchError: Si un paso es inválido o su operación no puede realizarse
+    """
+    results = {}
+    last_name = None
+    
+    for index, step in enumerate(operations):
+        if not isinstance(step, dict):
+            raise BatchError(f'Paso {index}: formato inválido')
+        op = step.get('op')
+        if not isinstance(op, str) or op not in BATCH_OPERATIONS:
+            raise BatchError(f'Paso {index}: operación desconocida {op!r}')
+        arity, function = BATCH_OPERATIONS[op]
+        refs = step.get('args', [])
+        if not isinstance(refs, list) or len(refs) != arity:
+            raise BatchError(f'Paso {index}: {op} requiere {arity} argumento(s)')
+        name = step.get('name')
+        if name is not None and not isinstance(name, str):
+            raise BatchError(f'Paso {index}: el nombre debe ser una cadena')
+        
+        args = []
+        for ref in refs:
+            if isinstance(ref, str) and ref in results:
+                args.append(results[ref])
+            elif isinstance(ref, str) and ref in stored_matrices:
+                args.append(stored_matrices[ref])
+            else:
+                raise BatchError(f'Paso {index}: referencia desconocida {ref!r}')
+            # Todas las operaciones reciben matrices: un escalar (como un
+            # determinante) no puede usarse como argumento
+            if not isinstance(args[-1], (Matrix, SparseMatrix)):
+                raise BatchError(f'Paso {index}: {ref!r} no es una matriz')
+        
+        try:
+            # Un sistema con una matriz almacenada reutiliza su factorización en caché
+            if op == 'solve' and refs[0] not in results and refs[0] in stored_matrices:
+                factorization = get_factorization(refs[0])
+                value = function(*args, factorization=factorization) if factorization is not None else None
+            else:
+                value = function(*args)
+        except (TypeError, ValueError) as error:
+            raise BatchError(f'Paso {index}: no se pudo realizar {op}: {error}') from error
+        if value is None:
+            raise BatchError(f'Paso {index}: no se pudo realizar {op}')
+        
+        last_name = name or f'${index}'
+        results[last_name] = value
+    
+    if outputs is None:
+        outputs = [last_name] if last_name is not None else []
+    
+    response = {}
+    for name in outputs:
+        if not isinstance(name, str) or name not in results:
+            raise BatchError(f'Resultado desconocido {name!r}')
+        value = results[name]
+        response[name] = value
+    return response
+
+@app.route('/batch', methods=['POST'])
+def batch_route():
+    """
+    Ejecuta en una sola petición una secuencia de operaciones encadenadas.
+    
+    Recibe un JSON con 'operations' (lista de pasos), 'outputs' (nombres de
+    los resultados a devolver) y 'steps' (nivel de detalle, 'none' por defecto).
+    
+    Returns:
+        json: Respuesta JSON con los resultados solicitados
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        payload = {}
+    operations = payload.get('operations')
+    outputs = payload.get('outputs')
+    level = payload.get('steps', TRACE_NONE)
+    
+    if not isinstance(operations, list) or (outputs is not None and not isinstance(outputs, list)):
+        return jsonify({
+            'success': False,
+            'message': "La petición debe incluir una lista 'operations' y, opcionalmente, una lista 'outputs'"
+        })
+    if level not in TRACE_LEVELS:
+        level = TRACE_NONE
+    
+    # Capturar los pasos del cálculo en el contexto de esta petición
+    with capture_steps(level) as output:
+        try:
+            results = run_batch(operations, outputs)
+        except BatchError as error:
+            return jsonify({
+                'success': False,
+                'message': str(error),
+                'steps': output.render()
+            })
+    
+    return jsonify({
+        'success': True,
+        'results': results,
+        'steps': output.render()
+    })
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Envía una operación larga a la cola de trabajos asíncronos y responde de
+    inmediato con el ID del trabajo, sin esperar al cálculo.
+    
+    Parámetros: operation (determinant, inverse, gaussian_elimination,
+    gauss_jordan o lu_factorization), matrix_id y los mismos parámetros que la
+    ruta síncrona de la operación (steps, exact, method, solve_system, b_i).
+    
+    Returns:
+        json: Respuesta JSON con el ID y el estado del trabajo
+    """
+    operation = request.values.get('operation')
+    matrix_id = request.values.get('matrix_id')
+    
+    if operation not in JOB_OPERATIONS:
+        return jsonify({
+            'success': False,
+            'message': 'Operación inválida'
+        })
+    
+    if matrix_id not in stored_matrices:
+        return jsonify({
+            'success': False,
+            'message': 'ID de matriz inválido'
+        })
+    
+    matrix = stored_matrices[matrix_id]
+    params = {}
+    if operation == 'determinant':
+        method = request.values.get('method', DETERMINANT_LU)
+        if method not in DETERMINANT_METHODS and method != DETERMINANT_EXACT:
+            return jsonify({
+                'success': False,
+                'message': 'Método de determinante inválido'
+            })
+        rows, _ = get_matrix_dimensions(matrix)
+        if method == DETERMINANT_COFACTOR and rows > MAX_COFACTOR_SIZE:
+            return jsonify({
+                'success': False,
+                'message': f'La expansión por cofactores solo está disponible hasta matrices {MAX_COFACTOR_SIZE}x{MAX_COFACTOR_SIZE}.'
+            })
+        params['method'] = method
+    elif operation in ('gaussian_elimination', 'gauss_jordan') and request.values.get('solve_system', 'false') == 'true':
+        rows, _ = get_matrix_dimensions(matrix)
+        params['b'] = [float(request.values.get(f'b_{i}', 0)) for i in range(rows)]
+    elif operation != 'lu_factorization':
+        params['exact'] = exact_requested()
+    
+    try:
+        job = job_manager.submit(operation, matrix_id, matrix, params, get_steps_level())
+    except ValueError as error:
+        return jsonify({
+            'success': False,
+            'message': str(error)
+        })
+    
+    return jsonify({
+        'success': True,
+        'message': f'Trabajo {job.id} enviado',
+        'job_id': job.id,
+        'status': job.status
+    })
+
+def find_job(job_id):
+    """
+    Obtiene un trabajo por su ID, o la respuesta de error si no existe.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return None, jsonify({
+            'success': False,
+            'message': 'ID de trabajo inválido'
+        })
+    return job, None
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """
+    Consulta el estado de un trabajo: pending, running, done, failed o
+    cancelled, su avance (de 0 a 1) y, al terminar, su resultado (los mismos
+    campos que la ruta síncrona, sin los pasos) o su mensaje de error.
+    
+    Returns:
+        json: Respuesta JSON con el estado del trabajo
+    """
+    job, error = find_job(job_id)
+    if error is not None:
+        return error
+    return jsonify({'success': True, **job.to_dict()})
+
+@app.route('/jobs/<job_id>/steps')
+def job_steps(job_id):
+    """
+    Devuelve los pasos de un trabajo recibidos hasta el momento, a partir de
+    la posición 'offset' (0 por defecto). La respuesta incluye la posición
+    desde la que pedir los siguientes.
+    
+    Returns:
+        json: Respuesta JSON con los pasos y la nueva posición
+    """
+    job, error = find_job(job_id)
+    if error is not None:
+        return error
+    offset = request.args.get('offset', 0, type=int)
+    steps, offset = job.read_steps(max(offset, 0), JOB_EVENTS_CHUNK_SIZE)
+    return jsonify({
+        'success': True,
+        'status': job.status,
+        'steps': steps,
+        'offset': offset
+    })
+
+def job_events(job):
+    """
+    Genera los eventos SSE de un trabajo: 'step' con los pasos a medida que
+    llegan, 'progress' cuando cambia el avance y, al terminar, 'result' con el
+    estado final del trabajo.
+    """
+    offset = 0
+    progress = None
+    while True:
+        finished = job.status in FINISHED_STATES
+        steps, offset = job.read_steps(offset, JOB_EVENTS_CHUNK_SIZE)
+        if steps:
+            yield format_event('step', steps[:-1] if steps.endswith("\n") else steps)
+            continue
+        if job.progress != progress:
+            progress = job.progress
+            yield format_event('progress', app.json.dumps({'status': job.status, 'progress': progress}))
+        if finished:
+            yield format_event('result', app.json.dumps({'success': True, **job.to_dict()}))
+            return
+        job.wait(offset, JOB_EVENTS_POLL_INTERVAL)
+
+@app.route('/jobs/<job_id>/events')
+def job_events_route(job_id):
+    """
+    Sigue un trabajo como flujo de eventos SSE (ver job_events).
+    
+    Returns:
+        Respuesta text/event-stream
+    """
+    job, error = find_job(job_id)
+    if error is not None:
+        return error
+    response = Response(job_events(job), mimetype=EVENT_STREAM_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    Cancela un trabajo. Si aún no había empezado se descarta; si está en
+    ejecución, se detiene al empezar su siguiente columna pivote.
+    
+    Returns:
+        json: Respuesta JSON con el estado del trabajo
+    """
+    job, error = find_job(job_id)
+    if error is not None:
+        return error
+    job_manager.cancel(job_id)
+    return jsonify({
+        'success': True,
+        'message': f'Cancelación del trabajo {job.id} solicitada',
+        'job_id': job.id,
+        'status': job.status
+    })
+
+@app.route('/cache_stats')
+def cache_stats():
+    """
+    Estado de la caché de resultados de este proceso: entradas, bytes usados
+    y presupuesto, aciertos, fallos y descartes; y del almacén, el número de
+    matrices y de contenidos distintos que ocupan.
+    
+    Returns:
+        json: Respuesta JSON con las estadísticas de la caché
+    """
+    return jsonify({'success': True, **result_cache.stats(), 'store': stored_matrices.blob_stats()})
+
+def parse_matrix_edits(payload, shape):
+    """
+    Interpreta las modificaciones de /edit_matrix.
+    
+    Args:
+        payload (dict): JSON con 'cells', tripletas [fila, columna, valor], y
+                        'rows', pares [fila, [valores]] (índices desde 0)
+        shape: Dimensiones de la matriz
+    
+    Returns:
+        list: Pares (fila, columna o slice de toda la fila, valor o valores)
+    
+    Raises:
+        ValueError: Si alguna modificación no es válida
+    """
+    n, m = shape
+    edits = []
+    for cell in payload.get('cells', []):
+        i, j, value = cell
+        if not (isinstance(i, int) and isinstance(j, int) and 0 <= i < n and 0 <= j < m):
+            raise ValueError(f'celda fuera de la matriz: [{i}, {j}]')
+        edits.append((i, j, float(value)))
+    for row in payload.get('rows', []):
+        i, values = row
+        values = np.asarray(values, dtype=np.float64)
+        if not (isinstance(i, int) and 0 <= i < n):
+            raise ValueError(f'fila fuera de la matriz: {i}')
+        if values.shape != (m,):
+            raise ValueError(f'la fila {i} debe tener {m} valores')
+        edits.append((i, slice(None), values))
+    if not edits:
+        raise ValueError('no se indicó ninguna celda ni fila')
+    for _, _, value in edits:
+        if not np.all(np.isfinite(value)):
+            raise ValueError('los valores deben ser números finitos')
+    return edits
+
+@app.route('/edit_matrix/<matrix_id>', methods=['PATCH'])
+def edit_matrix(matrix_id):
+    """
+    Modifica celdas o filas de una matriz almacenada conservando el trabajo ya
+    hecho sobre ella.
+    
+    Si la caché de resultados tiene la inversa o el determinante de la matriz
+    (calculados sin pasos), se actualizan con la fórmula de Woodbury y el lema
+    del determinante (ver rank_update) en O(k n^2) para k filas modificadas, y
+    se guardan como resultados de la matriz modificada. El determinante también
+    se actualiza a partir de la factorización LU en caché.
+    
+    Recibe un JSON con 'cells', tripletas [fila, columna, valor], y/o 'rows',
+    pares [fila, [valores]], con índices desde 0.
+    
+    Returns:
+        json: Respuesta JSON con la nueva versión de la matriz, las filas
+              modificadas y qué resultados se actualizaron
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({
+            'success': False,
+            'message': 'Modificaciones inválidas: se esperaba un objeto JSON'
+        })
+    
+    # Leer, modificar y guardar con comparar e intercambiar sobre la versión:
+    # si otro proceso guarda la matriz entre la lectura y la escritura, se
+    # vuelve a aplicar la edición sobre su contenido
+    for _ in range(EDIT_ATTEMPTS):
+        try:
+            version = stored_matrices.version(matrix_id)
+            sparse = stored_matrices.is_sparse(matrix_id)
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'message': 'ID de matriz inválido'
+            })
+        if sparse:
+            return jsonify({
+                'success': False,
+                'message': 'Solo se pueden editar celdas de matrices densas.'
+            })
+        
+        old = stored_matrices[matrix_id].array
+        try:
+            edits = parse_matrix_edits(payload, old.shape)
+        except (TypeError, ValueError) as error:
+            return jsonify({
+                'success': False,
+                'message': f'Modificaciones inválidas: {error}'
+            })
+        
+        new = np.array(old)
+        for i, j, value in edits:
+            new[i, j] = value
+        rows = sorted({i for i, _, _ in edits if np.any(new[i] != old[i])})
+        
+        # Resultados ya calculados para el contenido anterior (antes de guardar)
+        n, m = old.shape
+        old_key = stored_matrices.content_key(matrix_id)
+        cached_inverse = result_cache.peek(result_key('inverse', old_key, TRACE_NONE, exact=False))
+        cached_det = result_cache.peek(result_key('determinant', old_key, TRACE_NONE, method=DETERMINANT_LU))
+        factorization = cached_factorization(matrix_id)
+        if isinstance(factorization, LUFactorization) and factorization.singular:
+            factorization = None
+        
+        inverse = ratio = None
+        # Con muchas filas modificadas la actualización ya no compensa frente a
+        # recalcular cuando se pida
+        if rows and n == m and 2 * len(rows) <= n:
+            base_inverse = cached_inverse['result'] if cached_inverse is not None else None
+            if base_inverse is not None or (cached_det is not None and isinstance(factorization, LUFactorization)):
+                inverse, ratio = rank_update(rows, new[rows] - old[rows], inverse=base_inverse,
+                                             factorization=factorization)
+        
+        if not rows:
+            break
+        version = stored_matrices.replace(matrix_id, new, version)
+        if version is not None:
+            invalidate_factorization(matrix_id)
+            break
+    else:
+        return jsonify({
+            'success': False,
+            'message': f'La matriz {matrix_id} se modificó mientras se editaba; vuelva a intentarlo.'
+        })
+    
+    new_key = stored_matrices.content_key(matrix_id)
+    
+    det = None
+    if inverse is not None:
+        result_cache.put(result_key('inverse', new_key, TRACE_NONE, exact=False), freeze({
+            'result': inverse,
+            'exact_result': None,
+            'condition_number': condition_number(new, inverse),
+            'steps': ''
+        }))
+    if ratio is not None and cached_det is not None and cached_det['determinant'] is not None:
+        det = cached_det['determinant'] * ratio
+        result_cache.put(result_key('determinant', new_key, TRACE_NONE, method=DETERMINANT_LU),
+                         freeze({'determinant': det, 'steps': ''}))
+    
+    return jsonify({
+        'success': True,
+        'message': f'Matriz {matrix_id} actualizada',
+        'matrix_id': matrix_id,
+        'version': version,
+        'changed_rows': rows,
+        'inverse_updated': inverse is not None,
+        'determinant_updated': det is not None,
+        'determinant': det
+    })
+
 @app.route('/delete_matrix', methods=['POST'])
 def delete_matrix():
     """
@@ -484,13 +1576,17 @@ def delete_matrix():
             'message': 'ID de matriz inválido'
         })
     
-    # Eliminar la matriz
-    del stored_matrices[matrix_id]
-    
-    # Guardar el ID liberado para reutilizarlo después
-    freed_matrix_ids.append(matrix_id)
-    # Ordenar los IDs liberados para usar primero los más bajos (A antes que B, etc.)
-    freed_matrix_ids.sort()
+    # Eliminar la matriz y su factorización en caché; el almacén guarda el ID
+    # liberado para reutilizarlo después
+    try:
+        del stored_matrices[matrix_id]
+    except KeyError:
+        # Otro proceso la eliminó entre la comprobación y el borrado
+        return jsonify({
+            'success': False,
+            'message': 'ID de matriz inválido'
+        })
+    invalidate_factorization(matrix_id)
     
     return jsonify({
         'success': True,
@@ -0,0 +1,462 @@
+"""
+Cola de trabajos asíncronos
+Ejecuta las operaciones largas (inversas, eliminaciones, determinantes y
+factorizaciones LU de matrices grandes) en un grupo acotado de procesos, fuera
+de los hilos que atienden las peticiones. El cliente recibe un ID de trabajo y
+puede consultar su estado, seguir su avance y sus pasos, o cancelarlo.
+
+Cada proceso del grupo ejecuta un trabajo a la vez con su propio StepTracer:
+los pasos y el avance llegan al proceso web por una cola de eventos compartida,
+y un hilo de este proceso los guarda en el trabajo correspondiente (los pasos,
+en un archivo temporal, no en memoria). La cancelación es cooperativa: el
+trabajo la comprueba cada vez que informa de su avance, es decir, al empezar
+cada columna pivote.
+
+Los resultados matriciales se guardan en el almacén de matrices, igual que
+con las rutas síncronas, al terminar el trabajo.
+"""
+import multiprocessing
+import os
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from Calculadora import (
+    StepTracer, TRACE_NONE, DETERMINANT_LU, ILL_CONDITIONED_THRESHOLD, determinant,
+    calculate_inverse, condition_number, gaussian_elimination, gauss_jordan_elimination,
+    back_substitution, lu_factorization
+)
+from exact import exact_determinant, exact_echelon_form, exact_inverse, exact_response, format_fraction, DETERMINANT_EXACT
+
+# Estados de un trabajo
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# Número máximo de trabajos sin terminar (pendientes o en ejecución)
+MAX_ACTIVE_JOBS = 64
+# Número máximo de trabajos terminados que se conservan para consultarlos
+MAX_FINISHED_JOBS = 256
+# Cada cuántos segundos un trabajo envía su avance y sus pasos acumulados
+PROGRESS_INTERVAL = 0.2
+# Tamaño de los pasos acumulados a partir del cual se envían sin esperar
+STEPS_FLUSH_SIZE = 64 * 1024
+
+class JobError(Exception):
+    """Error esperado de un trabajo (p. ej. matriz singular), con su mensaje para el cliente."""
+
+class JobCancelled(Exception):
+    """El trabajo se canceló mientras se ejecutaba."""
+
+# --- Operaciones (se ejecutan en los procesos del grupo) ---
+#
+# Cada operación recibe el registro de pasos, la matriz y sus parámetros, y
+# devuelve los campos de la respuesta y las matrices que se deben almacenar
+# (campo de la respuesta con el ID asignado -> matriz).
+
+def _determinant_job(tracer, matrix, method=DETERMINANT_LU):
+    if method == DETERMINANT_EXACT:
+        det = exact_determinant(matrix, tracer)
+        if det is None:
+            raise JobError('No se pudo calcular el determinante. La matriz debe ser cuadrada.')
+        return {'determinant': float(det), 'exact_determinant': format_fraction(det)}, {}
+    det = determinant(matrix, tracer, method=method)
+    if det is None:
+        raise JobError('No se pudo calcular el determinante. La matriz debe ser cuadrada.')
+    return {'determinant': det}, {}
+
+def _inverse_job(tracer, matrix, exact=False):
+    exact_result = None
+    if exact:
+        exact_rows = exact_inverse(matrix, tracer)
+        result = None
+        if exact_rows is not None:
+            result, exact_result = exact_response(exact_rows)
+    else:
+        result = calculate_inverse(matrix, tracer)
+    if result is None:
+        raise JobError('No se pudo calcular la inversa. La matriz debe ser cuadrada y no singular.')
+    cond = condition_number(matrix, result)
+    return {
+        'result': result,
+        'exact_result': exact_result,
+        'condition_number': cond,
+        'ill_conditioned': bool(cond > ILL_CONDITIONED_THRESHOLD)
+    }, {'matrix_id': result}
+
+def _gaussian_elimination_job(tracer, matrix, b=None, exact=False):
+    if b is not None:
+        A_echelon, b_echelon = gaussian_elimination(matrix, b, tracer=tracer)
+        x = back_substitution(A_echelon, b_echelon, tracer)
+        if x is None:
+            raise JobError('No se pudo resolver el sistema.')
+        return {'echelon_form': A_echelon, 'b_echelon': b_echelon, 'solution': x}, {}
+    exact_result = None
+    if exact:
+        result, exact_result = exact_response(exact_echelon_form(matrix, reduced=False, tracer=tracer))
+    else:
+        result, _ = gaussian_elimination(matrix, tracer=tracer)
+    return {'result': result, 'exact_result': exact_result}, {'matrix_id': result}
+
+def _gauss_jordan_job(tracer, matrix, b=None, exact=False):
+    if b is not None:
+        A_rref, b_rref = gauss_jordan_elimination(matrix, b, tracer=tracer)
+        return {'rref_form': A_rref, 'solution': b_rref}, {}
+    exact_result = None
+    if exact:
+        result, exact_result = exact_response(exact_echelon_form(matrix, reduced=True, tracer=tracer))
+    else:
+        result, _ = gauss_jordan_elimination(matrix, tracer=tracer)
+    return {'result': result, 'exact_result': exact_result}, {'matrix_id': result}
+
+def _lu_factorization_job(tracer, matrix):
+    result = lu_factorization(matrix, tracer)
+    if result is None:
+        raise JobError('No se pudo realizar la factorización LU. La matriz debe ser cuadrada.')
+    P = result.P
+    return {
+        'P_matrix': P,
+        'L_matrix': result.L,
+        'U_matrix': result.U,
+        'determinant': result.det(),
+        'singular': result.singular
+    }, {'P_id': P, 'L_id': result.L, 'U_id': result.U}
+
+# Operaciones disponibles como trabajos, por nombre
+JOB_OPERATIONS = {
+    'determinant': _determinant_job,
+    'inverse': _inverse_job,
+    'gaussian_elimination': _gaussian_elimination_job,
+    'gauss_jordan': _gauss_jordan_job,
+    'lu_factorization': _lu_factorization_job
+}
+
+# --- Procesos del grupo ---
+
+# Cola de eventos hacia el proceso web y marcas de cancelación (una por
+# ranura de trabajo activo), heredadas por cada proceso al crearse
+_events = None
+_cancel_flags = None
+
+def _init_worker(events, cancel_flags):
+    global _events, _cancel_flags
+    _events = events
+    _cancel_flags = cancel_flags
+
+class _JobReporter:
+    """
+    Flujo de pasos y receptor del avance de un trabajo en ejecución. Acumula
+    los pasos y los envía junto con el avance como mucho cada
+    PROGRESS_INTERVAL segundos, y comprueba si el trabajo se canceló.
+    """
+    
+    def __init__(self, job_id, slot):
+        self.job_id = job_id
+        self.slot = slot
+        self._steps = []
+        self._size = 0
+        self._progress = 0.0
+        self._last_flush = time.monotonic()
+    
+    def _check_cancelled(self):
+        if _cancel_flags[self.slot]:
+            raise JobCancelled()
+    
+    def write(self, text):
+        self._check_cancelled()
+        self._steps.append(text)
+        self._size += len(text)
+        if self._size >= STEPS_FLUSH_SIZE:
+            self.flush()
+    
+    def progress(self, done, total):
+        self._check_cancelled()
+        self._progress = done / total if total else 1.0
+        if time.monotonic() - self._last_flush >= PROGRESS_INTERVAL:
+            self.flush()
+    
+    def flush(self):
+        _events.put((self.job_id, 'progress', (self._progress, "".join(self._steps))))
+        self._steps = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+def _run_job(job_id, slot, operation, matrix, params, level):
+    """
+    Ejecuta un trabajo en un proceso del grupo. El resultado no se devuelve,
+    sino que se envía como último evento del trabajo, después de sus pasos.
+    """
+    _events.put((job_id, 'started', None))
+    reporter = _JobReporter(job_id, slot)
+    try:
+        tracer = StepTracer(level, stream=None if level == TRACE_NONE else reporter, on_progress=reporter.progress)
+        response, matrices = JOB_OPERATIONS[operation](tracer, matrix, **params)
+        reporter.flush()
+        _events.put((job_id, 'result', (response, matrices)))
+    except JobCancelled:
+        _events.put((job_id, 'cancelled', None))
+    except JobError as error:
+        reporter.flush()
+        _events.put((job_id, 'failed', str(error)))
+    except Exception as error:
+        reporter.flush()
+        _events.put((job_id, 'failed', f'Error inesperado: {error}'))
+
+# --- Proceso web ---
+
+class Job:
+    """
+    Estado de un trabajo enviado. Los pasos recibidos se escriben en un
+    archivo temporal; read_steps() permite leerlos por partes.
+    """
+    
+    def __init__(self, job_id, operation, matrix_id, slot):
+        self.id = job_id
+        self.operation = operation
+        self.matrix_id = matrix_id
+        self.slot = slot
+        self.status = JOB_PENDING
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.cancel_requested = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._steps = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._steps_size = 0
+        # Avisa a quien espera nuevos pasos o el fin del trabajo
+        self.changed = threading.Condition()
+    
+    def append_steps(self, text):
+        with self.changed:
+            if text and not self._steps.closed:
+                self._steps.seek(0, os.SEEK_END)
+                self._steps.write(text)
+                self._steps_size = self._steps.tell()
+            self.changed.notify_all()
+    
+    def read_steps(self, offset=0, limit=None):
+        """
+        Lee los pasos recibidos a partir de una posición del archivo.
+        
+        Returns:
+            El texto leído y la posición desde la que seguir leyendo
+        """
+        with self.changed:
+            if self._steps.closed or offset >= self._steps_size:
+                return "", offset
+            self._steps.seek(offset)
+            text = self._steps.read(-1 if limit is None else limit)
+            return text, self._steps.tell()
+    
+    def wait(self, offset, timeout):
+        """
+        Espera hasta que haya pasos a partir de offset o el trabajo termine.
+        """
+        with self.changed:
+            self.changed.wait_for(lambda: self.status in FINISHED_STATES or offset < self._steps_size, timeout)
+    
+    def finish(self, status, message=None, result=None):
+        with self.changed:
+            self.status = status
+            self.message = message
+            self.result = result
+            if status == JOB_DONE:
+                self.progress = 1.0
+            self.finished = time.time()
+            self.changed.notify_all()
+    
+    def close(self):
+        with self.changed:
+            self._steps.close()
+    
+    def to_dict(self):
+        """Estado del trabajo para la respuesta JSON."""
+        return {
+            'job_id': self.id,
+            'operation': self.operation,
+            'matrix_id': self.matrix_id,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': self.result,
+            'cancel_requested': self.cancel_requested,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+
+class JobManager:
+    """
+    Trabajos del proceso web y grupo de procesos que los ejecuta.
+    
+    El grupo se crea con el primer trabajo (no al importar el módulo), y de
+    nuevo si un proceso del grupo muere (p. ej. por falta de memoria), en cuyo
+    caso los trabajos que estaban en él se marcan como fallidos.
+    """
+    
+    def __init__(self, save_matrix, max_workers=None, max_active_jobs=MAX_ACTIVE_JOBS):
+        """
+        Args:
+            save_matrix: Función que almacena una matriz resultado y devuelve su ID
+            max_workers: Número de procesos del grupo (por defecto, uno por núcleo)
+            max_active_jobs: Número máximo de trabajos sin terminar
+        """
+        self.save_matrix = save_matrix
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_active_jobs = max_active_jobs
+        self._jobs = {}
+        self._lock = threading.RLock()
+        self._free_slots = list(range(max_active_jobs))
+        self._executor = None
+        self._pid = None
+        # spawn: los procesos del grupo no heredan los hilos ni las conexiones del proceso web
+        self._context = multiprocessing.get_context('spawn')
+        self._events = None
+        self._cancel_flags = None
+    
+    def _start(self):
+        """Crea el grupo de procesos y el hilo que recibe sus eventos."""
+        if self._pid != os.getpid():
+            # Primer uso, o proceso hijo de uno que ya tenía un grupo (fork)
+            self._events = self._context.Queue()
+            self._cancel_flags = self._context.RawArray('b', self.max_active_jobs)
+            self._executor = None
+            self._pid = os.getpid()
+            threading.Thread(target=self._receive_events, args=(self._events,), daemon=True).start()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=self._context,
+                initializer=_init_worker, initargs=(self._events, self._cancel_flags)
+            )
+        return self._executor
+    
+    def submit(self, operation, matrix_id, matrix, params=None, level=TRACE_NONE):
+        """
+        Envía un trabajo al grupo de procesos.
+        
+        Args:
+            operation: Nombre de la operación (clave de JOB_OPERATIONS)
+            matrix_id: ID de la matriz almacenada, para informar del estado
+            matrix: La matriz
+            params: Parámetros de la operación
+            level: Nivel de detalle de los pasos
+        
+        Returns:
+            Job
+        
+        Raises:
+            ValueError: Si la operación no existe o hay demasiados trabajos activos
+        """
+        if operation not in JOB_OPERATIONS:
+            raise ValueError(f"Operación desconocida: {operation}")
+        with self._lock:
+            if not self._free_slots:
+                raise ValueError('Hay demasiados trabajos en curso; inténtalo más tarde.')
+            self._prune()
+            executor = self._start()
+            job = Job(secrets.token_hex(8), operation, matrix_id, self._free_slots.pop())
+            self._cancel_flags[job.slot] = 0
+            self._jobs[job.id] = job
+            args = (job.id, job.slot, operation, matrix, params or {}, level)
+            try:
+                job.future = executor.submit(_run_job, *args)
+            except BrokenProcessPool:
+                self._executor = None
+                job.future = self._start().submit(_run_job, *args)
+        job.future.add_done_callback(lambda future: self._future_done(job, future))
+        return job
+    
+    def get(self, job_id):
+        """Devuelve el trabajo con ese ID, o None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def jobs(self):
+        """Lista de los trabajos conocidos, del más antiguo al más reciente."""
+        with self._lock:
+            return list(self._jobs.values())
+    
+    def cancel(self, job_id):
+        """
+        Cancela un trabajo: si aún no empezó se descarta; si está en ejecución,
+        se detiene al empezar su siguiente columna pivote.
+        
+        Returns:
+            El trabajo, o None si no existe
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job.cancel_requested = True
+        if job.future.cancel():
+            # Todavía no había empezado (_future_done lo marca como cancelado)
+            return job
+        self._cancel_flags[job.slot] = 1
+        return job
+    
+    def _finish(self, job, status, message=None, result=None):
+        """Termina un trabajo (una sola vez) y libera su ranura."""
+        with self._lock:
+            if job.status in FINISHED_STATES:
+                return
+            job.finish(status, message, result)
+            self._cancel_flags[job.slot] = 0
+            self._free_slots.append(job.slot)
+    
+    def _prune(self):
+        """Olvida los trabajos terminados más antiguos por encima de MAX_FINISHED_JOBS."""
+        finished = [job for job in self._jobs.values() if job.status in FINISHED_STATES]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            job.close()
+            del self._jobs[job.id]
+    
+    def _future_done(self, job, future):
+        """
+        Termina los trabajos que no enviaron su resultado: cancelados antes de
+        empezar o cuyo proceso murió.
+        """
+        if future.cancelled():
+            self._finish(job, JOB_CANCELLED, 'Trabajo cancelado')
+        elif future.exception() is not None:
+            with self._lock:
+                if isinstance(future.exception(), BrokenProcessPool):
+                    self._executor = None
+            self._finish(job, JOB_FAILED, f'El proceso del trabajo terminó inesperadamente: {future.exception()}')
+    
+    def _receive_events(self, events):
+        """Hilo que aplica a cada trabajo los eventos enviados por el grupo."""
+        while True:
+            job_id, event, data = events.get()
+            job = self.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                continue
+            try:
+                self._apply_event(job, event, data)
+            except Exception as error:
+                self._finish(job, JOB_FAILED, f'Error al guardar el resultado: {error}')
+    
+    def _apply_event(self, job, event, data):
+        if event == 'started':
+            job.status = JOB_RUNNING
+            job.started = time.time()
+            job.append_steps("")
+        elif event == 'progress':
+            job.progress, steps = data
+            job.append_steps(steps)
+        elif event == 'result':
+            response, matrices = data
+            for field, matrix in matrices.items():
+                response[field] = self.save_matrix(matrix)
+            self._finish(job, JOB_DONE, result=response)
+        elif event == 'cancelled':
+            self._finish(job, JOB_CANCELLED, 'Trabajo cancelado')
+        elif event == 'failed':
+            self._finish(job, JOB_FAILED, data)
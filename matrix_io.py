@@ -0,0 +1,383 @@
+"""
+Importación de matrices
+Convierte el cuerpo de una petición (un arreglo JSON, un texto CSV o un archivo
+.npy de NumPy) en una Matrix en una sola pasada vectorizada, sin leer cada
+elemento por separado, y comprueba que sus dimensiones estén dentro de los
+límites configurados.
+
+Los archivos CSV y Matrix Market muy grandes se importan por bloques
+(import_csv, import_matrix_market): cada bloque se escribe directamente en el
+arreglo de destino, de modo que la memoria usada es la de la matriz final más
+la de un bloque.
+"""
+import io
+import itertools
+import tempfile
+import numpy as np
+from Calculadora import Matrix
+from sparse import SparseMatrix
+
+# Límites por defecto del tamaño de una matriz importada
+MAX_MATRIX_ROWS = 10000
+MAX_MATRIX_COLS = 10000
+MAX_MATRIX_ELEMENTS = 16_000_000  # 128 MB de float64
+
+def check_matrix_size(rows, cols, max_rows=MAX_MATRIX_ROWS, max_cols=MAX_MATRIX_COLS,
+                      max_elements=MAX_MATRIX_ELEMENTS):
+    """
+    Comprueba que unas dimensiones estén dentro de los límites.
+    
+    Raises:
+        ValueError: Si alguna dimensión no es positiva o supera su límite
+    """
+    if rows < 1 or cols < 1:
+        raise ValueError("la matriz debe tener al menos una fila y una columna")
+    if rows > max_rows or cols > max_cols:
+        raise ValueError(f"una matriz {rows}x{cols} supera el límite de {max_rows}x{max_cols}")
+    if rows * cols > max_elements:
+        raise ValueError(f"una matriz {rows}x{cols} supera el límite de {max_elements} elementos")
+
+def _to_matrix(array, limits):
+    """
+    Valida un arreglo ya leído (bidimensional, numérico y finito) y lo envuelve en una Matrix.
+    """
+    if array.ndim != 2:
+        raise ValueError("la matriz debe ser bidimensional")
+    check_matrix_size(array.shape[0], array.shape[1], **limits)
+    matrix = Matrix(array)
+    if not np.isfinite(matrix.array).all():
+        raise ValueError("la matriz contiene valores no finitos (NaN o infinito)")
+    return matrix
+
+def parse_json_matrix(data, **limits):
+    """
+    Convierte un arreglo JSON ya decodificado (lista de filas) en una Matrix.
+    
+    Args:
+        data: Lista de listas de números
+        **limits: max_rows, max_cols y max_elements (ver check_matrix_size)
+    
+    Raises:
+        ValueError: Si los datos no forman una matriz numérica válida
+    """
+    if not isinstance(data, list) or not data or not all(isinstance(row, list) for row in data):
+        raise ValueError("se esperaba una lista de filas")
+    # Comprobar las dimensiones antes de convertir, para no reservar memoria de más
+    check_matrix_size(len(data), len(data[0]), **limits)
+    try:
+        array = np.array(data, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("todas las filas deben tener el mismo número de valores numéricos") from None
+    return _to_matrix(array, limits)
+
+def parse_csv_matrix(text, delimiter=None, **limits):
+    """
+    Convierte un texto CSV (una fila de la matriz por línea) en una Matrix.
+    
+    Args:
+        text: El contenido CSV
+        delimiter: Separador de columnas; por defecto se deduce de la primera
+                   línea (',', ';' o espacios en blanco)
+        **limits: max_rows, max_cols y max_elements (ver check_matrix_size)
+    
+    Raises:
+        ValueError: Si el texto no forma una matriz numérica válida
+    """
+    lines = text.strip().splitlines()
+    if not lines:
+        raise ValueError("el CSV está vacío")
+    first = lines[0]
+    if delimiter is None:
+        delimiter = ',' if ',' in first else ';' if ';' in first else None
+    # Estimar las dimensiones con la primera línea antes de leer todo el texto
+    check_matrix_size(len(lines), len(first.split(delimiter)), **limits)
+    array = np.loadtxt(io.StringIO(text), delimiter=delimiter, dtype=np.float64, ndmin=2)
+    return _to_matrix(array, limits)
+
+def parse_npy_matrix(payload, **limits):
+    """
+    Convierte el contenido binario de un archivo .npy en una Matrix. Las
+    dimensiones se validan con la cabecera, antes de leer los datos.
+    
+    Args:
+        payload: Bytes del archivo .npy
+        **limits: max_rows, max_cols y max_elements (ver check_matrix_size)
+    
+    Raises:
+        ValueError: Si el contenido no es un .npy bidimensional numérico
+    """
+    file = io.BytesIO(payload)
+    version = np.lib.format.read_magic(file)
+    if version == (1, 0):
+        shape, _, dtype = np.lib.format.read_array_header_1_0(file)
+    elif version == (2, 0):
+        shape, _, dtype = np.lib.format.read_array_header_2_0(file)
+    else:
+        raise ValueError(f"versión de .npy no soportada: {version[0]}.{version[1]}")
+    if len(shape) != 2:
+        raise ValueError("el archivo .npy debe contener un arreglo bidimensional")
+    if dtype.kind not in 'biuf':
+        raise ValueError(f"el archivo .npy debe contener números reales, no {dtype}")
+    check_matrix_size(shape[0], shape[1], **limits)
+    file.seek(0)
+    # allow_pickle=False: un .npy con objetos de Python nunca se deserializa
+    array = np.load(file, allow_pickle=False)
+    return _to_matrix(array, limits)
+
+# Número aproximado de valores que se leen en cada bloque al importar un archivo
+IMPORT_CHUNK_VALUES = 1 << 16
+
+# Cabecera de Matrix Market: disposición, tipo de valores y simetría admitidos
+MM_LAYOUTS = ('array', 'coordinate')
+MM_FIELDS = ('real', 'integer', 'pattern')
+MM_SYMMETRIES = ('general', 'symmetric', 'skew-symmetric')
+
+def _is_data_line(line, comment=b'#'):
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith(comment)
+
+def _parse_block(lines, delimiter, columns):
+    """
+    Convierte un bloque de líneas (bytes) en un arreglo de float64 con el
+    número de columnas indicado.
+    """
+    text = b''.join(lines).decode('utf-8')
+    block = np.loadtxt(io.StringIO(text), delimiter=delimiter, dtype=np.float64, ndmin=2, comments=None)
+    if block.shape[1] != columns:
+        raise ValueError(f"se esperaban {columns} valores por línea y hay {block.shape[1]}")
+    if not np.isfinite(block).all():
+        raise ValueError("la matriz contiene valores no finitos (NaN o infinito)")
+    return block
+
+def import_csv(lines, allocate, delimiter=None, progress=None, chunk_values=IMPORT_CHUNK_VALUES, **limits):
+    """
+    Importa por bloques una matriz en CSV sin cargar el archivo completo en memoria.
+    
+    Como el número de filas no se conoce hasta el final, las líneas se copian
+    primero a un archivo temporal en disco mientras se cuentan; después se leen
+    por bloques y cada bloque se escribe directamente en el arreglo de destino.
+    La memoria usada, además de la matriz, es la de un bloque.
+    
+    Args:
+        lines: Iterable de líneas en bytes (un archivo abierto en modo binario
+               o el cuerpo de la petición); se ignoran las vacías y las que
+               empiezan por '#'
+        allocate: Función que recibe las dimensiones y devuelve un administrador
+                  de contexto con el arreglo de destino (MatrixStore.dense_writer)
+        delimiter: Separador de columnas; por defecto se deduce de la primera fila
+        progress: Función opcional progress(filas_leídas, filas_totales), que se
+                  llama después de cada bloque
+        chunk_values: Número aproximado de valores por bloque
+        **limits: max_rows, max_cols y max_elements (ver check_matrix_size)
+    
+    Returns:
+        tuple: Las dimensiones (filas, columnas) de la matriz importada
+    
+    Raises:
+        ValueError: Si el contenido no forma una matriz numérica válida
+    """
+    with tempfile.TemporaryFile() as spool:
+        rows = 0
+        first = None
+        for line in lines:
+            if _is_data_line(line):
+                if first is None:
+                    first = line.decode('utf-8')
+                rows += 1
+                spool.write(line if line.endswith(b'\n') else line + b'\n')
+        if first is None:
+            raise ValueError("el CSV está vacío")
+        if delimiter is None:
+            delimiter = ',' if ',' in first else ';' if ';' in first else None
+        cols = len(first.split(delimiter))
+        check_matrix_size(rows, cols, **limits)
+        
+        chunk_rows = max(1, chunk_values // cols)
+        spool.seek(0)
+        with allocate((rows, cols)) as out:
+            done = 0
+            while done < rows:
+                block = _parse_block(list(itertools.islice(spool, chunk_rows)), delimiter, cols)
+                out[done:done + len(block)] = block
+                done += len(block)
+                if progress is not None:
+                    progress(done, rows)
+    return rows, cols
+
+def _read_matrix_market_header(lines):
+    """
+    Lee la cabecera '%%MatrixMarket matrix ...', los comentarios y la línea de
+    dimensiones de un archivo Matrix Market.
+    
+    Returns:
+        tuple: (disposición, tipo, simetría, filas, columnas, número de entradas)
+    """
+    words = next(lines, b'').decode('utf-8').lower().split()
+    if len(words) != 5 or words[0] != '%%matrixmarket' or words[1] != 'matrix':
+        raise ValueError("falta la cabecera '%%MatrixMarket matrix <disposición> <tipo> <simetría>'")
+    layout, field, symmetry = words[2:]
+    if layout not in MM_LAYOUTS or field not in MM_FIELDS or symmetry not in MM_SYMMETRIES:
+        raise ValueError(f"formato Matrix Market no soportado: {layout} {field} {symmetry}")
+    if field == 'pattern' and layout == 'array':
+        raise ValueError("el tipo 'pattern' solo es válido con la disposición 'coordinate'")
+    
+    for line in lines:
+        if _is_data_line(line, comment=b'%'):
+            size = [int(value) for value in line.split()]
+            break
+    else:
+        raise ValueError("falta la línea de dimensiones")
+    if len(size) != (2 if layout == 'array' else 3):
+        raise ValueError("línea de dimensiones inválida")
+    rows, cols = size[0], size[1]
+    if symmetry != 'general' and rows != cols:
+        raise ValueError(f"una matriz {symmetry} debe ser cuadrada")
+    
+    if layout == 'coordinate':
+        entries = size[2]
+    elif symmetry == 'general':
+        entries = rows * cols
+    else:
+        # Solo se guarda el triángulo inferior (sin la diagonal si es antisimétrica)
+        offset = 1 if symmetry == 'skew-symmetric' else 0
+        entries = (rows - offset) * (rows - offset + 1) // 2
+    return layout, field, symmetry, rows, cols, entries
+
+def _matrix_market_blocks(lines, columns, entries, chunk_values, progress):
+    """
+    Lee por bloques las entradas de un archivo Matrix Market, después de la
+    línea de dimensiones.
+    
+    Yields:
+        Arreglos con una entrada por fila y el número de columnas indicado
+    """
+    chunk = max(1, chunk_values // columns)
+    done = 0
+    data_lines = (line for line in lines if _is_data_line(line, comment=b'%'))
+    while done < entries:
+        block_lines = list(itertools.islice(data_lines, min(chunk, entries - done)))
+        if not block_lines:
+            raise ValueError(f"el archivo tiene {done} entradas y se declararon {entries}")
+        block = _parse_block(block_lines, None, columns)
+        yield block
+        done += len(block)
+        if progress is not None:
+            progress(done, entries)
+
+def _coordinate_block(block, field, rows, cols):
+    """
+    Índices (base 0) y valores de un bloque de entradas en disposición 'coordinate'.
+    """
+    i = block[:, 0].astype(np.int64) - 1
+    j = block[:, 1].astype(np.int64) - 1
+    if i.min() < 0 or i.max() >= rows or j.min() < 0 or j.max() >= cols:
+        raise ValueError(f"hay entradas fuera de una matriz {rows}x{cols}")
+    values = np.ones(len(block)) if field == 'pattern' else block[:, 2]
+    return i, j, values
+
+def import_matrix_market(lines, allocate, progress=None, chunk_values=IMPORT_CHUNK_VALUES, **limits):
+    """
+    Importa por bloques una matriz en formato Matrix Market (.mtx), escribiendo
+    cada bloque directamente en un arreglo denso de destino.
+    
+    Admite las disposiciones 'array' (valores por columnas) y 'coordinate'
+    (tripletas fila columna valor, desde 1), con valores 'real', 'integer' o
+    'pattern' y simetría 'general', 'symmetric' o 'skew-symmetric'. Las
+    dimensiones se leen de la cabecera, así que el archivo se recorre una sola vez.
+    
+    Args:
+        lines: Iterable de líneas en bytes
+        allocate: Función que recibe las dimensiones y devuelve un administrador
+                  de contexto con el arreglo de destino (MatrixStore.dense_writer)
+        progress: Función opcional progress(entradas_leídas, entradas_totales)
+        chunk_values: Número aproximado de valores por bloque
+        **limits: max_rows, max_cols y max_elements (ver check_matrix_size)
+    
+    Returns:
+        tuple: Las dimensiones (filas, columnas) de la matriz importada
+    
+    Raises:
+        ValueError: Si el contenido no es un archivo Matrix Market válido
+    """
+    lines = iter(lines)
+    layout, field, symmetry, rows, cols, entries = _read_matrix_market_header(lines)
+    check_matrix_size(rows, cols, **limits)
+    sign = -1.0 if symmetry == 'skew-symmetric' else 1.0
+    
+    with allocate((rows, cols)) as out:
+        if layout == 'array':
+            offset = 1 if symmetry == 'skew-symmetric' else 0
+            # Posición en el archivo donde empieza cada columna del triángulo inferior
+            column_starts = np.concatenate(([0], np.cumsum(np.arange(rows - offset, 0, -1))))
+            position = 0
+            for block in _matrix_market_blocks(lines, 1, entries, chunk_values, progress):
+                k = np.arange(position, position + len(block))
+                position += len(block)
+                if symmetry == 'general':
+                    i, j = k % rows, k // rows
+                else:
+                    j = np.searchsorted(column_starts, k, side='right') - 1
+                    i = j + offset + (k - column_starts[j])
+                out[i, j] = block[:, 0]
+                if symmetry != 'general':
+                    out[j, i] = sign * block[:, 0]
+        else:
+            columns = 2 if field == 'pattern' else 3
+            for block in _matrix_market_blocks(lines, columns, entries, chunk_values, progress):
+                i, j, values = _coordinate_block(block, field, rows, cols)
+                # Las entradas repetidas se suman, como en SparseMatrix.from_coo
+                np.add.at(out, (i, j), values)
+                if symmetry != 'general':
+                    mirror = i != j
+                    np.add.at(out, (j[mirror], i[mirror]), sign * values[mirror])
+    return rows, cols
+
+def import_matrix_market_sparse(lines, progress=None, chunk_values=IMPORT_CHUNK_VALUES, **limits):
+    """
+    Importa por bloques una matriz Matrix Market en disposición 'coordinate'
+    como SparseMatrix, sin pasar por su forma densa.
+    
+    Las tripletas se escriben en arreglos reservados con el número de entradas
+    de la cabecera, de modo que la memoria es proporcional a los elementos no nulos.
+    
+    Args:
+        lines: Iterable de líneas en bytes
+        progress: Función opcional progress(entradas_leídas, entradas_totales)
+        chunk_values: Número aproximado de valores por bloque
+        **limits: max_rows y max_cols (ver check_matrix_size); max_elements
+                  limita el número de elementos no nulos
+    
+    Returns:
+        SparseMatrix
+    
+    Raises:
+        ValueError: Si el contenido no es un archivo Matrix Market 'coordinate' válido
+    """
+    lines = iter(lines)
+    layout, field, symmetry, rows, cols, entries = _read_matrix_market_header(lines)
+    if layout != 'coordinate':
+        raise ValueError("solo la disposición 'coordinate' se importa como matriz dispersa")
+    max_elements = limits.pop('max_elements', MAX_MATRIX_ELEMENTS)
+    check_matrix_size(rows, cols, max_elements=rows * cols, **limits)
+    capacity = entries * (1 if symmetry == 'general' else 2)
+    if capacity > max_elements:
+        raise ValueError(f"{entries} entradas superan el límite de {max_elements} elementos")
+    
+    sign = -1.0 if symmetry == 'skew-symmetric' else 1.0
+    row_indices = np.empty(capacity, dtype=np.int64)
+    col_indices = np.empty(capacity, dtype=np.int64)
+    values = np.empty(capacity, dtype=np.float64)
+    count = 0
+    columns = 2 if field == 'pattern' else 3
+    for block in _matrix_market_blocks(lines, columns, entries, chunk_values, progress):
+        i, j, block_values = _coordinate_block(block, field, rows, cols)
+        if symmetry != 'general':
+            mirror = i != j
+            i, j, block_values = (np.concatenate((i, j[mirror])), np.concatenate((j, i[mirror])),
+                                  np.concatenate((block_values, sign * block_values[mirror])))
+        row_indices[count:count + len(i)] = i
+        col_indices[count:count + len(i)] = j
+        values[count:count + len(i)] = block_values
+        count += len(i)
+    
+    return SparseMatrix.from_coo(row_indices[:count], col_indices[:count], values[:count], (rows, cols))
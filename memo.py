@@ -0,0 +1,174 @@
+"""
+Caché de resultados
+Guarda los resultados de las operaciones (y su registro de pasos) con una
+clave formada por la operación, sus parámetros y un hash del contenido de la
+matriz. Repetir el mismo cálculo sobre una matriz con el mismo contenido,
+tenga el ID que tenga, devuelve el resultado guardado sin recalcularlo; y como
+la clave depende del contenido, modificar una matriz nunca devuelve un
+resultado obsoleto, sin necesidad de invalidar nada.
+
+La caché tiene un presupuesto de bytes: al superarlo se descartan los
+resultados usados hace más tiempo (LRU).
+"""
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+from Calculadora import Matrix, as_array
+from sparse import SparseMatrix
+
+# Presupuesto por defecto de la caché de resultados (bytes)
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+def content_hash(matrix):
+    """
+    Calcula un hash del contenido de una matriz (forma y valores), que no
+    depende de su ID ni de cómo está almacenada.
+    
+    Args:
+        matrix: La matriz (lista de listas, ndarray, Matrix o SparseMatrix)
+    
+    Returns:
+        str: El hash en hexadecimal
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(matrix, SparseMatrix):
+        digest.update(f"sparse{matrix.shape}".encode())
+        for array in (matrix.data, matrix.indices, matrix.indptr):
+            digest.update(memoryview(np.ascontiguousarray(array)).cast('B'))
+    else:
+        array = np.ascontiguousarray(as_array(matrix), dtype=np.float64)
+        digest.update(f"dense{array.shape}".encode())
+        digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+def estimate_size(value):
+    """
+    Estima los bytes que ocupa un resultado: los datos de sus arreglos y el
+    texto de sus cadenas, más lo que ocupan los demás objetos de Python.
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, Matrix):
+        return value.array.nbytes
+    if isinstance(value, SparseMatrix):
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+def freeze(value):
+    """
+    Marca como de solo lectura los arreglos de un resultado, ya que se
+    comparten entre todas las peticiones que lo obtienen de la caché.
+    
+    Returns:
+        El mismo resultado
+    """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, Matrix):
+        value.array.flags.writeable = False
+    elif isinstance(value, dict):
+        for item in value.values():
+            freeze(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            freeze(item)
+    return value
+
+class ResultCache:
+    """
+    Caché LRU de resultados con un presupuesto de bytes y contadores de
+    aciertos y fallos. Es segura para varios hilos; cada proceso tiene la suya.
+    """
+    
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        """
+        Args:
+            max_bytes: Presupuesto de la caché; 0 la desactiva
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # clave -> (resultado, tamaño)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """
+        Devuelve el resultado guardado con esa clave (y lo marca como el más
+        reciente), o None si no está.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def peek(self, key):
+        """
+        Devuelve el resultado guardado con esa clave, o None, sin contarlo como
+        acierto o fallo ni cambiar su posición en el orden LRU.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+    
+    def put(self, key, value, size=None):
+        """
+        Guarda un resultado, descartando los menos usados recientemente hasta
+        que quepa en el presupuesto. Los resultados mayores que todo el
+        presupuesto no se guardan.
+        
+        Args:
+            key: Clave (hashable)
+            value: El resultado
+            size: Su tamaño en bytes (por defecto, estimate_size(value))
+        """
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+    
+    def clear(self):
+        """Descarta todos los resultados (los contadores se conservan)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        """
+        Estado de la caché.
+        
+        Returns:
+            dict: Entradas, bytes usados y presupuesto, aciertos, fallos,
+                  tasa de aciertos y descartes
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions
+            }
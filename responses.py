@@ -0,0 +1,169 @@
+"""
+Respuestas de la API
+Serializa los resultados de las rutas directamente desde sus arreglos NumPy,
+sin convertirlos antes en listas de listas de floats de Python:
+
+- JSON: con orjson, si está instalado, los ndarray se escriben directamente
+  desde su memoria; sin él se usa el módulo json de la biblioteca estándar.
+- Binario: si el cliente envía 'Accept: application/x-matrix', la respuesta es
+  una cabecera JSON seguida de los datos de cada matriz como float64
+  little-endian (ver encode_binary). No se aplica a las respuestas en
+  streaming, cuyo evento 'result' es texto y va siempre en JSON.
+
+Además, compress_response comprime con brotli (si está instalado) o gzip las
+respuestas grandes, como los resultados y los registros de pasos extensos.
+"""
+import gzip
+import json
+import struct
+import numpy as np
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from Calculadora import Matrix
+from sparse import SparseMatrix
+from streaming import stream_requested
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él se comprime con gzip
+    brotli = None
+
+# Tipo de contenido y firma del formato binario
+BINARY_MIMETYPE = 'application/x-matrix'
+BINARY_MAGIC = b'MTX1'
+
+# Las respuestas de menos bytes que este tamaño no se comprimen
+COMPRESSION_MIN_SIZE = 1024
+# Niveles de compresión: rápidos, porque se comprime en cada respuesta
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', BINARY_MIMETYPE, 'text/html', 'text/plain', 'text/css',
+    'text/javascript', 'application/javascript'
+)
+
+def _as_ndarray(value):
+    """
+    Devuelve el ndarray de un resultado matricial (ndarray, Matrix o
+    SparseMatrix, que se densifica), o None si el valor no es una matriz.
+    """
+    if isinstance(value, np.ndarray):
+        return value
+    if isinstance(value, Matrix):
+        return value.array
+    if isinstance(value, SparseMatrix):
+        return value.toarray()
+    return None
+
+def _orjson_default(value):
+    """Conversión de los tipos que orjson no serializa por sí mismo."""
+    array = _as_ndarray(value)
+    if array is not None:
+        # orjson solo escribe directamente arreglos contiguos de tipos nativos
+        if array.flags.c_contiguous and array.dtype == np.float64:
+            return np.ascontiguousarray(array)
+        return array.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Objeto de tipo {type(value).__name__} no serializable")
+
+def wants_binary():
+    """
+    Indica si el cliente de la petición actual prefiere el formato binario
+    (cabecera Accept) al JSON.
+    """
+    # Los eventos SSE son texto: el resultado en streaming va siempre en JSON
+    if stream_requested():
+        return False
+    return request.accept_mimetypes.best_match(['application/json', BINARY_MIMETYPE]) == BINARY_MIMETYPE
+
+def encode_binary(payload, dumps=json.dumps):
+    """
+    Codifica una respuesta en el formato binario.
+    
+    El contenido es la firma b'MTX1', la longitud de la cabecera (uint32
+    little-endian) y la cabecera, un JSON con la respuesta en el que cada
+    matriz se sustituye por {"$array": i, "shape": [filas, columnas]}. La
+    cabecera se rellena con espacios hasta un múltiplo de 8 bytes, y a
+    continuación van los datos de cada matriz i, por filas, como float64 little-endian.
+    
+    Args:
+        payload: La respuesta (diccionario con matrices, listas y valores JSON)
+        dumps: Función que convierte la cabecera en texto JSON
+    
+    Returns:
+        bytes
+    """
+    arrays = []
+    
+    def extract(value):
+        array = _as_ndarray(value)
+        if array is not None:
+            arrays.append(np.ascontiguousarray(array, dtype='<f8'))
+            return {'$array': len(arrays) - 1, 'shape': list(array.shape)}
+        if isinstance(value, dict):
+            return {key: extract(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [extract(item) for item in value]
+        return value
+    
+    header = dumps(extract(payload)).encode('utf-8')
+    # Alinear los datos a 8 bytes, para poder leerlos sin copiarlos
+    header += b' ' * (-(len(BINARY_MAGIC) + 4 + len(header)) % 8)
+    return b''.join([BINARY_MAGIC, struct.pack('<I', len(header)), header] + [memoryview(array).cast('B') for array in arrays])
+
+class MatrixJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask (app.json) que acepta ndarray, Matrix y
+    SparseMatrix en las respuestas de jsonify, y responde en formato binario
+    cuando el cliente lo pide.
+    """
+    
+    @staticmethod
+    def default(value):
+        array = _as_ndarray(value)
+        if array is not None:
+            return array.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        return DefaultJSONProvider.default(value)
+    
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_orjson_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if wants_binary():
+            return self._app.response_class(encode_binary(obj, self.dumps), mimetype=BINARY_MIMETYPE)
+        return self._app.response_class(self.dumps(obj), mimetype=self.mimetype)
+
+def compress_response(response):
+    """
+    Comprime el cuerpo de una respuesta grande según la cabecera
+    Accept-Encoding del cliente: brotli si está disponible, gzip en otro caso.
+    Se registra con app.after_request.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    if brotli is not None and request.accept_encodings['br']:
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif request.accept_encodings['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
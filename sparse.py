@@ -0,0 +1,428 @@
+"""
+Matrices dispersas
+Almacenamiento CSR (filas comprimidas) para matrices con una gran mayoría de
+ceros, con suma, resta y productos que recorren solo los elementos no nulos,
+y una factorización LU dispersa con ordenamiento de mínimo grado para
+resolver sistemas sin densificar la matriz.
+
+La memoria y el tiempo de estas operaciones dependen del número de elementos
+no nulos (y del relleno que produce la eliminación), no de n^2.
+"""
+import heapq
+import numpy as np
+# Calculadora también importa este módulo: sus nombres se leen al usarlos
+# (Calculadora.SINGULAR_TOLERANCE), no al importar, para que el orden no importe
+import Calculadora
+# Un pivote se acepta si su valor absoluto es al menos esta fracción del mayor
+# de su columna (pivoteo por umbral: equilibra estabilidad y relleno)
+PIVOT_THRESHOLD = 0.1
+
+class SparseMatrix:
+    """
+    Matriz dispersa en formato CSR.
+    
+    Los elementos no nulos de la fila i son data[indptr[i]:indptr[i+1]], en las
+    columnas indices[indptr[i]:indptr[i+1]] (ordenadas y sin repetir).
+    """
+    __slots__ = ('data', 'indices', 'indptr', 'shape')
+    
+    def __init__(self, data, indices, indptr, shape):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = (int(shape[0]), int(shape[1]))
+    
+    @classmethod
+    def from_coo(cls, rows, cols, values, shape):
+        """
+        Crea una matriz a partir de tripletas (fila, columna, valor) en formato COO.
+        Los elementos repetidos se suman y los ceros se descartan.
+        
+        Args:
+            rows, cols: Índices (base 0) de cada elemento
+            values: Valor de cada elemento
+            shape: Dimensiones (filas, columnas)
+        
+        Returns:
+            SparseMatrix
+        """
+        n, m = int(shape[0]), int(shape[1])
+        rows = np.asarray(rows, dtype=np.int64).ravel()
+        cols = np.asarray(cols, dtype=np.int64).ravel()
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not (len(rows) == len(cols) == len(values)):
+            raise ValueError("Las filas, columnas y valores deben tener la misma longitud")
+        if len(rows) and (rows.min() < 0 or rows.max() >= n or cols.min() < 0 or cols.max() >= m):
+            raise ValueError(f"Hay elementos fuera de una matriz {n}x{m}")
+        
+        # Ordenar por (fila, columna) y sumar los elementos repetidos
+        keys = rows * m + cols
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        values = values[order]
+        if len(keys):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            values = np.add.reduceat(values, starts)
+            keys = keys[starts]
+        nonzero = values != 0
+        keys = keys[nonzero]
+        values = values[nonzero]
+        
+        rows = keys // m if m else keys
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(values, keys - rows * m, indptr, (n, m))
+    
+    @classmethod
+    def from_dense(cls, matrix):
+        """
+        Crea una matriz dispersa con los elementos no nulos de una matriz densa.
+        """
+        array = np.asarray(matrix, dtype=np.float64)
+        rows, cols = np.nonzero(array)
+        return cls.from_coo(rows, cols, array[rows, cols], array.shape)
+    
+    def to_coo(self):
+        """
+        Devuelve las tripletas (filas, columnas, valores) de los elementos no nulos.
+        """
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        return rows, self.indices, self.data
+    
+    @property
+    def nnz(self):
+        """Número de elementos no nulos."""
+        return len(self.data)
+    
+    @property
+    def density(self):
+        """Fracción de elementos no nulos."""
+        size = self.shape[0] * self.shape[1]
+        return self.nnz / size if size else 0.0
+    
+    def toarray(self):
+        """Convierte la matriz a un ndarray denso."""
+        array = np.zeros(self.shape)
+        rows, cols, values = self.to_coo()
+        array[rows, cols] = values
+        return array
+    
+    def tolist(self):
+        """Convierte la matriz a una lista de listas densa."""
+        return self.toarray().tolist()
+    
+    def window(self, row_start, row_stop, col_start, col_stop):
+        """
+        Devuelve en forma densa solo la submatriz [row_start:row_stop, col_start:col_stop],
+        recorriendo únicamente los elementos no nulos de esas filas.
+        """
+        array = np.zeros((row_stop - row_start, col_stop - col_start))
+        begin, end = self.indptr[row_start], self.indptr[row_stop]
+        rows = np.repeat(np.arange(row_start, row_stop), np.diff(self.indptr[row_start:row_stop + 1]))
+        cols = self.indices[begin:end]
+        inside = (cols >= col_start) & (cols < col_stop)
+        array[rows[inside] - row_start, cols[inside] - col_start] = self.data[begin:end][inside]
+        return array
+    
+    def __array__(self, dtype=None, copy=None):
+        array = self.toarray()
+        return array if dtype is None else array.astype(dtype, copy=False)
+    
+    def transpose(self):
+        """Devuelve la transpuesta (también dispersa)."""
+        rows, cols, values = self.to_coo()
+        return SparseMatrix.from_coo(cols, rows, values, (self.shape[1], self.shape[0]))
+    
+    @property
+    def T(self):
+        return self.transpose()
+    
+    def _combine(self, other, sign):
+        if other.shape != self.shape:
+            raise ValueError("Las matrices deben tener las mismas dimensiones")
+        rows1, cols1, values1 = self.to_coo()
+        rows2, cols2, values2 = other.to_coo()
+        return SparseMatrix.from_coo(
+            np.concatenate([rows1, rows2]), np.concatenate([cols1, cols2]),
+            np.concatenate([values1, sign * values2]), self.shape)
+    
+    def __add__(self, other):
+        if isinstance(other, SparseMatrix):
+            return self._combine(other, 1.0)
+        return self.toarray() + np.asarray(other, dtype=np.float64)
+    
+    def __radd__(self, other):
+        return self.__add__(other)
+    
+    def __sub__(self, other):
+        if isinstance(other, SparseMatrix):
+            return self._combine(other, -1.0)
+        return self.toarray() - np.asarray(other, dtype=np.float64)
+    
+    def __rsub__(self, other):
+        return np.asarray(other, dtype=np.float64) - self.toarray()
+    
+    def __mul__(self, scalar):
+        return SparseMatrix(self.data * float(scalar), self.indices, self.indptr, self.shape)
+    
+    __rmul__ = __mul__
+    
+    def __neg__(self):
+        return self * -1.0
+    
+    def __matmul__(self, other):
+        if isinstance(other, SparseMatrix):
+            return self._matmul_sparse(other)
+        return self.dot(other)
+    
+    def __rmatmul__(self, other):
+        # D @ S = (S' @ D')'
+        return self.transpose().dot(np.asarray(other, dtype=np.float64).T).T
+    
+    def dot(self, other):
+        """
+        Producto por un vector o una matriz densa; cuesta O(nnz) por columna.
+        
+        Returns:
+            ndarray con el resultado
+        """
+        B = np.asarray(other, dtype=np.float64)
+        n = self.shape[0]
+        if B.shape[0] != self.shape[1]:
+            raise ValueError(f"No se puede multiplicar una matriz {self.shape[0]}x{self.shape[1]} por una de {B.shape[0]} filas")
+        if B.ndim == 1:
+            rows = np.repeat(np.arange(n), np.diff(self.indptr))
+            return np.bincount(rows, weights=self.data * B[self.indices], minlength=n)
+        result = np.zeros((n, B.shape[1]))
+        counts = np.diff(self.indptr)
+        nonempty = np.flatnonzero(counts)
+        if len(nonempty):
+            products = self.data[:, None] * B[self.indices]
+            result[nonempty] = np.add.reduceat(products, self.indptr[nonempty], axis=0)
+        return result
+    
+    def _matmul_sparse(self, other):
+        """
+        Producto disperso por disperso: cada elemento no nulo A[i][k] se combina
+        solo con los no nulos de la fila k de B, y los resultados repetidos se suman.
+        """
+        if self.shape[1] != other.shape[0]:
+            raise ValueError(f"No se pueden multiplicar matrices de dimensiones "
+                             f"{self.shape[0]}x{self.shape[1]} y {other.shape[0]}x{other.shape[1]}")
+        rows, ks, values = self.to_coo()
+        counts = np.diff(other.indptr)[ks]
+        total = int(counts.sum())
+        starts = np.repeat(other.indptr[ks], counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = starts + offsets
+        return SparseMatrix.from_coo(
+            np.repeat(rows, counts), other.indices[positions],
+            np.repeat(values, counts) * other.data[positions],
+            (self.shape[0], other.shape[1]))
+    
+    def __repr__(self):
+        return f"SparseMatrix({self.shape[0]}x{self.shape[1]}, nnz={self.nnz})"
+
+def minimum_degree_ordering(matrix):
+    """
+    Ordenamiento de mínimo grado sobre el patrón simétrico A + A'. Eliminar
+    primero los nodos con menos vecinos reduce el relleno de la factorización.
+    
+    Args:
+        matrix: SparseMatrix cuadrada
+    
+    Returns:
+        ndarray con el orden de eliminación de las columnas
+    """
+    n = matrix.shape[0]
+    rows, cols, _ = matrix.to_coo()
+    adjacency = [set() for _ in range(n)]
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        if i != j:
+            adjacency[i].add(j)
+            adjacency[j].add(i)
+    
+    heap = [(len(neighbours), node) for node, neighbours in enumerate(adjacency)]
+    heapq.heapify(heap)
+    eliminated = np.zeros(n, dtype=bool)
+    order = []
+    while heap:
+        degree, node = heapq.heappop(heap)
+        if eliminated[node] or degree != len(adjacency[node]):
+            continue  # Entrada desactualizada
+        eliminated[node] = True
+        order.append(node)
+        # Los vecinos del nodo eliminado quedan conectados entre sí (relleno)
+        neighbours = adjacency[node]
+        for u in neighbours:
+            adjacency[u].discard(node)
+            adjacency[u].update(neighbours)
+            adjacency[u].discard(u)
+            heapq.heappush(heap, (len(adjacency[u]), u))
+        adjacency[node] = set()
+    return np.array(order, dtype=np.int64)
+
+class SparseLU:
+    """
+    Factorización LU dispersa. Cada paso de la eliminación guarda la fila
+    pivote (fila de U) y los multiplicadores aplicados a las demás filas
+    (columna de L), solo con sus elementos no nulos.
+    
+    Attributes:
+        shape: Dimensiones de la matriz factorizada
+        singular: Si alguna columna no tuvo un pivote utilizable
+        fill: Elementos no nulos de L y U juntos
+    """
+    
+    def __init__(self, shape, steps, singular):
+        self.shape = shape
+        self._steps = steps
+        self.singular = singular
+        self.fill = sum(len(s[3]) + len(s[4]) + 1 for s in steps)
+    
+    def solve(self, b):
+        """
+        Resuelve Ax = b aplicando los pasos de la eliminación a b y después la
+        sustitución hacia atrás; cuesta O(nnz(L) + nnz(U)) por columna.
+        
+        Args:
+            b: Vector de n términos independientes o matriz densa de n filas
+        
+        Returns:
+            La solución (ndarray con la forma de b) o None si A es singular
+        """
+        B = np.array(b, dtype=np.float64)
+        n = self.shape[0]
+        if B.ndim not in (1, 2) or B.shape[0] != n:
+            raise ValueError(f"El término independiente debe tener {n} filas.")
+        if self.singular:
+            return None
+        
+        # Sustitución hacia adelante (mismas operaciones de fila que en la eliminación)
+        for pivot_row, _, _, l_rows, l_factors, _, _ in self._steps:
+            if len(l_rows):
+                if B.ndim == 1:
+                    B[l_rows] -= l_factors * B[pivot_row]
+                else:
+                    B[l_rows] -= np.outer(l_factors, B[pivot_row])
+        
+        # Sustitución hacia atrás, en el orden inverso de eliminación
+        X = np.zeros_like(B)
+        for pivot_row, col, pivot, _, _, u_cols, u_values in reversed(self._steps):
+            X[col] = (B[pivot_row] - u_values @ X[u_cols]) / pivot
+        return X
+    
+    def det(self):
+        """
+        Calcula el determinante como el producto de los pivotes con el signo de
+        la permutación entre filas pivote y columnas.
+        """
+        if self.singular:
+            return 0.0
+        n = self.shape[0]
+        permutation = np.empty(n, dtype=np.int64)
+        product = 1.0
+        for pivot_row, col, pivot, *_ in self._steps:
+            permutation[col] = pivot_row
+            product *= pivot
+        # Signo de la permutación por descomposición en ciclos
+        visited = np.zeros(n, dtype=bool)
+        transpositions = 0
+        for start in range(n):
+            length = 0
+            node = start
+            while not visited[node]:
+                visited[node] = True
+                node = permutation[node]
+                length += 1
+            if length:
+                transpositions += length - 1
+        return -product if transpositions % 2 else product
+    
+    def __repr__(self):
+        return f"SparseLU({self.shape[0]}x{self.shape[1]}, fill={self.fill})"
+
+def sparse_lu(matrix, ordering=None):
+    """
+    Factoriza una matriz dispersa cuadrada sin densificarla.
+    
+    Las columnas se eliminan en el orden de mínimo grado. En cada columna se
+    elige, entre los candidatos que superan PIVOT_THRESHOLD respecto del mayor
+    valor absoluto, la fila con menos elementos no nulos (criterio de
+    Markowitz), lo que limita el relleno sin renunciar a la estabilidad.
+    
+    Args:
+        matrix: SparseMatrix cuadrada
+        ordering: Orden de eliminación de las columnas (por defecto, mínimo grado)
+    
+    Returns:
+        SparseLU
+    """
+    n, m = matrix.shape
+    if n != m:
+        raise ValueError("La matriz debe ser cuadrada")
+    if ordering is None:
+        ordering = minimum_degree_ordering(matrix)
+    
+    # Mismo criterio que la factorización densa (Calculadora._pivot_tolerances):
+    # tolerancia relativa a la escala de cada columna
+    column_scale = np.zeros(m)
+    np.maximum.at(column_scale, matrix.indices, np.abs(matrix.data))
+    tolerances = (Calculadora.SINGULAR_TOLERANCE * column_scale).tolist()
+    
+    # Filas como diccionarios {columna: valor} y, por columna, las filas activas que la ocupan
+    rows = []
+    column_rows = [set() for _ in range(n)]
+    indptr, indices, data = matrix.indptr, matrix.indices.tolist(), matrix.data.tolist()
+    for i in range(n):
+        start, end = indptr[i], indptr[i + 1]
+        rows.append(dict(zip(indices[start:end], data[start:end])))
+        for j in indices[start:end]:
+            column_rows[j].add(i)
+    
+    steps = []
+    singular = False
+    for col in ordering.tolist():
+        candidates = column_rows[col]
+        largest = max((abs(rows[r][col]) for r in candidates), default=0.0)
+        if largest <= tolerances[col]:
+            singular = True
+            for r in candidates:
+                rows[r].pop(col, None)
+            candidates.clear()
+            continue
+        
+        # Pivoteo por umbral con criterio de Markowitz
+        limit = PIVOT_THRESHOLD * largest
+        pivot_row = min((r for r in candidates if abs(rows[r][col]) >= limit),
+                        key=lambda r: (len(rows[r]), r != col))
+        pivot_entries = rows[pivot_row]
+        pivot = pivot_entries.pop(col)
+        for j in pivot_entries:
+            column_rows[j].discard(pivot_row)
+        candidates.discard(pivot_row)
+        
+        l_rows = []
+        l_factors = []
+        for r in candidates:
+            entries = rows[r]
+            factor = entries.pop(col) / pivot
+            l_rows.append(r)
+            l_factors.append(factor)
+            for j, value in pivot_entries.items():
+                if j in entries:
+                    entries[j] -= factor * value
+                else:
+                    entries[j] = -factor * value
+                    column_rows[j].add(r)
+        candidates.clear()
+        
+        steps.append((
+            pivot_row, col, pivot,
+            np.array(l_rows, dtype=np.int64), np.array(l_factors),
+            np.fromiter(pivot_entries.keys(), dtype=np.int64, count=len(pivot_entries)),
+            np.fromiter(pivot_entries.values(), dtype=np.float64, count=len(pivot_entries)),
+        ))
+        rows[pivot_row] = None
+    
+    return SparseLU((n, n), steps, singular)
@@ -1,5 +1,7 @@
 // Variables globales
 let matrices = {} // Almacena las matrices disponibles localmente
+const MAX_GRID_SIZE = 10 // Dimensión máxima para ingresar una matriz campo por campo
+const TILE_SIZE = 12 // Filas y columnas que se muestran de cada matriz almacenada
 
 // DOM Elements
 document.addEventListener("DOMContentLoaded", () => {
@@ -9,6 +11,7 @@ document.addEventListener("DOMContentLoaded", () => {
   const generateFieldsBtn = document.getElementById("generateFields")
   const matrixInputContainer = document.getElementById("matrixInputContainer")
   const saveMatrixBtn = document.getElementById("saveMatrix")
+  const matrixFileInput = document.getElementById("matrixFile")
 
   // Botones de operaciones básicas
   const addMatricesBtn = document.getElementById("addMatricesBtn")
@@ -37,6 +40,10 @@ document.addEventListener("DOMContentLoaded", () => {
   const vectorBContainer = document.getElementById("vectorBContainer")
   const solveSystemCheck = document.getElementById("solveSystemCheck")
   const solveSystemCheckbox = document.getElementById("solveSystemCheckbox")
+  const determinantMethodContainer = document.getElementById("determinantMethodContainer")
+  const determinantMethodSelect = document.getElementById("determinantMethod")
+  const exactModeCheck = document.getElementById("exactModeCheck")
+  const exactModeCheckbox = document.getElementById("exactModeCheckbox")
 
   // Contenedores de visualización
   const storedMatricesContainer = document.getElementById("storedMatricesContainer")
@@ -54,6 +61,7 @@ document.addEventListener("DOMContentLoaded", () => {
   // Event Listeners
   generateFieldsBtn.addEventListener("click", generateMatrixFields)
   saveMatrixBtn.addEventListener("click", saveMatrix)
+  matrixFileInput.addEventListener("change", uploadMatrixFile)
 
   addMatricesBtn.addEventListener("click", () => openMatricesModal("add"))
   subtractMatricesBtn.addEventListener("click", () => openMatricesModal("subtract"))
@@ -89,11 +97,16 @@ document.addEventListener("DOMContentLoaded", () => {
   function formatCalculationSteps(steps) {
     if (!steps || typeof steps !== "string") return ""
 
+    return `<div class="calculation-steps">${formatStepLines(steps)}</div>`
+  }
+
+  // Formatea cada línea de los pasos como un mensaje del chat
+  function formatStepLines(steps) {
     // Dividir los pasos en líneas
     const lines = steps.split("\n")
 
     // Filtrar líneas vacías y formatear como mensajes de chat
-    let chatHtml = '<div class="calculation-steps">'
+    let chatHtml = ""
 
     for (const line of lines) {
       if (line.trim()) {
@@ -124,17 +137,76 @@ document.addEventListener("DOMContentLoaded", () => {
       }
     }
 
-    chatHtml += "</div>"
     return chatHtml
   }
 
+  // Envía una operación con stream=true y muestra cada paso (evento SSE
+  // 'step') a medida que el servidor lo calcula. Devuelve una promesa con la
+  // respuesta JSON del evento 'result'.
+  function fetchStreamedSteps(endpoint, formData, stepsContainer) {
+    formData.append("stream", "true")
+    return fetch(endpoint, {
+      method: "POST",
+      body: formData,
+      headers: { Accept: "text/event-stream" },
+    }).then((response) => {
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ""
+
+      function handleEvent(frame) {
+        let event = "message"
+        const data = []
+        for (const line of frame.split("\n")) {
+          if (line.startsWith("event: ")) {
+            event = line.slice(7)
+          } else if (line.startsWith("data: ")) {
+            data.push(line.slice(6))
+          }
+        }
+        const text = data.join("\n")
+        if (event === "step") {
+          stepsContainer.insertAdjacentHTML("beforeend", formatStepLines(text))
+          stepsContainer.scrollTop = stepsContainer.scrollHeight
+        } else if (event === "result") {
+          return JSON.parse(text)
+        } else if (event === "error") {
+          return { success: false, message: text }
+        }
+        return null
+      }
+
+      function read() {
+        return reader.read().then(({ done, value }) => {
+          if (done) {
+            throw new Error("La conexión se cerró antes de recibir el resultado")
+          }
+          buffer += decoder.decode(value, { stream: true })
+          let end
+          while ((end = buffer.indexOf("\n\n")) !== -1) {
+            const frame = buffer.slice(0, end)
+            buffer = buffer.slice(end + 2)
+            const result = handleEvent(frame)
+            if (result) {
+              reader.cancel()
+              return result
+            }
+          }
+          return read()
+        })
+      }
+
+      return read()
+    })
+  }
+
   // Funciones
   function generateMatrixFields() {
     const rows = Number.parseInt(rowsInput.value)
     const cols = Number.parseInt(colsInput.value)
 
-    if (isNaN(rows) || isNaN(cols) || rows < 1 || rows > 4 || cols < 1 || cols > 4) {
-      showAlert("Por favor ingresa dimensiones válidas (1-4)", "danger")
+    if (isNaN(rows) || isNaN(cols) || rows < 1 || rows > MAX_GRID_SIZE || cols < 1 || cols > MAX_GRID_SIZE) {
+      showAlert(`Por favor ingresa dimensiones válidas (1-${MAX_GRID_SIZE}). Las matrices más grandes se cargan desde un archivo.`, "danger")
       return
     }
 
@@ -169,28 +241,26 @@ document.addEventListener("DOMContentLoaded", () => {
   function saveMatrix() {
     const rows = Number.parseInt(rowsInput.value)
     const cols = Number.parseInt(colsInput.value)
-    const formData = new FormData()
-
-    formData.append("rows", rows)
-    formData.append("cols", cols)
 
-    // Recopilar valores de la matriz
+    // Recopilar valores de la matriz en una lista de filas
+    const matrixData = []
     for (let i = 0; i < rows; i++) {
+      const row = []
       for (let j = 0; j < cols; j++) {
-        const cellId = `cell_${i}_${j}`
-        const cellValue = document.getElementById(cellId).value || "0"
-        formData.append(cellId, cellValue)
+        row.push(Number.parseFloat(document.getElementById(`cell_${i}_${j}`).value) || 0)
       }
+      matrixData.push(row)
     }
 
     // Mostrar indicador de carga
     saveMatrixBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Guardando...'
     saveMatrixBtn.disabled = true
 
-    // Enviar al servidor
+    // Enviar al servidor toda la matriz en un solo arreglo JSON
     fetch("/create_matrix", {
       method: "POST",
-      body: formData,
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ data: matrixData }),
     })
       .then((response) => response.json())
       .then((data) => {
@@ -200,7 +270,7 @@ document.addEventListener("DOMContentLoaded", () => {
           matrices[data.matrix_id] = {
             rows: data.rows,
             cols: data.cols,
-            data: data.matrix,
+            data: matrixData,
           }
           displayStoredMatrices()
 
@@ -225,6 +295,50 @@ document.addEventListener("DOMContentLoaded", () => {
       })
   }
 
+  function uploadMatrixFile() {
+    const file = matrixFileInput.files[0]
+    if (!file) {
+      return
+    }
+
+    // El archivo se envía tal cual; el servidor lo interpreta según su tipo.
+    // CSV y Matrix Market se importan por bloques, sin cargarlos completos en memoria
+    const name = file.name.toLowerCase()
+    let url = "/import_matrix?format=csv"
+    let contentType = "text/csv"
+    if (name.endsWith(".mtx")) {
+      url = "/import_matrix?format=mtx"
+      contentType = "text/x-matrix-market"
+    } else if (name.endsWith(".npy")) {
+      url = "/create_matrix"
+      contentType = "application/octet-stream"
+    } else if (name.endsWith(".json")) {
+      url = "/create_matrix"
+      contentType = "application/json"
+    }
+
+    fetch(url, {
+      method: "POST",
+      headers: { "Content-Type": contentType },
+      body: file,
+    })
+      .then((response) => (response.status === 413 ? { success: false, message: "El archivo es demasiado grande" } : response.json()))
+      .then((data) => {
+        if (data.success) {
+          showAlert(data.message, "success")
+          loadMatrices()
+        } else {
+          showAlert(data.message || "Error al cargar la matriz", "danger")
+        }
+        matrixFileInput.value = ""
+      })
+      .catch((error) => {
+        console.error("Error:", error)
+        showAlert("Error de comunicación con el servidor", "danger")
+        matrixFileInput.value = ""
+      })
+  }
+
   function loadMatrices() {
     // Mostrar indicador de carga
     storedMatricesContainer.innerHTML = `
@@ -236,6 +350,8 @@ document.addEventListener("DOMContentLoaded", () => {
             </div>
         `
 
+    // Solo se reciben las dimensiones de cada matriz; sus elementos se piden
+    // con /matrix_tile cuando la matriz se vuelve visible
     fetch("/view_matrices")
       .then((response) => response.json())
       .then((data) => {
@@ -269,6 +385,7 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     storedMatricesContainer.innerHTML = html
+    observeMatrixTiles()
 
     // Añadir animación
     const matrixElements = document.querySelectorAll(".matrix-display")
@@ -294,13 +411,36 @@ document.addEventListener("DOMContentLoaded", () => {
                             <span class="matrix-id">${id}</span>
                         </div>
                         <span> (${matrix.rows}x${matrix.cols})</span>
+                    </div>`
+
+    if (matrix.data) {
+      html += `<div class="matrix-content">${generateMatrixCells(matrix.data, matrix.rows, matrix.cols)}</div>`
+    } else {
+      // Los elementos se cargan al mostrarse la matriz (ver observeMatrixTiles)
+      html += `<div class="matrix-content" data-pending-tile="${id}">
+                    <div class="text-center py-2">
+                        <div class="spinner-border spinner-border-sm text-primary" role="status">
+                            <span class="visually-hidden">Cargando...</span>
+                        </div>
                     </div>
-                    <div class="matrix-content">`
+                </div>`
+    }
+
+    html += "</div>"
 
-    for (let i = 0; i < matrix.data.length; i++) {
+    return html
+  }
+
+  function generateMatrixCells(data, rows, cols) {
+    // Mostrar como máximo TILE_SIZE filas y columnas
+    const shownRows = Math.min(data.length, TILE_SIZE)
+    const shownCols = Math.min(data.length ? data[0].length : 0, TILE_SIZE)
+    let html = ""
+
+    for (let i = 0; i < shownRows; i++) {
       html += '<div class="matrix-row">'
-      for (let j = 0; j < matrix.data[i].length; j++) {
-        const value = Number.parseFloat(matrix.data[i][j])
+      for (let j = 0; j < shownCols; j++) {
+        const value = Number.parseFloat(data[i][j])
         // Formatear para mostrar enteros sin decimales y limitar decimales
         const formattedValue = Number.isInteger(value) ? value : value.toFixed(2)
         html += `<div class="matrix-cell">${formattedValue}</div>`
@@ -308,12 +448,54 @@ document.addEventListener("DOMContentLoaded", () => {
       html += "</div>"
     }
 
-    html += `       </div>
-                </div>`
+    if (shownRows < rows || shownCols < cols) {
+      html += `<div class="text-muted small mt-1">Mostrando ${shownRows}x${shownCols} de ${rows}x${cols}</div>`
+    }
 
     return html
   }
 
+  function observeMatrixTiles() {
+    const pending = storedMatricesContainer.querySelectorAll("[data-pending-tile]")
+    if (!("IntersectionObserver" in window)) {
+      pending.forEach((element) => loadMatrixTile(element))
+      return
+    }
+
+    // Pedir los elementos solo de las matrices que entran en pantalla
+    const observer = new IntersectionObserver((entries) => {
+      entries.forEach((entry) => {
+        if (entry.isIntersecting) {
+          observer.unobserve(entry.target)
+          loadMatrixTile(entry.target)
+        }
+      })
+    })
+    pending.forEach((element) => observer.observe(element))
+  }
+
+  function loadMatrixTile(element) {
+    const id = element.dataset.pendingTile
+
+    fetch(`/matrix_tile/${encodeURIComponent(id)}?rows=${TILE_SIZE}&cols=${TILE_SIZE}`)
+      .then((response) => response.json())
+      .then((data) => {
+        const matrix = matrices[id]
+        if (!data.success || !matrix) {
+          element.innerHTML = '<div class="text-muted small">No disponible</div>'
+          return
+        }
+        // Guardar la ventana para no volver a pedirla al redibujar la lista
+        matrix.data = data.data
+        element.removeAttribute("data-pending-tile")
+        element.innerHTML = generateMatrixCells(data.data, data.total_rows, data.total_cols)
+      })
+      .catch((error) => {
+        console.error("Error:", error)
+        element.innerHTML = '<div class="text-muted small">No disponible</div>'
+      })
+  }
+
   function openMatricesModal(operation) {
     if (Object.keys(matrices).length < 2) {
       showAlert("Necesitas al menos dos matrices para esta operación", "warning")
@@ -375,6 +557,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // Actualizar el título del modal y opciones adicionales
     const modalTitle = document.getElementById("singleMatrixModalTitle")
+    determinantMethodContainer.classList.toggle("d-none", operation !== "determinant")
+    exactModeCheck.classList.toggle("d-none", !["inverse", "gaussian", "gauss_jordan"].includes(operation))
 
     switch (operation) {
       case "determinant":
@@ -572,6 +756,14 @@ document.addEventListener("DOMContentLoaded", () => {
     const formData = new FormData()
     formData.append("matrix_id", matrixId)
 
+    if (operation === "determinant") {
+      formData.append("method", determinantMethodSelect.value)
+    }
+
+    if (["inverse", "gaussian", "gauss_jordan"].includes(operation)) {
+      formData.append("exact", exactModeCheckbox.checked)
+    }
+
     // Variables específicas para métodos que resuelven sistemas
     if (operation === "gaussian" || operation === "gauss_jordan") {
       formData.append("solve_system", solveSystemCheckbox.checked)
@@ -608,11 +800,25 @@ document.addEventListener("DOMContentLoaded", () => {
     performSingleOperationBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Procesando...'
     performSingleOperationBtn.disabled = true
 
-    fetch(endpoint, {
-      method: "POST",
-      body: formData,
-    })
-      .then((response) => response.json())
+    // Las eliminaciones y la inversa envían sus pasos mientras se calculan
+    let request
+    let streamedSteps = null
+    if (["inverse", "gaussian", "gauss_jordan"].includes(operation)) {
+      showResult(
+        "Calculando...",
+        '<p class="text-center"><i class="fas fa-spinner fa-spin me-2"></i>Procesando...</p>',
+        '<div class="calculation-steps" id="streamedCalculationSteps"></div>',
+      )
+      streamedSteps = document.getElementById("streamedCalculationSteps")
+      request = fetchStreamedSteps(endpoint, formData, streamedSteps)
+    } else {
+      request = fetch(endpoint, {
+        method: "POST",
+        body: formData,
+      }).then((response) => response.json())
+    }
+
+    request
       .then((data) => {
         // Cerrar el modal
         const selectMatrixModal = document.getElementById("selectMatrixModal")
@@ -628,6 +834,9 @@ document.addEventListener("DOMContentLoaded", () => {
           let calculationStepsHtml = ""
           if (data.steps) {
             calculationStepsHtml = formatCalculationSteps(data.steps)
+          } else if (streamedSteps && streamedSteps.innerHTML) {
+            // Conservar los pasos ya recibidos en streaming
+            calculationStepsHtml = streamedSteps.outerHTML
           }
 
           switch (operation) {
@@ -640,7 +849,7 @@ document.addEventListener("DOMContentLoaded", () => {
                     </div>
                  </div>
                  <p class="text-center">El determinante de la Matriz ${matrixId} es:</p>
-                 <p class="text-center"><span class="result-value">${data.determinant}</span></p>`,
+                 <p class="text-center"><span class="result-value">${data.exact_determinant ?? data.determinant}</span></p>`,
                 calculationStepsHtml,
               )
               break
@@ -674,6 +883,12 @@ document.addEventListener("DOMContentLoaded", () => {
 
             case "lu":
               // Actualizar matrices locales
+              matrices[data.P_id] = {
+                rows: data.P_matrix.length,
+                cols: data.P_matrix[0].length,
+                data: data.P_matrix,
+              }
+
               matrices[data.L_id] = {
                 rows: data.L_matrix.length,
                 cols: data.L_matrix[0].length,
@@ -691,6 +906,10 @@ document.addEventListener("DOMContentLoaded", () => {
               showResult(
                 "Factorización LU",
                 `<div class="operation-display">
+                    <div class="d-inline-block matrix-id-container">
+                        <span class="matrix-id">${data.P_id}</span>
+                    </div>
+                    <span class="operation-symbol mx-2">×</span>
                     <div class="d-inline-block matrix-id-container">
                         <span class="matrix-id">${matrixId}</span>
                     </div>
@@ -704,11 +923,15 @@ document.addEventListener("DOMContentLoaded", () => {
                     </div>
                  </div>
                  <div class="row">
-                   <div class="col-md-6">
+                   <div class="col-md-4">
+                     <p class="text-center">Matriz P (${data.P_id}):</p>
+                     <div class="result-matrix">${generateMatrixDisplay(data.P_id, matrices[data.P_id])}</div>
+                   </div>
+                   <div class="col-md-4">
                      <p class="text-center">Matriz L (${data.L_id}):</p>
                      <div class="result-matrix">${generateMatrixDisplay(data.L_id, matrices[data.L_id])}</div>
                    </div>
-                   <div class="col-md-6">
+                   <div class="col-md-4">
                      <p class="text-center">Matriz U (${data.U_id}):</p>
                      <div class="result-matrix">${generateMatrixDisplay(data.U_id, matrices[data.U_id])}</div>
                    </div>
@@ -838,6 +1061,9 @@ document.addEventListener("DOMContentLoaded", () => {
               break
           }
         } else {
+          if (streamedSteps) {
+            resultContainer.innerHTML = ""
+          }
           showAlert(data.message, "danger")
         }
 
@@ -847,6 +1073,9 @@ document.addEventListener("DOMContentLoaded", () => {
       })
       .catch((error) => {
         console.error("Error:", error)
+        if (streamedSteps) {
+          resultContainer.innerHTML = ""
+        }
         showAlert("Error de comunicación con el servidor", "danger")
 
         // Restaurar botón
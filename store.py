@@ -0,0 +1,465 @@
+"""
+Almacenamiento persistente de matrices
+Guarda el contenido de las matrices en archivos binarios (formato .npy de
+NumPy: una cabecera pequeña seguida de los float64 contiguos) y mantiene el
+índice (IDs, dimensiones, IDs libres) en una base de datos SQLite.
+
+Los archivos se identifican por el hash de su contenido, no por el ID: cada ID
+es un alias que apunta a un contenido, y cada contenido lleva la cuenta de los
+IDs que lo usan. Guardar una matriz idéntica a otra ya almacenada (por ejemplo,
+la misma forma escalonada calculada varias veces) solo añade una fila al
+índice, de modo que el espacio ocupado crece con los datos distintos y no con
+el número de operaciones. El archivo se borra cuando deja de usarlo el último ID.
+
+Al arrancar no se lee ninguna matriz; cada una se abre con mmap la primera vez
+que se usa, de modo que reiniciar con miles de matrices es casi instantáneo y
+el sistema operativo carga en memoria únicamente las páginas que se leen.
+
+Varios procesos (por ejemplo, los workers de gunicorn) pueden compartir el mismo
+directorio: la asignación de IDs y las escrituras se hacen en transacciones de
+SQLite, y cada lectura comprueba la versión de la matriz en el índice para no
+usar una copia que otro proceso haya reemplazado o eliminado.
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+import numpy as np
+from Calculadora import Matrix
+from sparse import SparseMatrix
+from memo import content_hash
+
+# Nombre de la base de datos del índice dentro del directorio del almacén
+INDEX_FILENAME = 'index.sqlite3'
+# Subdirectorio con los archivos del contenido de las matrices
+BLOBS_DIRNAME = 'blobs'
+# Segundos que una escritura espera a que otro proceso libere la base de datos
+LOCK_TIMEOUT = 30
+# Tipos de matriz registrados en el índice
+FORMAT_DENSE = 'dense'
+FORMAT_SPARSE = 'sparse'
+# Arreglos que forman una matriz dispersa CSR (uno por archivo .npy)
+SPARSE_ARRAYS = ('data', 'indices', 'indptr')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matrices (
+    id TEXT PRIMARY KEY,
+    format TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    blob TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    format TEXT NOT NULL,
+    refcount INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS freed_ids (
+    id TEXT PRIMARY KEY
+);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('next_matrix_id', 0), ('version', 0);
+"""
+
+def matrix_id_for(index):
+    """
+    Convierte un número de secuencia en un ID de letras mayúsculas
+    (0 -> A, ..., 25 -> Z, 26 -> AA, 27 -> AB, ...).
+    """
+    # Para los primeros 26 IDs, usar letras simples A-Z
+    if index < 26:
+        return chr(65 + index)  # 65 es el código ASCII para 'A'
+    # Para IDs posteriores, usar AA, AB, AC, etc.
+    first_letter_index = (index // 26) - 1
+    second_letter_index = index % 26
+    return chr(65 + first_letter_index) + chr(65 + second_letter_index)
+
+def _save_array(path, array):
+    """
+    Escribe un arreglo en formato .npy de forma atómica: primero en un archivo
+    temporal y después se renombra, para que un lector nunca vea un archivo a
+    medias. Los procesos que ya tenían abierto el archivo anterior con mmap
+    siguen leyendo su contenido hasta que lo cierran.
+    """
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, 'wb') as file:
+        np.save(file, np.ascontiguousarray(array))
+    os.replace(temporary, path)
+
+class MatrixStore(MutableMapping):
+    """
+    Diccionario de matrices almacenadas (ID -> Matrix o SparseMatrix) respaldado
+    en disco y compartido entre procesos.
+    
+    Las escrituras se guardan de inmediato (archivo del contenido, si es nuevo,
+    e índice); las lecturas abren el archivo con mmap de solo lectura y
+    conservan el objeto mientras su versión en el índice no cambie. Con
+    directory=None funciona solo en memoria, para un único proceso.
+    """
+    
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._loaded = {}  # ID -> (versión, matriz ya abierta)
+        self._memory = {}  # hash -> matriz (solo con directory=None)
+        self._lock = threading.RLock()
+        self._connection = None
+        self._pid = None
+        if directory is not None:
+            os.makedirs(os.path.join(directory, BLOBS_DIRNAME), exist_ok=True)
+        self._connect()
+    
+    # --- Índice ---
+    
+    def _connect(self):
+        """
+        Devuelve la conexión al índice del proceso actual. Tras un fork (gunicorn
+        crea los workers a partir del proceso principal) se abre una conexión
+        nueva, porque una conexión de SQLite no debe compartirse entre procesos.
+        """
+        if self._connection is None or self._pid != os.getpid():
+            path = ':memory:' if self.directory is None else os.path.join(self.directory, INDEX_FILENAME)
+            connection = sqlite3.connect(path, timeout=LOCK_TIMEOUT, isolation_level=None, check_same_thread=False)
+            if self.directory is not None:
+                # WAL permite leer mientras otro proceso escribe
+                connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+            if self.directory is not None:
+                self._loaded = {}
+        return self._connection
+    
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._connect().execute(sql, parameters).fetchall()
+    
+    @contextlib.contextmanager
+    def _transaction(self):
+        """
+        Transacción de escritura. BEGIN IMMEDIATE toma el bloqueo de escritura
+        de la base de datos al empezar, de modo que las escrituras de todos los
+        procesos quedan serializadas.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+    
+    def _entry(self, matrix_id):
+        """Fila del índice de una matriz: (formato, filas, columnas, versión, hash)."""
+        rows = self._query("SELECT format, rows, cols, version, blob FROM matrices WHERE id = ?", (matrix_id,))
+        if not rows:
+            raise KeyError(matrix_id)
+        return rows[0]
+    
+    # --- Contenidos de las matrices ---
+    
+    def _paths(self, key, format):
+        """
+        Archivos .npy de un contenido: uno si es densa, tres (CSR) si es dispersa.
+        """
+        directory = os.path.join(self.directory, BLOBS_DIRNAME)
+        if format == FORMAT_SPARSE:
+            return {name: os.path.join(directory, f"{key}.{name}.npy") for name in SPARSE_ARRAYS}
+        return {'data': os.path.join(directory, f"{key}.npy")}
+    
+    @staticmethod
+    def _open(paths, format, shape):
+        """Abre con mmap los archivos de una matriz sin leer su contenido."""
+        arrays = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+        if format == FORMAT_SPARSE:
+            return SparseMatrix(arrays['data'], arrays['indices'], arrays['indptr'], shape)
+        # Matrix no copia un arreglo float64 contiguo: conserva la vista del mmap
+        return Matrix(arrays['data'])
+    
+    def _load(self, blob, format, shape):
+        """Obtiene la matriz de un contenido (en disco, abierta con mmap)."""
+        if self.directory is None:
+            return self._memory[blob]
+        return self._open(self._paths(blob, format), format, shape)
+    
+    @staticmethod
+    def _remove_paths(paths):
+        for path in paths.values():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    @staticmethod
+    def _retain(connection, blob):
+        """
+        Suma una referencia a un contenido ya guardado.
+        
+        Returns:
+            bool: False si el contenido no está guardado
+        """
+        cursor = connection.execute("UPDATE blobs SET refcount = refcount + 1 WHERE hash = ?", (blob,))
+        return cursor.rowcount > 0
+    
+    def _add_blob(self, connection, blob, matrix):
+        """
+        Guarda un contenido nuevo con una referencia. Los archivos se escriben
+        dentro de la transacción, para que dos procesos que guardan el mismo
+        contenido no mezclen sus escrituras.
+        """
+        format = FORMAT_SPARSE if isinstance(matrix, SparseMatrix) else FORMAT_DENSE
+        if self.directory is None:
+            self._memory[blob] = matrix
+        else:
+            paths = self._paths(blob, format)
+            if format == FORMAT_SPARSE:
+                for name in SPARSE_ARRAYS:
+                    _save_array(paths[name], getattr(matrix, name))
+            else:
+                _save_array(paths['data'], matrix.array)
+        connection.execute("INSERT INTO blobs (hash, format, refcount) VALUES (?, ?, 1)", (blob, format))
+    
+    def _release(self, connection, blob):
+        """
+        Resta una referencia a un contenido y lo borra si ya no lo usa ningún ID.
+        Los procesos que ya tenían abiertos sus archivos con mmap siguen
+        leyéndolos hasta que los cierran.
+        """
+        connection.execute("UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?", (blob,))
+        row = connection.execute("SELECT format, refcount FROM blobs WHERE hash = ?", (blob,)).fetchone()
+        if row is None or row[1] > 0:
+            return
+        connection.execute("DELETE FROM blobs WHERE hash = ?", (blob,))
+        if self.directory is None:
+            self._memory.pop(blob, None)
+        else:
+            self._remove_paths(self._paths(blob, row[0]))
+    
+    # --- Interfaz de diccionario ---
+    
+    def __getitem__(self, matrix_id):
+        with self._lock:
+            try:
+                format, n, m, version, blob = self._entry(matrix_id)
+            except KeyError:
+                self._loaded.pop(matrix_id, None)
+                raise
+            cached = self._loaded.get(matrix_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            matrix = self._load(blob, format, (n, m))
+            self._loaded[matrix_id] = (version, matrix)
+            return matrix
+    
+    def __setitem__(self, matrix_id, matrix):
+        self._store(matrix_id, matrix)
+    
+    def replace(self, matrix_id, matrix, version):
+        """
+        Reemplaza una matriz solo si su versión sigue siendo la indicada
+        (comparar e intercambiar): permite leer, modificar y guardar una matriz
+        sin perder las escrituras que otro proceso haga entre medias.
+        
+        Args:
+            matrix_id (str): ID de la matriz
+            matrix: La matriz nueva
+            version (int): Versión que se leyó antes de modificarla
+        
+        Returns:
+            int or None: La versión nueva, o None si la matriz cambió o se
+                         eliminó desde entonces (y no se guardó nada)
+        """
+        return self._store(matrix_id, matrix, expected_version=version)
+    
+    def _store(self, matrix_id, matrix, expected_version=None):
+        if not isinstance(matrix, (Matrix, SparseMatrix)):
+            matrix = Matrix(matrix)
+        format = FORMAT_SPARSE if isinstance(matrix, SparseMatrix) else FORMAT_DENSE
+        blob = content_hash(matrix)
+        with self._transaction() as connection:
+            if expected_version is not None:
+                row = connection.execute("SELECT version FROM matrices WHERE id = ?", (matrix_id,)).fetchone()
+                if row is None or row[0] != expected_version:
+                    return None
+            # Se toma la referencia al contenido nuevo antes de soltar la del
+            # anterior, por si el ID se guarda de nuevo con el mismo contenido
+            if not self._retain(connection, blob):
+                self._add_blob(connection, blob, matrix)
+            version = self._register(connection, matrix_id, format, matrix.shape, blob)
+            self._loaded[matrix_id] = (version, matrix)
+            return version
+    
+    def _register(self, connection, matrix_id, format, shape, blob):
+        """
+        Registra (o actualiza) una matriz en el índice con una versión nueva,
+        apuntando al contenido indicado (del que ya debe tener una referencia),
+        y suelta la referencia al contenido que tuviera antes.
+        
+        Returns:
+            int: La versión asignada
+        """
+        # Un contador global, para que un ID eliminado y reutilizado nunca
+        # repita una versión anterior
+        connection.execute("UPDATE counters SET value = value + 1 WHERE name = 'version'")
+        version = connection.execute("SELECT value FROM counters WHERE name = 'version'").fetchone()[0]
+        previous = connection.execute("SELECT blob FROM matrices WHERE id = ?", (matrix_id,)).fetchone()
+        connection.execute(
+            "INSERT INTO matrices (id, format, rows, cols, version, blob) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET format = excluded.format, rows = excluded.rows, "
+            "cols = excluded.cols, version = excluded.version, blob = excluded.blob",
+            (matrix_id, format, shape[0], shape[1], version, blob))
+        if previous is not None:
+            self._release(connection, previous[0])
+        return version
+    
+    @contextlib.contextmanager
+    def dense_writer(self, matrix_id, shape):
+        """
+        Permite escribir una matriz densa directamente en su archivo, sin
+        construirla antes en memoria (por ejemplo, al importar un archivo
+        grande por partes).
+        
+        Entrega un arreglo float64 escribible de las dimensiones indicadas,
+        inicializado en ceros y respaldado por un archivo temporal con mmap. Al
+        salir del bloque sin errores se calcula el hash del contenido, el
+        archivo pasa a ser el de ese contenido (o se descarta si ya estaba
+        guardado) y la matriz se registra en el índice; si hay un error, se
+        descarta.
+        
+        Args:
+            matrix_id (str): ID con el que se guardará la matriz
+            shape: Dimensiones (filas, columnas)
+        """
+        if self.directory is None:
+            array = np.zeros(shape)
+            yield array
+            self[matrix_id] = Matrix(array)
+            return
+        
+        temporary = os.path.join(self.directory, BLOBS_DIRNAME,
+                                 f"{matrix_id}.{os.getpid()}.{threading.get_ident()}.tmp")
+        array = np.lib.format.open_memmap(temporary, mode='w+', dtype=np.float64, shape=tuple(shape))
+        try:
+            yield array
+            array.flush()
+            blob = content_hash(array)
+        except BaseException:
+            del array
+            os.remove(temporary)
+            raise
+        del array
+        
+        with self._transaction() as connection:
+            if self._retain(connection, blob):
+                os.remove(temporary)
+            else:
+                os.replace(temporary, self._paths(blob, FORMAT_DENSE)['data'])
+                connection.execute("INSERT INTO blobs (hash, format, refcount) VALUES (?, ?, 1)", (blob, FORMAT_DENSE))
+            self._register(connection, matrix_id, FORMAT_DENSE, shape, blob)
+            # Se abrirá con mmap de solo lectura en el primer acceso
+            self._loaded.pop(matrix_id, None)
+    
+    def __delitem__(self, matrix_id):
+        """
+        Elimina una matriz y libera su ID para reutilizarlo, en la misma
+        transacción: dos procesos no pueden liberar el mismo ID dos veces.
+        """
+        with self._transaction() as connection:
+            row = connection.execute("SELECT blob FROM matrices WHERE id = ?", (matrix_id,)).fetchone()
+            if row is None:
+                raise KeyError(matrix_id)
+            connection.execute("DELETE FROM matrices WHERE id = ?", (matrix_id,))
+            connection.execute("INSERT OR IGNORE INTO freed_ids (id) VALUES (?)", (matrix_id,))
+            self._release(connection, row[0])
+            self._loaded.pop(matrix_id, None)
+    
+    def __contains__(self, matrix_id):
+        return bool(self._query("SELECT 1 FROM matrices WHERE id = ?", (matrix_id,)))
+    
+    def __iter__(self):
+        return iter([row[0] for row in self._query("SELECT id FROM matrices ORDER BY rowid")])
+    
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM matrices")[0][0]
+    
+    def metadata(self):
+        """
+        Datos de todas las matrices almacenadas leídos del índice, sin abrir
+        ninguna: {ID: {'format', 'rows', 'cols', 'version'}} en orden de creación.
+        """
+        rows = self._query("SELECT id, format, rows, cols, version FROM matrices ORDER BY rowid")
+        return {matrix_id: {'format': format, 'rows': n, 'cols': m, 'version': version}
+                for matrix_id, format, n, m, version in rows}
+    
+    def shape(self, matrix_id):
+        """Dimensiones de una matriz almacenada, leídas del índice sin abrirla."""
+        _, n, m, _, _ = self._entry(matrix_id)
+        return (n, m)
+    
+    def is_sparse(self, matrix_id):
+        """Indica si una matriz almacenada está en formato disperso, sin abrirla."""
+        return self._entry(matrix_id)[0] == FORMAT_SPARSE
+    
+    def version(self, matrix_id):
+        """
+        Versión de una matriz almacenada: cambia cada vez que se guarda, en
+        cualquier proceso. Sirve para descartar datos derivados (como su
+        factorización) que un proceso conserve en memoria.
+        """
+        return self._entry(matrix_id)[3]
+    
+    def content_key(self, matrix_id):
+        """
+        Hash del contenido de una matriz almacenada (el de memo.content_hash),
+        leído del índice sin abrirla ni recalcularlo. Dos IDs con el mismo
+        contenido tienen la misma clave.
+        """
+        return self._entry(matrix_id)[4]
+    
+    def blob_stats(self):
+        """
+        Matrices almacenadas y contenidos distintos que ocupan.
+        
+        Returns:
+            dict: {'matrices', 'blobs'}
+        """
+        with self._lock:
+            connection = self._connect()
+            matrices = connection.execute("SELECT COUNT(*) FROM matrices").fetchone()[0]
+            blobs = connection.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        return {'matrices': matrices, 'blobs': blobs}
+    
+    # --- Asignación de IDs ---
+    
+    def allocate_id(self):
+        """
+        Obtiene el siguiente ID libre de forma atómica entre procesos,
+        reutilizando primero los IDs liberados más bajos (A antes que B, etc.).
+        
+        Returns:
+            str: Un ID único en formato de letra para identificar matrices
+        """
+        with self._transaction() as connection:
+            # Primero revisar si hay IDs liberados disponibles para reutilizar
+            row = connection.execute("SELECT id FROM freed_ids ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                connection.execute("DELETE FROM freed_ids WHERE id = ?", row)
+                return row[0]
+            index = connection.execute("SELECT value FROM counters WHERE name = 'next_matrix_id'").fetchone()[0]
+            connection.execute("UPDATE counters SET value = value + 1 WHERE name = 'next_matrix_id'")
+            return matrix_id_for(index)
+
+    def release_id(self, matrix_id):
+        """
+        Devuelve a la lista de IDs libres un ID asignado que no llegó a usarse
+        (por ejemplo, si la importación de la matriz falló).
+        """
+        with self._transaction() as connection:
+            if connection.execute("SELECT 1 FROM matrices WHERE id = ?", (matrix_id,)).fetchone() is None:
+                connection.execute("INSERT OR IGNORE INTO freed_ids (id) VALUES (?)", (matrix_id,))
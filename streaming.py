@@ -0,0 +1,144 @@
+"""
+Respuestas en streaming (Server-Sent Events)
+Permite que una ruta de cálculo envíe cada paso al cliente mientras se
+calcula, en lugar de acumular todo el registro y devolverlo en el JSON final.
+
+La ruta se ejecuta en un hilo aparte con stream_steps, de modo que cada paso
+registrado se escribe en una cola acotada de la que lee la respuesta. Si el
+cliente lee más despacio de lo que se calcula, el cálculo espera; si se
+desconecta, el cálculo se interrumpe en el siguiente paso. En ningún momento
+se guarda el registro completo en memoria.
+
+Eventos enviados:
+    step: El texto de un paso (operación de fila, instantánea de la matriz...)
+    result: La respuesta JSON de la ruta, con 'steps' vacío
+    error: Mensaje de error si el cálculo falla
+"""
+import functools
+import queue
+import threading
+from flask import Response, copy_current_request_context, request, current_app
+from Calculadora import stream_steps
+
+EVENT_STREAM_MIMETYPE = 'text/event-stream'
+
+# Número máximo de eventos pendientes de enviar por respuesta
+MAX_PENDING_EVENTS = 64
+# Cada cuántos segundos se comprueba si el cliente se desconectó mientras se
+# espera hueco en la cola
+CLOSE_CHECK_INTERVAL = 0.5
+
+class StreamClosed(Exception):
+    """El cliente cerró la conexión antes de que terminara el cálculo."""
+
+def format_event(event, data):
+    """
+    Genera el texto de un evento SSE. Cada línea de los datos va en su propio
+    campo 'data:', como exige el formato.
+    
+    Args:
+        event: Nombre del evento
+        data: Texto del evento (puede tener varias líneas)
+    
+    Returns:
+        str
+    """
+    lines = data.split("\n")
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+class StepEventStream:
+    """
+    Flujo de pasos (para StepTracer) que convierte cada escritura en un evento
+    'step' de una cola acotada.
+    """
+    
+    def __init__(self, maxsize=MAX_PENDING_EVENTS):
+        self._queue = queue.Queue(maxsize)
+        self._closed = threading.Event()
+    
+    def put(self, event, data):
+        """
+        Encola un evento, esperando si la cola está llena.
+        
+        Raises:
+            StreamClosed: Si el cliente ya no está leyendo
+        """
+        while True:
+            if self._closed.is_set():
+                raise StreamClosed()
+            try:
+                self._queue.put((event, data), timeout=CLOSE_CHECK_INTERVAL)
+                return
+            except queue.Full:
+                continue
+    
+    def write(self, text):
+        # StepTracer termina cada paso con un salto de línea
+        self.put('step', text[:-1] if text.endswith("\n") else text)
+    
+    def finish(self):
+        """Indica que no habrá más eventos."""
+        self.put(None, None)
+    
+    def close(self):
+        """Marca el flujo como cerrado por el cliente."""
+        self._closed.set()
+    
+    def events(self):
+        """
+        Genera el texto de los eventos a medida que se encolan, hasta finish().
+        """
+        try:
+            while True:
+                event, data = self._queue.get()
+                if event is None:
+                    return
+                yield format_event(event, data)
+        finally:
+            self.close()
+
+def stream_requested():
+    """
+    Indica si la petición actual solicita la variante en streaming
+    (parámetro 'stream').
+    """
+    return request.values.get('stream', 'false') == 'true'
+
+def streamable(view):
+    """
+    Decorador para rutas de cálculo que registran sus pasos con capture_steps.
+    Con 'stream=true' la ruta responde con un flujo de eventos SSE (ver el
+    docstring del módulo); en otro caso se comporta igual que sin el decorador.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not stream_requested():
+            return view(*args, **kwargs)
+        
+        stream = StepEventStream()
+        
+        @copy_current_request_context
+        def run():
+            try:
+                with stream_steps(stream):
+                    response = current_app.make_response(view(*args, **kwargs))
+                stream.put('result', response.get_data(as_text=True))
+                stream.finish()
+            except StreamClosed:
+                pass
+            except Exception as error:
+                current_app.logger.exception("Error en el cálculo en streaming")
+                try:
+                    stream.put('error', str(error))
+                    stream.finish()
+                except StreamClosed:
+                    pass
+        
+        threading.Thread(target=run, daemon=True).start()
+        response = Response(stream.events(), mimetype=EVENT_STREAM_MIMETYPE)
+        response.headers['Cache-Control'] = 'no-cache'
+        # Evitar que un proxy (p. ej. nginx) acumule la respuesta
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    return wrapper
@@ -0,0 +1,33 @@
+"""
+Configuración común de las pruebas: los módulos están en la raíz del
+repositorio y la aplicación usa un almacén solo en memoria.
+"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Debe fijarse antes de importar gui, que crea el almacén al importarse
+os.environ['MATRIX_STORE_DIR'] = ''
+
+@pytest.fixture
+def client():
+    """Cliente de prueba de la aplicación con el almacén y las cachés vacíos."""
+    import gui
+    for matrix_id in list(gui.stored_matrices):
+        del gui.stored_matrices[matrix_id]
+    gui.factorization_cache.clear()
+    gui.result_cache.clear()
+    gui.app.config['TESTING'] = True
+    with gui.app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def create_matrix(client):
+    """Crea una matriz con /create_matrix y devuelve su ID."""
+    def create(data, **fields):
+        response = client.post('/create_matrix', json={'data': data, **fields})
+        payload = response.get_json()
+        assert payload['success'], payload
+        return payload['matrix_id']
+    return create
@@ -0,0 +1,144 @@
+"""
+Pruebas de las operaciones de Calculadora.py.
+"""
+import numpy as np
+import pytest
+from Calculadora import (
+    Matrix, StepTracer, TRACE_LEVELS, TRACE_NONE, TRACE_FULL, DETERMINANT_COFACTOR,
+    MULTIPLY_DIRECT, MULTIPLY_STRASSEN, multiply_matrices, matmul, _strassen_matmul,
+    determinant, calculate_inverse, gaussian_elimination, gauss_jordan_elimination,
+    lu_factorization, solve_linear_systems, rank_update
+)
+
+A = [[2.0, 1.0, -1.0], [-3.0, -1.0, 2.0], [-2.0, 1.0, 2.0]]
+# El primer pivote es casi nulo: el paso de eliminación no se registra, pero
+# tiene que aplicarse igual en todos los niveles
+NEAR_ZERO = [[1.0, 2.0, 3.0], [1e-11, 5.0, 6.0], [7.0, 8.0, 10.0]]
+
+def random_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, n)) + n * np.eye(n)
+
+@pytest.mark.parametrize('matrix', [A, NEAR_ZERO])
+def test_results_do_not_depend_on_trace_level(matrix):
+    results = {}
+    for level in TRACE_LEVELS:
+        echelon, b = gaussian_elimination(matrix, b=[1.0, 2.0, 3.0], tracer=StepTracer(level))
+        reduced, _ = gauss_jordan_elimination(matrix, tracer=StepTracer(level))
+        results[level] = (
+            determinant(matrix, tracer=StepTracer(level)),
+            calculate_inverse(matrix, tracer=StepTracer(level)).array,
+            echelon.array, b, reduced.array,
+            lu_factorization(matrix, tracer=StepTracer(level)).U.array
+        )
+    baseline = results[TRACE_NONE]
+    for level in TRACE_LEVELS:
+        for value, expected in zip(results[level], baseline):
+            np.testing.assert_array_equal(value, expected)
+
+def test_trace_none_records_nothing():
+    tracer = StepTracer(TRACE_NONE)
+    determinant(A, tracer=tracer)
+    calculate_inverse(A, tracer=tracer)
+    assert tracer.render() == ''
+    tracer = StepTracer(TRACE_FULL)
+    determinant(A, tracer=tracer)
+    assert tracer.render() != ''
+
+def test_determinant_matches_numpy():
+    matrix = random_matrix(6)
+    assert determinant(matrix, tracer=StepTracer(TRACE_NONE)) == pytest.approx(np.linalg.det(matrix))
+    assert determinant(A, tracer=StepTracer(TRACE_NONE), method=DETERMINANT_COFACTOR) == pytest.approx(-1.0)
+
+def test_determinant_uses_relative_tolerance():
+    tracer = StepTracer(TRACE_NONE)
+    # Matrices bien condicionadas de escala muy pequeña o muy dispar
+    assert determinant(np.eye(3) * 1e-11, tracer=tracer) == pytest.approx(1e-33)
+    assert determinant(np.diag([1e-12, 1e12]), tracer=tracer) == pytest.approx(1.0)
+    assert determinant([[1.0, 2.0], [2.0, 4.0]], tracer=tracer) == 0
+    assert determinant([[1.0, 2.0, 3.0]], tracer=tracer) is None
+
+@pytest.mark.parametrize('matrix, singular', [
+    (np.diag([1e-13, 1.0]), False),
+    (np.eye(3) * 1e-11, False),
+    ([[1.0, 2.0], [2.0, 4.0]], True),
+    ([[1.0, 1.0], [1.0, 1.0 + 1e-15]], True),
+])
+def test_same_singularity_criterion_everywhere(matrix, singular):
+    tracer = StepTracer(TRACE_NONE)
+    factorization = lu_factorization(matrix, tracer=tracer)
+    assert factorization.singular == singular
+    assert (calculate_inverse(matrix, tracer=tracer) is None) == singular
+    assert determinant(matrix, tracer=tracer) == pytest.approx(factorization.det(), abs=0.0)
+    assert (determinant(matrix, tracer=tracer) == 0) == singular
+
+def test_inverse_detects_singularity_while_pivoting():
+    tracer = StepTracer(TRACE_NONE)
+    assert calculate_inverse([[1.0, 2.0], [2.0, 4.0]], tracer=tracer) is None
+    assert calculate_inverse(np.zeros((3, 3)), tracer=tracer) is None
+    assert calculate_inverse([[1.0, 2.0, 3.0]], tracer=tracer) is None
+    np.testing.assert_allclose(calculate_inverse(A, tracer=tracer).array, np.linalg.inv(A), atol=1e-12)
+
+def test_matrix_wraps_float_arrays_without_copying():
+    array = np.arange(6, dtype=np.float64).reshape(2, 3)
+    assert Matrix(array).array is array
+    assert Matrix([[1, 2], [3, 4]]).array.dtype == np.float64
+
+def test_lu_factorization_reconstructs_matrix():
+    matrix = random_matrix(5)
+    factorization = lu_factorization(matrix, tracer=StepTracer(TRACE_NONE))
+    np.testing.assert_allclose(factorization.P.array @ matrix,
+                               factorization.L.array @ factorization.U.array, atol=1e-12)
+    assert factorization.det() == pytest.approx(np.linalg.det(matrix))
+    B = np.random.default_rng(2).standard_normal((5, 3))
+    np.testing.assert_allclose(factorization.solve(B), np.linalg.solve(matrix, B), atol=1e-12)
+    np.testing.assert_allclose(factorization.inverse().array, np.linalg.inv(matrix), atol=1e-12)
+
+def test_solve_linear_systems_with_many_right_hand_sides():
+    matrix = random_matrix(5, seed=1)
+    B = np.random.default_rng(2).standard_normal((5, 3))
+    X = solve_linear_systems(matrix, B, tracer=StepTracer(TRACE_NONE))
+    np.testing.assert_allclose(X.array, np.linalg.solve(matrix, B), atol=1e-12)
+    assert solve_linear_systems(matrix, B[:4], tracer=StepTracer(TRACE_NONE)) is None
+
+def test_solve_transposed():
+    matrix = random_matrix(5, seed=1)
+    B = np.random.default_rng(2).standard_normal((5, 3))
+    factorization = lu_factorization(matrix, tracer=StepTracer(TRACE_NONE))
+    np.testing.assert_allclose(factorization.solve_transposed(B), np.linalg.solve(matrix.T, B), atol=1e-12)
+    np.testing.assert_allclose(factorization.solve_transposed(B[:, 0]), np.linalg.solve(matrix.T, B[:, 0]), atol=1e-12)
+
+@pytest.mark.parametrize('shape', [(16, 16, 16), (13, 7, 11)])
+def test_strassen_matches_direct_product(shape):
+    n, m, p = shape
+    rng = np.random.default_rng(5)
+    A, B = rng.standard_normal((n, m)), rng.standard_normal((m, p))
+    # Hoja pequeña para recorrer varios niveles, con dimensiones pares e impares
+    np.testing.assert_allclose(_strassen_matmul(A, B, 2), A @ B, atol=1e-10)
+    np.testing.assert_allclose(matmul(A, B, MULTIPLY_STRASSEN), matmul(A, B, MULTIPLY_DIRECT))
+    product = multiply_matrices(A, B, tracer=StepTracer(TRACE_NONE))
+    np.testing.assert_allclose(product.array, A @ B)
+    with pytest.raises(ValueError):
+        matmul(A, B, 'unknown')
+
+@pytest.mark.parametrize('rows', [[2], [0, 3]])
+def test_rank_update_matches_recomputation(rows):
+    old = random_matrix(6, seed=3)
+    new = old.copy()
+    new[rows] += np.random.default_rng(4).standard_normal((len(rows), 6))
+    delta = new[rows] - old[rows]
+    
+    inverse, ratio = rank_update(rows, delta, inverse=np.linalg.inv(old))
+    np.testing.assert_allclose(inverse.array, np.linalg.inv(new), atol=1e-10)
+    assert np.linalg.det(old) * ratio == pytest.approx(np.linalg.det(new))
+    
+    # Sin la inversa, solo la razón de los determinantes a partir de la LU
+    factorization = lu_factorization(old, tracer=StepTracer(TRACE_NONE))
+    inverse, ratio = rank_update(rows, delta, factorization=factorization)
+    assert inverse is None
+    assert factorization.det() * ratio == pytest.approx(np.linalg.det(new))
+
+def test_rank_update_to_singular_matrix():
+    inverse, ratio = rank_update([0], [[-1.0, 0.0, 0.0]], inverse=np.eye(3))
+    assert inverse is None
+    assert ratio == pytest.approx(0.0)
@@ -0,0 +1,28 @@
+"""
+Pruebas de la aritmética exacta (exact.py).
+"""
+from fractions import Fraction
+from exact import exact_determinant, exact_inverse, exact_echelon_form, exact_response
+from Calculadora import StepTracer, TRACE_NONE
+
+def test_exact_determinant():
+    matrix = [[1, 2], [3, 4]]
+    assert exact_determinant(matrix, tracer=StepTracer(TRACE_NONE)) == -2
+    assert exact_determinant([[0.5, 0], [0, 3]], tracer=StepTracer(TRACE_NONE)) == Fraction(3, 2)
+    assert exact_determinant([[1, 2, 3]], tracer=StepTracer(TRACE_NONE)) is None
+
+def test_exact_inverse():
+    inverse = exact_inverse([[2, 1], [1, 1]], tracer=StepTracer(TRACE_NONE))
+    assert inverse == [[1, -1], [-1, 2]]
+    inverse = exact_inverse([[3, 0], [0, 4]], tracer=StepTracer(TRACE_NONE))
+    assert inverse == [[Fraction(1, 3), 0], [0, Fraction(1, 4)]]
+    assert exact_inverse([[1, 2], [2, 4]], tracer=StepTracer(TRACE_NONE)) is None
+
+def test_exact_reduced_echelon_form():
+    echelon = exact_echelon_form([[1, 2, 3], [4, 5, 6]], tracer=StepTracer(TRACE_NONE))
+    assert echelon == [[1, 0, -1], [0, 1, 2]]
+
+def test_exact_response_formats_fractions():
+    matrix, text = exact_response([[Fraction(1, 3), Fraction(2)]])
+    assert text == [['1/3', '2']]
+    assert matrix.array.tolist() == [[1 / 3, 2.0]]
@@ -0,0 +1,45 @@
+"""
+Pruebas de la evaluación de expresiones matriciales (expressions.py).
+"""
+import numpy as np
+import pytest
+from Calculadora import Matrix, StepTracer, TRACE_NONE
+from expressions import evaluate_expression, ExpressionError
+
+rng = np.random.default_rng(0)
+MATRICES = {
+    'A': Matrix(rng.standard_normal((3, 3)) + 3 * np.eye(3)),
+    'B': Matrix(rng.standard_normal((3, 3)) + 3 * np.eye(3)),
+    'C': Matrix(rng.standard_normal((3, 2))),
+}
+
+def evaluate(text, matrices=MATRICES):
+    return evaluate_expression(text, matrices, tracer=StepTracer(TRACE_NONE))
+
+@pytest.mark.parametrize('text, expected', [
+    ('A + B', lambda A, B, C: A + B),
+    ('inv(A) * C', lambda A, B, C: np.linalg.solve(A, C)),
+    ('A * inv(B)', lambda A, B, C: A @ np.linalg.inv(B)),
+    ("C' * A", lambda A, B, C: C.T @ A),
+])
+def test_evaluate_matches_numpy(text, expected):
+    A, B, C = (MATRICES[name].array for name in 'ABC')
+    np.testing.assert_allclose(evaluate(text).array, expected(A, B, C), atol=1e-12)
+
+def test_determinant_is_scalar():
+    assert evaluate('det(A)') == pytest.approx(np.linalg.det(MATRICES['A'].array))
+
+def test_only_referenced_matrices_are_read():
+    class Matrices(dict):
+        opened = set()
+        def __getitem__(self, name):
+            self.opened.add(name)
+            return super().__getitem__(name)
+    matrices = Matrices(MATRICES)
+    evaluate('A + B', matrices)
+    assert matrices.opened == {'A', 'B'}
+
+@pytest.mark.parametrize('text', ['A +', 'A + C', 'inv(C)', 'D * A'])
+def test_invalid_expressions(text):
+    with pytest.raises(ExpressionError):
+        evaluate(text)
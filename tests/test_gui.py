@@ -0,0 +1,297 @@
+"""
+Pruebas de las rutas de la API (gui.py).
+"""
+import io
+import time
+import numpy as np
+import pytest
+import gui
+from Calculadora import TRACE_LEVELS
+
+A = [[4.0, 1.0, 0.0, 0.0], [1.0, 5.0, 1.0, 0.0], [0.0, 1.0, 6.0, 1.0], [0.0, 0.0, 1.0, 7.0]]
+
+@pytest.mark.parametrize('route, field', [
+    ('/determinant', 'determinant'),
+    ('/inverse', 'result'),
+    ('/gauss_jordan', 'result'),
+])
+def test_results_equal_across_step_levels(client, create_matrix, route, field):
+    matrix_id = create_matrix(A)
+    results = [client.post(route, data={'matrix_id': matrix_id, 'steps': level}).get_json()
+               for level in TRACE_LEVELS]
+    assert all(result['success'] for result in results), results
+    for result in results[1:]:
+        assert result[field] == results[0][field]
+    assert results[0]['steps'] == ''
+    assert results[-1]['steps'] != ''
+
+def test_factorization_cached_until_matrix_changes(client, create_matrix):
+    matrix_id = create_matrix(A)
+    factorization = gui.get_factorization(matrix_id)
+    assert gui.get_factorization(matrix_id) is factorization
+    gui.stored_matrices[matrix_id] = np.eye(4)
+    assert gui.get_factorization(matrix_id) is not factorization
+    np.testing.assert_array_equal(gui.get_factorization(matrix_id).U.array, np.eye(4))
+
+def test_solve(client, create_matrix):
+    matrix_id = create_matrix(A)
+    B = [[1.0, 0.0], [2.0, 1.0], [3.0, 0.0], [4.0, 1.0]]
+    result = client.post(f'/solve?matrix_id={matrix_id}&steps=none', json=B).get_json()
+    assert result['success'], result
+    np.testing.assert_allclose(result['result'], np.linalg.solve(A, B))
+    result = client.post(f'/solve?matrix_id={matrix_id}&steps=none', json={'data': B}).get_json()
+    np.testing.assert_allclose(result['result'], np.linalg.solve(A, B))
+    rhs_id = create_matrix(B)
+    result = client.post('/solve', data={'matrix_id': matrix_id, 'rhs_id': rhs_id}).get_json()
+    np.testing.assert_allclose(result['result'], np.linalg.solve(A, B))
+
+@pytest.mark.parametrize('body', [
+    None,
+    [1.0, 2.0],
+    [[1.0], [2.0, 3.0]],
+    [['x'], [1.0], [1.0], [1.0]],
+    [[float('inf')], [1.0], [1.0], [1.0]],
+    {'data': 'rhs'},
+    [[0.0] * 20000] * 4,
+    # B debe tener tantas filas como A
+    [[1.0], [2.0]],
+])
+def test_solve_rejects_invalid_rhs(client, create_matrix, body):
+    matrix_id = create_matrix(A)
+    response = client.post(f'/solve?matrix_id={matrix_id}', json=body)
+    assert response.status_code == 200
+    assert response.get_json()['success'] is False
+
+def test_batch(client, create_matrix):
+    create_matrix(A)
+    response = client.post('/batch', json={
+        'operations': [{'op': 'inverse', 'args': ['A'], 'name': 'X'},
+                       {'op': 'multiply', 'args': ['A', 'X']}],
+    })
+    result = response.get_json()
+    assert result['success'], result
+    np.testing.assert_allclose(result['results']['$1'], np.eye(4), atol=1e-12)
+
+@pytest.mark.parametrize('body', [
+    [1, 2],
+    {'operations': 'inverse'},
+    {'operations': [{'op': 'unknown', 'args': ['A']}]},
+    {'operations': [{'op': ['inverse'], 'args': ['A']}]},
+    {'operations': [{'op': 'inverse', 'args': ['A'], 'name': ['x']}]},
+    {'operations': [{'op': 'inverse', 'args': ['A'], 'name': 'x'}], 'outputs': [['x']]},
+    {'operations': [{'op': 'inverse', 'args': ['A'], 'name': 'x'}], 'outputs': ['y']},
+    {'operations': [{'op': 'inverse', 'args': ['A', 'A']}]},
+    {'operations': [{'op': 'inverse', 'args': ['Z']}]},
+    # Un escalar no puede usarse como matriz
+    {'operations': [{'op': 'determinant', 'args': ['A'], 'name': 'd'}, {'op': 'add', 'args': ['d', 'A']}]},
+    # Dimensiones incompatibles
+    {'operations': [{'op': 'multiply', 'args': ['A', 'B']}]},
+])
+def test_batch_errors(client, create_matrix, body):
+    create_matrix(A)
+    create_matrix([[1.0, 2.0, 3.0]])
+    response = client.post('/batch', json=body)
+    assert response.status_code == 200
+    assert response.get_json()['success'] is False
+
+def test_exact_results(client, create_matrix):
+    matrix_id = create_matrix([[2.0, 1.0], [1.0, 1.0]])
+    result = client.post('/inverse', data={'matrix_id': matrix_id, 'steps': 'none', 'exact': 'true'}).get_json()
+    assert result['exact_result'] == [['1', '-1'], ['-1', '2']]
+    result = client.post('/determinant', data={'matrix_id': matrix_id, 'steps': 'none', 'method': 'exact'}).get_json()
+    assert result['exact_determinant'] == '1'
+
+def test_create_matrix_bodies(client):
+    expected = [[1.0, 2.0], [3.0, 4.0]]
+    buffer = io.BytesIO()
+    np.save(buffer, np.array(expected))
+    requests = [
+        {'json': expected},
+        {'json': {'data': expected, 'format': 'sparse'}},
+        {'data': '1,2\n3,4\n', 'content_type': 'text/csv'},
+        {'data': buffer.getvalue(), 'content_type': 'application/x-npy'},
+        {'data': {'rows': '2', 'cols': '2', 'cell_0_0': '1', 'cell_0_1': '2', 'cell_1_0': '3', 'cell_1_1': '4'}},
+    ]
+    for kwargs in requests:
+        result = client.post('/create_matrix', **kwargs).get_json()
+        assert result['success'], result
+        matrix = gui.stored_matrices[result['matrix_id']]
+        np.testing.assert_array_equal(np.asarray(matrix), expected)
+    assert gui.stored_matrices.is_sparse('B')
+
+@pytest.mark.parametrize('kwargs', [
+    {'json': 'x'},
+    {'json': [[1.0], [2.0, 3.0]]},
+    {'data': '1,2\n3', 'content_type': 'text/csv'},
+    {'data': b'xx', 'content_type': 'application/x-npy'},
+    {'data': {'rows': '100000', 'cols': '100000'}},
+])
+def test_create_matrix_rejects_invalid_bodies(client, kwargs):
+    response = client.post('/create_matrix', **kwargs)
+    assert response.status_code == 200
+    assert response.get_json()['success'] is False
+    assert len(gui.stored_matrices) == 0
+
+def test_import_matrix(client):
+    result = client.post('/import_matrix', data=b'1,2\n3,4\n', content_type='text/csv').get_json()
+    assert result['success'], result
+    np.testing.assert_array_equal(gui.stored_matrices[result['matrix_id']].array, [[1.0, 2.0], [3.0, 4.0]])
+    mtx = b"%%MatrixMarket matrix coordinate real general\n2 2 1\n2 1 7\n"
+    result = client.post('/import_matrix?sparse=true', data=mtx, content_type='text/x-matrix-market').get_json()
+    assert result['success'] and result['sparse'], result
+    result = client.post('/import_matrix', data=b'1,2\n3\n', content_type='text/csv').get_json()
+    assert result['success'] is False
+    # El ID asignado a la importación fallida se reutiliza
+    assert client.post('/create_matrix', json=[[1.0]]).get_json()['matrix_id'] == 'C'
+
+def test_view_matrices_and_tiles(client, create_matrix):
+    data = np.arange(30.0).reshape(5, 6)
+    create_matrix(data.tolist())
+    create_matrix(data.tolist(), format='sparse')
+    info = client.get('/view_matrices').get_json()
+    assert info['A']['rows'] == 5 and info['A']['cols'] == 6
+    assert not info['A']['sparse'] and info['B']['sparse']
+    for matrix_id in ('A', 'B'):
+        tile = client.get(f'/matrix_tile/{matrix_id}?row=3&col=4&rows=10&cols=10').get_json()
+        assert (tile['rows'], tile['cols'], tile['total_rows']) == (2, 2, 5)
+        np.testing.assert_array_equal(tile['data'], data[3:, 4:])
+
+@pytest.mark.parametrize('query', ['Z?row=0', 'A?row=x', 'A?row=-1', 'A?rows=0', 'A?rows=1000&cols=1000'])
+def test_matrix_tile_errors(client, create_matrix, query):
+    create_matrix(A)
+    matrix_id, _, params = query.partition('?')
+    assert client.get(f'/matrix_tile/{matrix_id}?{params}').get_json()['success'] is False
+
+def test_binary_response(client, create_matrix):
+    matrix_id = create_matrix(A)
+    response = client.post('/inverse', data={'matrix_id': matrix_id, 'steps': 'none'},
+                           headers={'Accept': 'application/x-matrix'})
+    assert response.mimetype == 'application/x-matrix'
+    assert response.data[:4] == b'MTX1'
+
+def test_large_responses_are_compressed(client, create_matrix):
+    matrix_id = create_matrix((np.eye(40) * 2).tolist())
+    response = client.post('/inverse', data={'matrix_id': matrix_id, 'steps': 'none'},
+                           headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] in ('gzip', 'br')
+
+def test_streamed_steps(client, create_matrix):
+    matrix_id = create_matrix(A)
+    response = client.post('/inverse', data={'matrix_id': matrix_id, 'steps': 'full', 'stream': 'true'},
+                           headers={'Accept': 'application/x-matrix'})
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    assert 'event: step' in body
+    # El resultado va en JSON aunque se pida el formato binario
+    assert 'event: result\ndata: {' in body
+
+def wait_for_job(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] in gui.FINISHED_STATES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'El trabajo {job_id} no terminó')
+
+def test_job(client, create_matrix):
+    matrix_id = create_matrix(A)
+    submitted = client.post('/jobs', data={'operation': 'determinant', 'matrix_id': matrix_id, 'steps': 'full'}).get_json()
+    assert submitted['success'], submitted
+    job = wait_for_job(client, submitted['job_id'])
+    assert job['status'] == 'done', job
+    assert job['result']['determinant'] == pytest.approx(np.linalg.det(A))
+    steps = client.get(f"/jobs/{submitted['job_id']}/steps")
+    assert steps.status_code == 200
+
+@pytest.mark.parametrize('fields', [
+    {'operation': 'unknown', 'matrix_id': 'A'},
+    {'operation': 'inverse', 'matrix_id': 'Z'},
+    {'operation': 'determinant', 'matrix_id': 'A', 'method': 'unknown'},
+])
+def test_job_errors(client, create_matrix, fields):
+    create_matrix(A)
+    assert client.post('/jobs', data=fields).get_json()['success'] is False
+    assert client.get('/jobs/unknown').get_json()['success'] is False
+
+def test_results_are_memoized_by_content(client, create_matrix):
+    first, second = create_matrix(A), create_matrix(A)
+    client.post('/inverse', data={'matrix_id': first, 'steps': 'none'})
+    hits = client.get('/cache_stats').get_json()['hits']
+    # Otra matriz con el mismo contenido usa el resultado guardado
+    result = client.post('/inverse', data={'matrix_id': second, 'steps': 'none'}).get_json()
+    assert client.get('/cache_stats').get_json()['hits'] == hits + 1
+    np.testing.assert_allclose(result['result'], np.linalg.inv(A))
+    # Con otro nivel de pasos la clave es distinta
+    client.post('/inverse', data={'matrix_id': second, 'steps': 'full'})
+    assert client.get('/cache_stats').get_json()['hits'] == hits + 1
+
+def test_delete_releases_store_content(client, create_matrix):
+    create_matrix(A)
+    create_matrix(A)
+    assert client.get('/cache_stats').get_json()['store'] == {'matrices': 2, 'blobs': 1}
+    for matrix_id in ('A', 'B'):
+        assert client.post('/delete_matrix', data={'matrix_id': matrix_id}).get_json()['success']
+    assert client.get('/cache_stats').get_json()['store'] == {'matrices': 0, 'blobs': 0}
+
+def test_edit_matrix_updates_cached_results(client, create_matrix):
+    matrix_id = create_matrix(A)
+    client.post('/inverse', data={'matrix_id': matrix_id, 'steps': 'none'})
+    client.post('/determinant', data={'matrix_id': matrix_id, 'steps': 'none'})
+    result = client.patch(f'/edit_matrix/{matrix_id}', json={'cells': [[1, 1, 9.0]]}).get_json()
+    assert result['success'], result
+    assert result['changed_rows'] == [1]
+    assert result['inverse_updated'] and result['determinant_updated']
+    
+    new = np.array(A)
+    new[1, 1] = 9.0
+    assert result['determinant'] == pytest.approx(np.linalg.det(new))
+    hits = client.get('/cache_stats').get_json()['hits']
+    inverse = client.post('/inverse', data={'matrix_id': matrix_id, 'steps': 'none'}).get_json()
+    np.testing.assert_allclose(inverse['result'], np.linalg.inv(new), atol=1e-12)
+    determinant = client.post('/determinant', data={'matrix_id': matrix_id, 'steps': 'none'}).get_json()
+    assert determinant['determinant'] == pytest.approx(np.linalg.det(new))
+    assert client.get('/cache_stats').get_json()['hits'] == hits + 2
+
+def test_edit_matrix_retries_after_concurrent_write(client, create_matrix, monkeypatch):
+    matrix_id = create_matrix(A)
+    replace = gui.stored_matrices.replace
+    
+    def replace_after_other_write(matrix_id, matrix, version):
+        # Otro worker guarda la matriz justo antes del primer intento
+        monkeypatch.setattr(gui.stored_matrices, 'replace', replace)
+        edited = np.array(gui.stored_matrices[matrix_id].array)
+        edited[3, 3] = 8.0
+        gui.stored_matrices[matrix_id] = edited
+        return replace(matrix_id, matrix, version)
+    
+    monkeypatch.setattr(gui.stored_matrices, 'replace', replace_after_other_write)
+    result = client.patch(f'/edit_matrix/{matrix_id}', json={'cells': [[0, 0, 2.0]]}).get_json()
+    assert result['success'], result
+    # Se conservan las dos modificaciones
+    stored = gui.stored_matrices[matrix_id].array
+    assert (stored[0, 0], stored[3, 3]) == (2.0, 8.0)
+
+@pytest.mark.parametrize('body', [
+    [1, 2],
+    'cells',
+    {},
+    {'cells': 5},
+    {'cells': [[9, 0, 1.0]]},
+    {'cells': [[0, 0, 'x']]},
+    {'rows': [[0, [1.0, 2.0]]]},
+    {'rows': [[0, [1.0, 2.0, 3.0, float('nan')]]]},
+])
+def test_edit_matrix_errors(client, create_matrix, body):
+    matrix_id = create_matrix(A)
+    version = gui.stored_matrices.version(matrix_id)
+    response = client.patch(f'/edit_matrix/{matrix_id}', json=body)
+    assert response.status_code == 200
+    assert response.get_json()['success'] is False
+    assert gui.stored_matrices.version(matrix_id) == version
+
+def test_edit_unknown_or_sparse_matrix(client, create_matrix):
+    create_matrix(A, format='sparse')
+    for matrix_id in ('A', 'Z'):
+        result = client.patch(f'/edit_matrix/{matrix_id}', json={'cells': [[0, 0, 1.0]]}).get_json()
+        assert result['success'] is False
@@ -0,0 +1,97 @@
+"""
+Pruebas de la lectura de matrices (matrix_io.py).
+"""
+import contextlib
+import io
+import numpy as np
+import pytest
+from matrix_io import (
+    check_matrix_size, parse_json_matrix, parse_csv_matrix, parse_npy_matrix, import_csv,
+    import_matrix_market, import_matrix_market_sparse
+)
+
+LIMITS = {'max_rows': 100, 'max_cols': 100, 'max_elements': 1000}
+
+def allocator(arrays):
+    """Destino de una importación: un arreglo en memoria que se guarda en arrays."""
+    @contextlib.contextmanager
+    def allocate(shape):
+        array = np.zeros(shape)
+        yield array
+        arrays.append(array)
+    return allocate
+
+def test_check_matrix_size():
+    check_matrix_size(10, 100, **LIMITS)
+    for rows, cols in [(0, 1), (1, 0), (101, 1), (1, 101), (40, 40)]:
+        with pytest.raises(ValueError):
+            check_matrix_size(rows, cols, **LIMITS)
+
+def test_parse_json_matrix():
+    matrix = parse_json_matrix([[1, 2], [3, 4]], **LIMITS)
+    np.testing.assert_array_equal(matrix.array, [[1.0, 2.0], [3.0, 4.0]])
+    for data in [[], [1, 2], [[1, 2], [3]], [['a']], [[float('nan')]], [[0] * 101]]:
+        with pytest.raises(ValueError):
+            parse_json_matrix(data, **LIMITS)
+
+@pytest.mark.parametrize('text, delimiter', [
+    ('1,2\n3,4\n', None),
+    ('1;2\n3;4', None),
+    ('1 2\n3   4\n', None),
+    ('1|2\n3|4', '|'),
+])
+def test_parse_csv_matrix(text, delimiter):
+    matrix = parse_csv_matrix(text, delimiter, **LIMITS)
+    np.testing.assert_array_equal(matrix.array, [[1.0, 2.0], [3.0, 4.0]])
+
+def test_parse_csv_matrix_errors():
+    for text in ['', '1,2\n3', '1,x']:
+        with pytest.raises(ValueError):
+            parse_csv_matrix(text, **LIMITS)
+
+def test_parse_npy_matrix():
+    buffer = io.BytesIO()
+    np.save(buffer, np.arange(6.0).reshape(2, 3))
+    matrix = parse_npy_matrix(buffer.getvalue(), **LIMITS)
+    np.testing.assert_array_equal(matrix.array, np.arange(6.0).reshape(2, 3))
+    # Las dimensiones se comprueban con la cabecera, antes de leer los datos
+    buffer = io.BytesIO()
+    np.save(buffer, np.zeros((1, 200)))
+    with pytest.raises(ValueError):
+        parse_npy_matrix(buffer.getvalue(), **LIMITS)
+    with pytest.raises(ValueError):
+        parse_npy_matrix(b'not a npy file', **LIMITS)
+
+def test_import_csv_in_chunks():
+    expected = np.arange(60.0).reshape(12, 5)
+    text = "# comentario\n" + "".join(",".join(map(str, row)) + "\n" for row in expected)
+    arrays, progress = [], []
+    shape = import_csv(io.BytesIO(text.encode()).readlines(), allocator(arrays),
+                       progress=lambda done, total: progress.append((done, total)),
+                       chunk_values=10, **LIMITS)
+    assert shape == (12, 5)
+    np.testing.assert_array_equal(arrays[0], expected)
+    assert len(progress) > 1 and progress[-1] == (12, 12)
+    with pytest.raises(ValueError):
+        import_csv([b"1,2\n", b"3\n"], allocator([]), **LIMITS)
+
+MTX_COORDINATE = b"""%%MatrixMarket matrix coordinate real symmetric
+% comentario
+3 3 3
+1 1 2.0
+3 1 -1.0
+2 2 5.0
+"""
+
+def test_import_matrix_market():
+    expected = [[2.0, 0.0, -1.0], [0.0, 5.0, 0.0], [-1.0, 0.0, 0.0]]
+    arrays = []
+    assert import_matrix_market(io.BytesIO(MTX_COORDINATE).readlines(), allocator(arrays), **LIMITS) == (3, 3)
+    np.testing.assert_array_equal(arrays[0], expected)
+    matrix = import_matrix_market_sparse(io.BytesIO(MTX_COORDINATE).readlines(), **LIMITS)
+    np.testing.assert_array_equal(matrix.toarray(), expected)
+    array_format = b"%%MatrixMarket matrix array real general\n2 2\n1\n3\n2\n4\n"
+    assert import_matrix_market(io.BytesIO(array_format).readlines(), allocator(arrays), **LIMITS) == (2, 2)
+    np.testing.assert_array_equal(arrays[1], [[1.0, 2.0], [3.0, 4.0]])
+    with pytest.raises(ValueError):
+        import_matrix_market([b"no es una cabecera\n"], allocator([]), **LIMITS)
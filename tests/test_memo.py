@@ -0,0 +1,38 @@
+"""
+Pruebas de la caché de resultados (memo.py).
+"""
+import numpy as np
+from memo import ResultCache, content_hash, freeze
+from sparse import SparseMatrix
+
+def test_content_hash_depends_on_content_and_shape():
+    assert content_hash([[1.0, 2.0]]) == content_hash(np.array([[1.0, 2.0]]))
+    assert content_hash([[1.0, 2.0]]) != content_hash([[1.0], [2.0]])
+    assert content_hash(np.eye(2)) != content_hash(SparseMatrix.from_dense(np.eye(2)))
+
+def test_lru_eviction_by_bytes():
+    cache = ResultCache(max_bytes=300)
+    for key in 'abc':
+        cache.put(key, key, size=100)
+    assert cache.get('a') == 'a'
+    cache.put('d', 'd', size=100)
+    # 'b' era el menos usado recientemente
+    assert cache.peek('b') is None
+    assert [cache.peek(key) for key in 'acd'] == ['a', 'c', 'd']
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (3, 300, 1)
+
+def test_oversized_results_are_not_stored():
+    cache = ResultCache(max_bytes=10)
+    cache.put('a', 'a', size=11)
+    assert cache.get('a') is None
+    assert cache.stats()['misses'] == 1
+
+def test_zero_budget_disables_cache():
+    cache = ResultCache(max_bytes=0)
+    cache.put('a', np.ones(3))
+    assert cache.peek('a') is None
+
+def test_freeze_makes_arrays_read_only():
+    value = freeze({'result': np.ones(2)})
+    assert not value['result'].flags.writeable
@@ -0,0 +1,22 @@
+"""
+Pruebas de la serialización de respuestas (responses.py).
+"""
+import json
+import struct
+import numpy as np
+from Calculadora import Matrix
+from responses import encode_binary, BINARY_MAGIC
+
+def test_encode_binary():
+    first, second = np.arange(6.0).reshape(2, 3), Matrix([[1.0], [2.0]])
+    body = encode_binary({'success': True, 'result': first, 'extra': [second, 3]})
+    assert body[:4] == BINARY_MAGIC
+    n = struct.unpack('<I', body[4:8])[0]
+    # Los datos empiezan alineados a 8 bytes
+    assert (8 + n) % 8 == 0
+    header = json.loads(body[8:8 + n])
+    assert header['success'] is True
+    assert header['result'] == {'$array': 0, 'shape': [2, 3]}
+    assert header['extra'] == [{'$array': 1, 'shape': [2, 1]}, 3]
+    data = np.frombuffer(body, dtype='<f8', offset=8 + n)
+    np.testing.assert_array_equal(data, [0, 1, 2, 3, 4, 5, 1, 2])
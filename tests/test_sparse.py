@@ -0,0 +1,56 @@
+"""
+Pruebas de las matrices dispersas y su factorización LU (sparse.py).
+"""
+import numpy as np
+import pytest
+from sparse import SparseMatrix, sparse_lu
+
+def random_sparse(n, density=0.2, seed=0):
+    """Matriz dispersa con diagonal dominante (no singular)."""
+    rng = np.random.default_rng(seed)
+    dense = rng.standard_normal((n, n)) * (rng.random((n, n)) < density)
+    dense += np.diag(np.abs(dense).sum(axis=1) + 1)
+    return dense
+
+def test_from_dense_round_trip():
+    dense = random_sparse(8)
+    matrix = SparseMatrix.from_dense(dense)
+    np.testing.assert_array_equal(matrix.toarray(), dense)
+    assert matrix.nnz == np.count_nonzero(dense)
+
+def test_from_coo_sums_duplicates():
+    matrix = SparseMatrix.from_coo([0, 0, 1], [1, 1, 0], [1.0, 2.0, 5.0], (2, 2))
+    np.testing.assert_array_equal(matrix.toarray(), [[0.0, 3.0], [5.0, 0.0]])
+
+def test_operations_match_dense():
+    A, B = random_sparse(6, seed=1), random_sparse(6, seed=2)
+    sparse_A, sparse_B = SparseMatrix.from_dense(A), SparseMatrix.from_dense(B)
+    np.testing.assert_allclose((sparse_A + sparse_B).toarray(), A + B)
+    np.testing.assert_allclose((sparse_A - sparse_B).toarray(), A - B)
+    np.testing.assert_allclose((sparse_A @ sparse_B).toarray(), A @ B)
+    np.testing.assert_allclose(sparse_A.T.toarray(), A.T)
+
+@pytest.mark.parametrize('n', [5, 40])
+def test_sparse_lu_solve_matches_dense(n):
+    dense = random_sparse(n, seed=n)
+    B = np.random.default_rng(n).standard_normal((n, 3))
+    factorization = sparse_lu(SparseMatrix.from_dense(dense))
+    assert not factorization.singular
+    np.testing.assert_allclose(factorization.solve(B), np.linalg.solve(dense, B), atol=1e-10)
+    np.testing.assert_allclose(factorization.solve(B[:, 0]), np.linalg.solve(dense, B[:, 0]), atol=1e-10)
+    assert factorization.det() == pytest.approx(np.linalg.det(dense))
+
+def test_sparse_lu_singular():
+    dense = np.array([[1.0, 2.0, 0.0], [2.0, 4.0, 0.0], [0.0, 0.0, 3.0]])
+    factorization = sparse_lu(SparseMatrix.from_dense(dense))
+    assert factorization.singular
+    assert factorization.solve(np.ones(3)) is None
+    with pytest.raises(ValueError):
+        factorization.solve(np.ones(4))
+
+def test_sparse_lu_uses_dense_singularity_criterion():
+    # Columnas de escalas muy distintas: no es singular, como en la LU densa
+    dense = np.diag([1e-13, 1.0])
+    factorization = sparse_lu(SparseMatrix.from_dense(dense))
+    assert not factorization.singular
+    assert factorization.det() == pytest.approx(1e-13)
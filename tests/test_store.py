@@ -0,0 +1,107 @@
+"""
+Pruebas del almacén de matrices (store.py), en memoria y en disco.
+"""
+import os
+import numpy as np
+import pytest
+from Calculadora import Matrix
+from sparse import SparseMatrix
+from store import MatrixStore, BLOBS_DIRNAME
+
+@pytest.fixture(params=['memory', 'disk'])
+def store(request, tmp_path):
+    return MatrixStore(None if request.param == 'memory' else str(tmp_path))
+
+def test_dense_and_sparse_matrices(store):
+    store['A'] = [[1.0, 2.0], [3.0, 4.0]]
+    store['B'] = SparseMatrix.from_dense(np.eye(3))
+    assert list(store) == ['A', 'B'] and len(store) == 2
+    np.testing.assert_array_equal(store['A'].array, [[1.0, 2.0], [3.0, 4.0]])
+    assert store.is_sparse('B') and not store.is_sparse('A')
+    np.testing.assert_array_equal(store['B'].toarray(), np.eye(3))
+    assert store.metadata()['B'] == {'format': 'sparse', 'rows': 3, 'cols': 3, 'version': store.version('B')}
+    del store['A']
+    assert 'A' not in store
+    with pytest.raises(KeyError):
+        store['A']
+
+def test_disk_store_is_reopened_lazily(tmp_path):
+    MatrixStore(str(tmp_path))['A'] = [[1.0, 2.0]]
+    other = MatrixStore(str(tmp_path))
+    assert list(other) == ['A']
+    assert other.shape('A') == (1, 2)
+    matrix = other['A']
+    assert isinstance(matrix, Matrix)
+    # Abierta con mmap de solo lectura
+    assert not matrix.array.flags.writeable
+    np.testing.assert_array_equal(matrix.array, [[1.0, 2.0]])
+
+def test_ids_are_allocated_once_and_reused(store):
+    assert (store.allocate_id(), store.allocate_id()) == ('A', 'B')
+    store['A'] = Matrix([[1.0]])
+    del store['A']
+    # Un ID asignado que no llegó a usarse también se devuelve
+    store.release_id('B')
+    assert (store.allocate_id(), store.allocate_id(), store.allocate_id()) == ('A', 'B', 'C')
+
+def test_changes_are_visible_to_other_processes(tmp_path):
+    first, second = MatrixStore(str(tmp_path)), MatrixStore(str(tmp_path))
+    first['A'] = [[1.0]]
+    assert second['A'].array.tolist() == [[1.0]]
+    first['A'] = [[2.0]]
+    assert second.version('A') == first.version('A')
+    assert second['A'].array.tolist() == [[2.0]]
+    assert second.allocate_id() == 'A' and first.allocate_id() == 'B'
+
+def blob_files(store):
+    return sorted(os.listdir(os.path.join(store.directory, BLOBS_DIRNAME)))
+
+def test_identical_contents_share_one_blob(store):
+    store['A'] = [[1.0, 2.0], [3.0, 4.0]]
+    store['B'] = [[1.0, 2.0], [3.0, 4.0]]
+    store['C'] = [[5.0, 6.0], [7.0, 8.0]]
+    assert store.blob_stats() == {'matrices': 3, 'blobs': 2}
+    assert store.content_key('A') == store.content_key('B') != store.content_key('C')
+
+def test_blob_released_with_last_reference(store):
+    store['A'] = [[1.0, 2.0], [3.0, 4.0]]
+    store['B'] = [[1.0, 2.0], [3.0, 4.0]]
+    del store['A']
+    assert store.blob_stats() == {'matrices': 1, 'blobs': 1}
+    np.testing.assert_array_equal(store['B'].array, [[1.0, 2.0], [3.0, 4.0]])
+    # Reemplazar el último ID que lo usa también libera el contenido
+    store['B'] = [[0.0]]
+    assert store.blob_stats() == {'matrices': 1, 'blobs': 1}
+    del store['B']
+    assert store.blob_stats() == {'matrices': 0, 'blobs': 0}
+    if store.directory is not None:
+        assert blob_files(store) == []
+
+def test_saving_same_content_keeps_refcount(store):
+    store['A'] = [[1.0, 2.0]]
+    store['A'] = [[1.0, 2.0]]
+    store['B'] = SparseMatrix.from_dense(np.eye(2))
+    del store['A']
+    del store['B']
+    assert store.blob_stats() == {'matrices': 0, 'blobs': 0}
+
+def test_dense_writer_shares_existing_blob(store):
+    store['A'] = np.ones((2, 3))
+    with store.dense_writer('B', (2, 3)) as array:
+        array[:] = 1.0
+    assert store.blob_stats() == {'matrices': 2, 'blobs': 1}
+    assert store.shape('B') == (2, 3)
+
+def test_replace_only_if_version_unchanged(store):
+    store['A'] = [[1.0]]
+    version = store.version('A')
+    # Otro proceso guarda la matriz entre la lectura y la escritura
+    store['A'] = [[2.0]]
+    assert store.replace('A', [[3.0]], version) is None
+    assert store['A'].array.tolist() == [[2.0]]
+    new_version = store.replace('A', [[3.0]], store.version('A'))
+    assert new_version == store.version('A')
+    assert store['A'].array.tolist() == [[3.0]]
+    assert store.replace('Z', [[1.0]], version) is None
+    assert 'Z' not in store
+    assert store.blob_stats() == {'matrices': 1, 'blobs': 1}